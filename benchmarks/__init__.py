@@ -0,0 +1,6 @@
+# coding: utf-8
+
+"""
+Benchmarks for mermaidmro. Run them from the repository root, e.g. via
+``python -m benchmarks.relations``.
+"""
@@ -0,0 +1,101 @@
+# coding: utf-8
+
+"""
+Benchmark of :py:func:`mermaidmro.discover_classes` over a synthetic package written to a
+temporary directory, comparing imports in the calling process and in worker processes.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+import mermaidmro as mm
+
+
+def write_package(
+    directory: str,
+    n_modules: int,
+    n_classes: int,
+    name: str = "mm_bench_pkg",
+) -> str:
+    """
+    Writes a package *name* with *n_modules* modules into *directory*, each defining *n_classes*
+    classes that inherit from a class in a parent module, forming a binary tree of module
+    dependencies to keep import nesting shallow, and returns the package name.
+    """
+    pkg_dir = os.path.join(directory, name)
+    os.makedirs(pkg_dir)
+    with open(os.path.join(pkg_dir, "__init__.py"), "w") as f:
+        f.write("class Base(object): pass\n")
+
+    for i in range(n_modules):
+        with open(os.path.join(pkg_dir, f"mod{i}.py"), "w") as f:
+            if i:
+                f.write(f"from {name}.mod{(i - 1) // 2} import C0 as Prev\n")
+            else:
+                f.write(f"from {name} import Base as Prev\n")
+            for j in range(n_classes):
+                f.write(f"class C{j}(Prev): pass\n")
+
+    return name
+
+
+def run(
+    n_modules: int,
+    n_classes: int,
+    processes: list[int],
+) -> list[tuple[int, int, float]]:
+    """
+    Discovers all classes of a synthetic package once per number of worker *processes*, each time
+    with a cleared module cache. Returns a list of tuples containing the number of processes, the
+    number of discovered classes and the duration in seconds.
+    """
+    results = []
+    directory = tempfile.mkdtemp()
+    try:
+        name = write_package(directory, n_modules, n_classes)
+        sys.path.insert(0, directory)
+        for n in processes:
+            for mod_name in list(sys.modules):
+                if mod_name.split(".", 1)[0] == name:
+                    del sys.modules[mod_name]
+            t0 = time.perf_counter()
+            result = mm.discover_classes(name, processes=n)
+            results.append((n, len(result.classes), time.perf_counter() - t0))
+    finally:
+        sys.path.remove(directory)
+        shutil.rmtree(directory)
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="benchmark of discover_classes")
+    parser.add_argument("--modules", type=int, default=500, help="number of modules; default: 500")
+    parser.add_argument(
+        "--classes",
+        type=int,
+        default=40,
+        help="number of classes per module; default: 40",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        nargs="+",
+        default=[0, 2, 4],
+        help="numbers of worker processes to compare; default: 0 2 4",
+    )
+    args = parser.parse_args()
+
+    print(f"{'processes':>10} {'classes':>10} {'time [ms]':>10}")
+    for n, n_classes, duration in run(args.modules, args.classes, args.processes):
+        print(f"{n:>10} {n_classes:>10} {duration * 1e3:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
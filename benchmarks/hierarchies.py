@@ -0,0 +1,182 @@
+# coding: utf-8
+
+"""
+Generators of synthetic class hierarchies for benchmarking.
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    "diamond_tree", "deep_chain", "wide_fan_in", "diamond_lattice", "mixin_stack", "redundant_stack",
+]
+
+
+def diamond_tree(
+    n_leaves: int,
+    prefix: str = "T",
+) -> type:
+    """
+    Creates a hierarchy with *n_leaves* leaf classes that all derive from a single shared mixin,
+    followed by levels of classes that pairwise combine two classes of the previous level, and
+    returns the single root class at the top. All paths meet at the shared mixin, forming
+    ``n_leaves - 1`` diamonds. The total number of classes is roughly ``2 * n_leaves`` while the
+    mro of each class only grows logarithmically in depth, so that even hierarchies with tens of
+    thousands of classes can be created quickly.
+
+    :param n_leaves: The number of leaf classes, rounded up to the next power of two.
+    :param prefix: Prefix of generated class names.
+    :return: The root class.
+    """
+    n = 1
+    while n < n_leaves:
+        n *= 2
+
+    mixin = type(f"{prefix}Mixin", (object,), {})
+    level = [type(f"{prefix}0_{i}", (mixin,), {}) for i in range(n)]
+    height = 0
+    while len(level) > 1:
+        height += 1
+        level = [
+            type(f"{prefix}{height}_{i}", (level[2 * i], level[2 * i + 1]), {})
+            for i in range(len(level) // 2)
+        ]
+
+    return level[0]
+
+
+def deep_chain(
+    depth: int,
+    prefix: str = "Chain",
+) -> type:
+    """
+    Creates a linear chain of *depth* classes, each deriving from the previous one, and returns the
+    last class. Note that the creation time grows quadratically with *depth* as each class stores
+    its full mro.
+
+    :param depth: The number of classes.
+    :param prefix: Prefix of generated class names.
+    :return: The last class of the chain.
+    """
+    cls = object
+    for i in range(depth):
+        cls = type(f"{prefix}{i}", (cls,), {})
+
+    return cls
+
+
+def wide_fan_in(
+    width: int,
+    prefix: str = "Fan",
+) -> type:
+    """
+    Creates *width* classes deriving from a shared base and returns a single class that directly
+    inherits from all of them.
+
+    :param width: The number of direct base classes of the returned class.
+    :param prefix: Prefix of generated class names.
+    :return: The class with *width* bases.
+    """
+    base = type(f"{prefix}Base", (object,), {})
+    bases = tuple(type(f"{prefix}{i}", (base,), {}) for i in range(width))
+
+    return type(f"{prefix}Root", bases, {})
+
+
+def diamond_lattice(
+    width: int,
+    height: int,
+    prefix: str = "Lattice",
+) -> type:
+    """
+    Creates *height* layers of *width* classes each, where every class derives from two adjacent
+    classes of the previous layer, forming overlapping diamonds, and returns a single class that
+    inherits from all classes of the last layer.
+
+    :param width: The number of classes per layer.
+    :param height: The number of layers.
+    :param prefix: Prefix of generated class names.
+    :return: The root class.
+    """
+    layer = [type(f"{prefix}0_{i}", (object,), {}) for i in range(width)]
+    for h in range(1, height):
+        layer = [
+            type(
+                f"{prefix}{h}_{i}",
+                (layer[i], layer[i + 1]) if i + 1 < width else (layer[i],),
+                {},
+            )
+            for i in range(width)
+        ]
+
+    return type(f"{prefix}Root", tuple(layer), {})
+
+
+def mixin_stack(
+    n_classes: int,
+    n_mixins: int = 20,
+    mixins_per_class: int = 3,
+    prefix: str = "Mixin",
+) -> type:
+    """
+    Creates a setup resembling typical application code, with a short chain of framework base
+    classes, *n_mixins* independent mixins each with a small base hierarchy, and *n_classes*
+    classes that each combine *mixins_per_class* mixins with the framework base. Returns a single
+    class inheriting from all of them.
+
+    :param n_classes: The number of application classes.
+    :param n_mixins: The number of available mixins.
+    :param mixins_per_class: The number of mixins per application class.
+    :param prefix: Prefix of generated class names.
+    :return: The root class.
+    """
+    # framework base chain
+    base = object
+    for name in ["Object", "Model", "BaseModel"]:
+        base = type(f"{prefix}{name}", (base,), {})
+
+    # mixins with an own abstract base each
+    mixins = []
+    for i in range(n_mixins):
+        abstract = type(f"{prefix}Abstract{i}", (object,), {})
+        mixins.append(type(f"{prefix}{i}", (abstract,), {}))
+
+    # application classes, using mixins in a consistent order to obtain valid mros
+    classes = []
+    for i in range(n_classes):
+        indices = sorted({(i * (7 * j + 1) + j) % n_mixins for j in range(mixins_per_class)})
+        bases = tuple(mixins[j] for j in indices) + (base,)
+        classes.append(type(f"{prefix}App{i}", bases, {}))
+
+    return type(f"{prefix}Root", tuple(classes), {})
+
+
+def redundant_stack(
+    depth: int,
+    n_redundant: int = 2,
+    prefix: str = "Redundant",
+) -> type:
+    """
+    Creates a chain of *depth* generic classes, each deriving from the previous one and, as often
+    seen in layered mixin code, additionally from up to *n_redundant* earlier classes of the chain
+    that are already reached through the previous one, and returns the last class. All but one
+    relation per class are transitively redundant.
+
+    :param depth: The number of classes.
+    :param n_redundant: The number of redundant base classes per class.
+    :param prefix: Prefix of generated class names.
+    :return: The last class of the chain.
+    """
+    import types
+    from typing import Generic, TypeVar
+
+    T = TypeVar("T")
+    classes = [types.new_class(
+        f"{prefix}0",
+        (Generic[T],),
+        exec_body=lambda ns: ns.update(__module__=__name__),
+    )]
+    for i in range(1, depth):
+        earlier = classes[max(0, i - 1 - n_redundant):i - 1][::-1]
+        classes.append(type(f"{prefix}{i}", (classes[-1], *earlier), {}))
+
+    return classes[-1]
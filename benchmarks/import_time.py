@@ -0,0 +1,83 @@
+# coding: utf-8
+
+"""
+Import time benchmark of :py:mod:`mermaidmro`, measured in fresh interpreters via
+``python -X importtime``. As the import time directly adds to the startup of the command line
+interface, it can be checked against a budget with ``--budget``, causing a non-zero exit code
+when exceeded.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import argparse
+import subprocess
+
+
+def measure(
+    module: str = "mermaidmro",
+) -> float:
+    """
+    Imports *module* in a fresh interpreter and returns its cumulative import time in seconds as
+    reported by ``-X importtime``.
+    """
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    p = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+
+    # lines have the format "import time: self [us] | cumulative | imported package"
+    for line in p.stderr.splitlines():
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) * 1e-6
+
+    raise RuntimeError(f"no import time reported for module '{module}'")
+
+
+def run(
+    repeat: int = 10,
+    module: str = "mermaidmro",
+) -> tuple[float, float]:
+    """
+    Measures the import time of *module* *repeat* times and returns the best and median duration
+    in seconds. The first measurement is discarded as it might include writing bytecode caches.
+    """
+    measure(module)
+    durations = sorted(measure(module) for _ in range(repeat))
+    return durations[0], durations[len(durations) // 2]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="import time benchmark of mermaidmro")
+    parser.add_argument("--repeat", type=int, default=10, help="repetitions; default: 10")
+    parser.add_argument(
+        "--module",
+        default="mermaidmro",
+        help="the module to import; default: mermaidmro",
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        help="maximum median import time in ms, exits with code 1 when exceeded",
+    )
+    args = parser.parse_args()
+
+    best, median = run(repeat=args.repeat, module=args.module)
+    print(f"{'module':>12} {'best [ms]':>10} {'median [ms]':>12}")
+    print(f"{args.module:>12} {best * 1e3:>10.2f} {median * 1e3:>12.2f}")
+
+    if args.budget is not None and median * 1e3 > args.budget:
+        print(f"median import time exceeds budget of {args.budget:.2f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# coding: utf-8
+
+"""
+Benchmark of :py:class:`mermaidmro.IncrementalGraphs` comparing the update of graphs affected by
+a single changed class to the full regeneration of all graphs of a large hierarchy.
+"""
+
+from __future__ import annotations
+
+import time
+import argparse
+
+import mermaidmro as mm
+
+from benchmarks.hierarchies import diamond_tree
+
+
+def run(
+    n_leaves: int,
+    max_depth: int = 3,
+    n_changes: int = 10,
+) -> dict[str, float]:
+    """
+    Creates a :py:func:`diamond_tree` hierarchy with *n_leaves* leaf classes and one graph per
+    class with a maximum depth *max_depth*. Returns a dictionary with the durations in seconds of
+    the initial creation, the average full regeneration and the average incremental update for
+    *n_changes* changed classes, as well as the average number of updated graphs.
+    """
+    root_cls = diamond_tree(n_leaves, prefix=f"U{n_leaves}_")
+    classes = list(root_cls.__mro__)
+    kwargs = {"max_depth": max_depth, "show_mro": False}
+    results = {}
+
+    # initial creation
+    t0 = time.perf_counter()
+    graphs = mm.IncrementalGraphs(**kwargs)
+    for i, cls in enumerate(classes):
+        graphs.add(i, cls)
+    results["initial [s]"] = time.perf_counter() - t0
+
+    # full regeneration
+    name_func = mm.get_default_name_func()
+    t0 = time.perf_counter()
+    for cls in classes:
+        list(mm.iter_mermaid_lines(cls, name_func=name_func, **kwargs))
+    results["full [s]"] = time.perf_counter() - t0
+
+    # incremental updates for classes spread over the hierarchy
+    changed = classes[::max(1, len(classes) // n_changes)][:n_changes]
+    n_updated = 0
+    t0 = time.perf_counter()
+    for cls in changed:
+        n_updated += len(graphs.affected(classes=[cls]))
+        graphs.update(classes=[cls])
+    results["incremental [s]"] = (time.perf_counter() - t0) / len(changed)
+    results["updated graphs"] = n_updated / len(changed)
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="benchmark of incremental graph updates")
+    parser.add_argument("--leaves", type=int, default=4096, help="number of leaves; default: 4096")
+    parser.add_argument("--max-depth", type=int, default=3, help="graph depth; default: 3")
+    parser.add_argument("--changes", type=int, default=10, help="changed classes; default: 10")
+    args = parser.parse_args()
+
+    for key, value in run(args.leaves, max_depth=args.max_depth, n_changes=args.changes).items():
+        print(f"{key:>16}: {value:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# coding: utf-8
+
+"""
+Throughput benchmark of :py:class:`mermaidmro.InheritanceIndex` compared to repeated calls to
+:py:func:`mermaidmro.get_mermaid_text`, querying the graphs of all classes in a hierarchy.
+"""
+
+from __future__ import annotations
+
+import time
+import argparse
+
+import mermaidmro as mm
+
+from benchmarks.hierarchies import diamond_tree
+
+
+def run(
+    n_leaves: int,
+    max_depth: int = 2,
+    rounds: int = 3,
+) -> dict[str, float]:
+    """
+    Creates a :py:func:`diamond_tree` hierarchy with *n_leaves* leaf classes and queries the
+    mermaid text of each class *rounds* times, with and without an index. Returns a dictionary
+    mapping method names to the number of queries per second, including the time to build the
+    index once.
+    """
+    root_cls = diamond_tree(n_leaves, prefix=f"I{n_leaves}_")
+    classes = list(root_cls.__mro__)
+    n_queries = rounds * len(classes)
+    results = {}
+
+    # plain function calls
+    name_func = mm.get_default_name_func()
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for cls in classes:
+            mm.get_mermaid_text(cls, max_depth=max_depth, name_func=name_func)
+    results["get_mermaid_text"] = n_queries / (time.perf_counter() - t0)
+
+    # index queries
+    t0 = time.perf_counter()
+    index = mm.InheritanceIndex([root_cls])
+    for _ in range(rounds):
+        for cls in classes:
+            index.mermaid_text(cls, max_depth=max_depth)
+    results["InheritanceIndex"] = n_queries / (time.perf_counter() - t0)
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="throughput benchmark of InheritanceIndex")
+    parser.add_argument("--leaves", type=int, default=4096, help="number of leaves; default: 4096")
+    parser.add_argument("--max-depth", type=int, default=2, help="query depth; default: 2")
+    parser.add_argument("--rounds", type=int, default=3, help="queries per class; default: 3")
+    args = parser.parse_args()
+
+    print(f"{'method':>20} {'queries / s':>12}")
+    for method, rate in run(args.leaves, max_depth=args.max_depth, rounds=args.rounds).items():
+        print(f"{method:>20} {rate:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
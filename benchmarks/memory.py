@@ -0,0 +1,90 @@
+# coding: utf-8
+
+"""
+Memory benchmark of :py:func:`mermaidmro.get_relations` comparing lists of
+:py:class:`mermaidmro.Relation` objects to :py:class:`mermaidmro.CompactRelations` containers.
+"""
+
+from __future__ import annotations
+
+import gc
+import time
+import argparse
+import tracemalloc
+
+import mermaidmro as mm
+
+from benchmarks.hierarchies import diamond_tree
+
+
+def measure(
+    root_cls: type,
+    compact: bool,
+) -> tuple[int, int, float]:
+    """
+    Extracts the relations of *root_cls* and returns the number of relations, the memory in bytes
+    retained by the result, and the duration in seconds.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        t0 = time.perf_counter()
+        relations = mm.get_relations(root_cls, compact=compact)
+        duration = time.perf_counter() - t0
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return len(relations), size, duration
+
+
+def run(
+    sizes: list[int],
+) -> list[tuple[int, int, int, int, float, float]]:
+    """
+    Measures both representations for :py:func:`diamond_tree` hierarchies with the given leaf
+    *sizes*. Returns a list of tuples containing the number of classes, the number of relations,
+    the retained memory in bytes of the list and of the compact container, and the corresponding
+    durations in seconds.
+    """
+    results = []
+    for size in sizes:
+        root_cls = diamond_tree(size, prefix=f"M{size}_")
+        n_relations, list_size, list_duration = measure(root_cls, compact=False)
+        _, compact_size, compact_duration = measure(root_cls, compact=True)
+        results.append((
+            len(root_cls.__mro__),
+            n_relations,
+            list_size,
+            compact_size,
+            list_duration,
+            compact_duration,
+        ))
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="memory benchmark of compact relations")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1024, 4096, 16384],
+        help="number of leaf classes per hierarchy; default: 1024 4096 16384",
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'classes':>10} {'relations':>10} {'list [kB]':>10} {'compact [kB]':>13} "
+        f"{'list [ms]':>10} {'compact [ms]':>13}",
+    )
+    for n_classes, n_relations, list_size, compact_size, list_t, compact_t in run(args.sizes):
+        print(
+            f"{n_classes:>10} {n_relations:>10} {list_size / 1024:>10.1f} "
+            f"{compact_size / 1024:>13.1f} {list_t * 1e3:>10.2f} {compact_t * 1e3:>13.2f}",
+        )
+
+
+if __name__ == "__main__":
+    main()
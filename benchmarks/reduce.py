@@ -0,0 +1,120 @@
+# coding: utf-8
+
+"""
+Benchmark of graph reductions over synthetic hierarchies, comparing the number of edges, the size
+of the text and of the payload sent to mermaid.ink, the duration of creating the text, and the
+duration of laying out and rendering the graph with the local svg renderer as a stand-in for the
+layout done by mermaid, with different reduction options.
+"""
+
+from __future__ import annotations
+
+import time
+import argparse
+from typing import Any, Callable
+
+import mermaidmro as mm
+
+from benchmarks.hierarchies import deep_chain, wide_fan_in, diamond_lattice, mixin_stack, \
+    redundant_stack
+
+
+#: Reduction options of :py:func:`mermaidmro.get_mermaid_text` per method.
+METHODS: dict[str, dict[str, Any]] = {
+    "none": {},
+    "hide": {"hide_bases": True},
+    "reduce": {"reduce_edges": True},
+    "collapse": {"collapse_chains": True},
+    "all": {"reduce_edges": True, "collapse_chains": True, "hide_bases": True},
+}
+
+
+def get_hierarchies(
+    scale: float = 1.0,
+) -> dict[str, Callable[[], type]]:
+    """
+    Returns a dictionary mapping names of hierarchies to functions creating their root classes,
+    with sizes multiplied by *scale*.
+    """
+    def n(size: int) -> int:
+        return max(2, int(size * scale))
+
+    return {
+        "deep_chain": lambda: deep_chain(n(400)),
+        "redundant_stack": lambda: redundant_stack(n(400)),
+        "mixin_stack": lambda: mixin_stack(n(200)),
+        "diamond_lattice": lambda: diamond_lattice(n(20), n(20)),
+        "wide_fan_in": lambda: wide_fan_in(n(400)),
+    }
+
+
+def run(
+    scale: float = 1.0,
+    repeat: int = 3,
+) -> list[tuple[str, str, int, int, int, float, float]]:
+    """
+    Creates graphs of all hierarchies with all reduction methods, with sizes multiplied by *scale*,
+    and measures the best durations of *repeat* runs. Returns a list of tuples containing the names
+    of the hierarchy and method, the number of edges, the size of the text and of the encoded
+    payload in bytes, and the durations in seconds of creating the text and of rendering it.
+    """
+    from mermaidmro.render import SVGRenderer
+
+    renderer = SVGRenderer()
+
+    def best(func: Callable[[], Any]) -> tuple[Any, float]:
+        durations = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            result = func()
+            durations.append(time.perf_counter() - t0)
+        return result, min(durations)
+
+    results = []
+    for name, create in get_hierarchies(scale).items():
+        root_cls = create()
+        for method, options in METHODS.items():
+            text, text_duration = best(lambda: mm.get_mermaid_text(root_cls, **options))
+            _, render_duration = best(lambda: renderer.to_svg(text))
+            n_edges = sum(" --> " in line for line in text.splitlines())
+            results.append((
+                name,
+                method,
+                n_edges,
+                len(text.encode("utf-8")),
+                len(mm.encode_json(text)),
+                text_duration,
+                render_duration,
+            ))
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="benchmark of graph reductions")
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="factor to scale the size of all hierarchies; default: 1.0",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions per method; default: 3")
+    args = parser.parse_args()
+
+    print(
+        f"{'hierarchy':>16} {'method':>9} {'edges':>6} {'text [kB]':>10} {'payload [kB]':>13} "
+        f"{'text [ms]':>10} {'layout [ms]':>12}",
+    )
+    for name, method, n_edges, text_size, payload_size, text_duration, render_duration in run(
+        scale=args.scale,
+        repeat=args.repeat,
+    ):
+        print(
+            f"{name:>16} {method:>9} {n_edges:>6} {text_size / 1024:>10.1f} "
+            f"{payload_size / 1024:>13.1f} {text_duration * 1e3:>10.2f} "
+            f"{render_duration * 1e3:>12.2f}",
+        )
+
+
+if __name__ == "__main__":
+    main()
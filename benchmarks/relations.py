@@ -0,0 +1,62 @@
+# coding: utf-8
+
+"""
+Scaling benchmark of :py:func:`mermaidmro.get_relations` over synthetic hierarchies of increasing
+size. The time per class should stay roughly constant when the traversal is linear.
+"""
+
+from __future__ import annotations
+
+import time
+import argparse
+
+import mermaidmro as mm
+
+from benchmarks.hierarchies import diamond_tree
+
+
+def run(
+    sizes: list[int],
+    repeat: int = 5,
+) -> list[tuple[int, int, float]]:
+    """
+    Measures :py:func:`mermaidmro.get_relations` for :py:func:`diamond_tree` hierarchies with
+    the given leaf *sizes*, taking the best of *repeat* runs. Returns a list of tuples containing
+    the number of classes, the number of relations and the best duration in seconds.
+    """
+    results = []
+    for size in sizes:
+        root_cls = diamond_tree(size, prefix=f"S{size}_")
+        n_classes = len(root_cls.__mro__)
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            relations = mm.get_relations(root_cls)
+            best = min(best, time.perf_counter() - t0)
+        results.append((n_classes, len(relations), best))
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="scaling benchmark of get_relations")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1024, 2048, 4096, 8192],
+        help="number of leaf classes per hierarchy; default: 1024 2048 4096 8192",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions per size; default: 5")
+    args = parser.parse_args()
+
+    print(f"{'classes':>10} {'relations':>10} {'time [ms]':>10} {'us / class':>10}")
+    for n_classes, n_relations, duration in run(args.sizes, repeat=args.repeat):
+        print(
+            f"{n_classes:>10} {n_relations:>10} {duration * 1e3:>10.2f} "
+            f"{duration * 1e6 / n_classes:>10.3f}",
+        )
+
+
+if __name__ == "__main__":
+    main()
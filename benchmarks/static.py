@@ -0,0 +1,112 @@
+# coding: utf-8
+
+"""
+Benchmark of :py:class:`mermaidmro.StaticExtractor` over a synthetic package written to a temporary
+directory, comparing imports to static extraction with a cold cache, in worker processes, and with
+a warm cache. Note that modules of the synthetic package have no dependencies or side effects, so
+that the import times of actual packages are usually much higher.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+import mermaidmro as mm
+
+from benchmarks.discover import write_package
+
+
+def run(
+    n_modules: int,
+    n_classes: int,
+    processes: int = 4,
+) -> dict[str, tuple[float, float]]:
+    """
+    Creates the graphs of all classes of a synthetic package with *n_modules* modules containing
+    *n_classes* classes each, once after importing all modules, and once after extracting them
+    statically, using *processes* worker processes in one of the runs. Returns a dictionary mapping
+    methods to the durations in seconds of the extraction of classes and of creating all graphs.
+    """
+    from mermaidmro.static import StaticExtractor
+
+    results = {}
+    directory = tempfile.mkdtemp()
+    try:
+        name = write_package(directory, n_modules, n_classes, name="mm_bench_static")
+        cache_dir = os.path.join(directory, "cache")
+        module_names = [name] + [f"{name}.mod{i}" for i in range(n_modules)]
+
+        def graphs(classes: list) -> float:
+            t0 = time.perf_counter()
+            name_func = mm.get_default_name_func()
+            for cls in classes:
+                mm.get_mermaid_text(cls, name_func=name_func)
+            return time.perf_counter() - t0
+
+        # static extraction
+        for method, extractor_processes in [
+            ("static cold", 0),
+            (f"static cold ({processes} processes)", processes),
+            ("static warm", 0),
+        ]:
+            t0 = time.perf_counter()
+            extractor = StaticExtractor(
+                paths=[directory],
+                cache_dir=cache_dir if method != "static cold" else None,
+                processes=extractor_processes,
+            )
+            extractor.parse_package(name)
+            classes = [cls for mod_name in module_names for cls in extractor.classes(mod_name)]
+            for cls in classes:
+                cls.__mro__
+            duration = time.perf_counter() - t0
+            results[method] = (duration, graphs(classes))
+
+        # imports
+        sys.path.insert(0, directory)
+        try:
+            t0 = time.perf_counter()
+            infos = mm.import_modules(module_names)
+            classes = [mm._import_class(cid) for info in infos for cid in info.classes]
+            duration = time.perf_counter() - t0
+            results["import"] = (duration, graphs(classes))
+        finally:
+            sys.path.remove(directory)
+            for mod_name in module_names:
+                sys.modules.pop(mod_name, None)
+    finally:
+        shutil.rmtree(directory)
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="benchmark of static class extraction")
+    parser.add_argument("--modules", type=int, default=500, help="number of modules; default: 500")
+    parser.add_argument(
+        "--classes",
+        type=int,
+        default=40,
+        help="number of classes per module; default: 40",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=4,
+        help="number of worker processes; default: 4",
+    )
+    args = parser.parse_args()
+
+    print(f"{'method':>28} {'extract [ms]':>13} {'graphs [ms]':>12}")
+    results = run(args.modules, args.classes, processes=args.processes)
+    for method, (extract_duration, graphs_duration) in results.items():
+        print(f"{method:>28} {extract_duration * 1e3:>13.2f} {graphs_duration * 1e3:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
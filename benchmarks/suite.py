@@ -0,0 +1,237 @@
+# coding: utf-8
+
+"""
+Benchmark suite of the core pipeline, measuring the time and peak memory of each stage for a set of
+synthetic hierarchies. Results can be written to a json file and compared against a previous
+result to detect regressions, e.g.
+
+.. code-block:: bash
+
+    python -m benchmarks.suite --output baseline.json
+    # ... change code ...
+    python -m benchmarks.suite --compare baseline.json --threshold 0.2
+"""
+
+from __future__ import annotations
+
+import gc
+import sys
+import json
+import time
+import types
+import argparse
+import platform
+import tracemalloc
+from typing import Any, Callable
+
+import mermaidmro as mm
+
+from benchmarks.hierarchies import (
+    deep_chain, wide_fan_in, diamond_lattice, diamond_tree, mixin_stack,
+)
+
+
+#: Name of the module in which generated root classes are registered for the cli stage.
+MODULE_NAME = "mm_bench_suite"
+
+
+def get_hierarchies(
+    scale: float = 1.0,
+) -> dict[str, Callable[[], type]]:
+    """
+    Returns a dictionary mapping names of hierarchies to functions creating their root classes,
+    with sizes multiplied by *scale*.
+    """
+    def n(size: int) -> int:
+        return max(2, int(size * scale))
+
+    return {
+        "deep_chain": lambda: deep_chain(n(400)),
+        "wide_fan_in": lambda: wide_fan_in(n(400)),
+        "diamond_lattice": lambda: diamond_lattice(n(25), n(25)),
+        "diamond_tree": lambda: diamond_tree(n(2048)),
+        "mixin_stack": lambda: mixin_stack(n(400)),
+    }
+
+
+def get_stages(
+    name: str,
+    root_cls: type,
+) -> dict[str, Callable[[], Any]]:
+    """
+    Returns a dictionary mapping names of pipeline stages to functions that run them for a
+    hierarchy *name* with a *root_cls*.
+    """
+    classes = list(root_cls.__mro__)
+    styles = [mm.Style(f"Style{i}", classes[i::10], "stroke: #83b") for i in range(10)]
+    mermaid_text = mm.get_mermaid_text(root_cls)
+
+    # register the root class for the cli
+    mod = sys.modules.setdefault(MODULE_NAME, types.ModuleType(MODULE_NAME))
+    setattr(mod, name, root_cls)
+
+    def names() -> list[str]:
+        name_func = mm.get_default_name_func()
+        return [name_func(cls) for cls in classes]
+
+    return {
+        "get_relations": lambda: mm.get_relations(root_cls),
+        "name_func": names,
+        "get_mermaid_text": lambda: mm.get_mermaid_text(root_cls),
+        "get_style_text": lambda: mm.get_style_text(styles),
+        "get_style_text_grouped": lambda: mm.get_style_text(styles, group=True),
+        "encode_json": lambda: mm.encode_json(mermaid_text),
+        "cli": lambda: mm.main([f"{MODULE_NAME}:{name}"], test=True),
+    }
+
+
+def measure(
+    func: Callable[[], Any],
+    repeat: int = 5,
+) -> tuple[float, int]:
+    """
+    Runs *func* *repeat* times and returns the best duration in seconds, and the peak memory in
+    bytes allocated during a separate, traced run.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return best, peak
+
+
+def run(
+    scale: float = 1.0,
+    repeat: int = 5,
+    hierarchies: list[str] | None = None,
+    stages: list[str] | None = None,
+) -> dict[str, Any]:
+    """
+    Runs all *stages* for all *hierarchies*, defaulting to all available ones, with sizes multiplied
+    by *scale* and *repeat* repetitions, and returns a json serializable dictionary with metadata
+    and results, mapping hierarchy and stage names to durations in seconds and peak memory in bytes.
+    """
+    results: dict[str, Any] = {
+        "meta": {
+            "mermaidmro": mm.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "scale": scale,
+            "repeat": repeat,
+        },
+        "results": {},
+    }
+
+    for name, create in get_hierarchies(scale).items():
+        if hierarchies and name not in hierarchies:
+            continue
+        root_cls = create()
+        results["results"][name] = hierarchy_results = {"classes": len(root_cls.__mro__)}
+        for stage, func in get_stages(name, root_cls).items():
+            if stages and stage not in stages:
+                continue
+            duration, peak = measure(func, repeat=repeat)
+            hierarchy_results[stage] = {"time": duration, "peak_memory": peak}
+
+    return results
+
+
+def compare(
+    results: dict[str, Any],
+    baseline: dict[str, Any],
+    threshold: float = 0.2,
+) -> list[tuple[str, str, float, float]]:
+    """
+    Compares *results* to a *baseline* and returns a list of regressions, i.e., stages whose
+    duration increased by more than the relative *threshold*, as tuples containing the hierarchy
+    and stage names and the baseline and new durations. Hierarchies whose number of classes differ,
+    e.g. due to a different scale, are not compared.
+    """
+    regressions = []
+    for name, hierarchy_results in results["results"].items():
+        base_hierarchy_results = baseline["results"].get(name, {})
+        if base_hierarchy_results.get("classes") != hierarchy_results["classes"]:
+            continue
+        for stage, values in hierarchy_results.items():
+            base_values = base_hierarchy_results.get(stage)
+            if not isinstance(values, dict) or not base_values:
+                continue
+            if values["time"] > base_values["time"] * (1 + threshold):
+                regressions.append((name, stage, base_values["time"], values["time"]))
+
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="benchmark suite of the core pipeline")
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="factor to scale the size of all hierarchies; default: 1.0",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions per stage; default: 5")
+    parser.add_argument("--hierarchies", nargs="+", help="hierarchies to run; default: all")
+    parser.add_argument("--stages", nargs="+", help="stages to run; default: all")
+    parser.add_argument("--output", "-o", metavar="PATH", help="json file to write results to")
+    parser.add_argument(
+        "--compare",
+        "-c",
+        metavar="PATH",
+        help="json file with previous results, exits with code 1 in case of regressions",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="relative increase of durations considered a regression; default: 0.2",
+    )
+    args = parser.parse_args()
+
+    results = run(
+        scale=args.scale,
+        repeat=args.repeat,
+        hierarchies=args.hierarchies,
+        stages=args.stages,
+    )
+
+    print(f"{'hierarchy':>16} {'classes':>8} {'stage':>22} {'time [ms]':>10} {'peak [kB]':>10}")
+    for name, hierarchy_results in results["results"].items():
+        for stage, values in hierarchy_results.items():
+            if not isinstance(values, dict):
+                continue
+            print(
+                f"{name:>16} {hierarchy_results['classes']:>8} {stage:>22} "
+                f"{values['time'] * 1e3:>10.3f} {values['peak_memory'] / 1024:>10.1f}",
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, threshold=args.threshold)
+        for name, stage, base_time, new_time in regressions:
+            print(
+                f"regression in {name}/{stage}: {base_time * 1e3:.3f} ms -> {new_time * 1e3:.3f} "
+                f"ms (+{(new_time / base_time - 1) * 100:.1f}%)",
+            )
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
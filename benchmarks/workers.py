@@ -0,0 +1,118 @@
+# coding: utf-8
+
+"""
+Benchmark of :py:func:`mermaidmro.extract_classes` over synthetic modules written to a temporary
+directory, comparing imports in the current process to imports in isolated worker processes. To
+mimic modules with heavy dependencies, each module keeps the cpu busy for a configurable duration
+when imported.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+import mermaidmro as mm
+
+
+def write_modules(
+    directory: str,
+    n_modules: int,
+    n_classes: int,
+    import_time: float,
+    name: str = "mm_bench_workers",
+) -> list[str]:
+    """
+    Writes *n_modules* modules into *directory*, each defining *n_classes* classes inheriting from
+    each other and spending *import_time* seconds of cpu time when imported, and returns the class
+    identifiers of all last classes.
+    """
+    cids = []
+    for i in range(n_modules):
+        with open(f"{directory}/{name}{i}.py", "w") as f:
+            f.write("import time\n")
+            f.write(f"t0 = time.process_time()\nwhile time.process_time() - t0 < {import_time}:\n")
+            f.write("    pass\n")
+            f.write("class C0(object): pass\n")
+            for j in range(1, n_classes):
+                f.write(f"class C{j}(C{j - 1}): pass\n")
+        cids.append(f"{name}{i}:C{n_classes - 1}")
+
+    return cids
+
+
+def run(
+    n_modules: int,
+    n_classes: int,
+    import_time: float,
+    processes: list[int],
+) -> dict[str, float]:
+    """
+    Imports the last classes of *n_modules* synthetic modules and creates their graphs, once in the
+    current process and once in worker processes for each number in *processes*. Returns a
+    dictionary mapping methods to durations in seconds.
+    """
+    results = {}
+    directory = tempfile.mkdtemp()
+    cids = write_modules(directory, n_modules, n_classes, import_time)
+    module_names = [cid.split(":", 1)[0] for cid in cids]
+    sys.path.insert(0, directory)
+    try:
+        # imports in the current process, removing modules afterwards so that forked workers
+        # import them again
+        t0 = time.perf_counter()
+        for cid in cids:
+            mm.get_mermaid_text(mm._import_class(cid))
+        results["in-process"] = time.perf_counter() - t0
+        for module_name in module_names:
+            del sys.modules[module_name]
+
+        # workers
+        for n in processes:
+            t0 = time.perf_counter()
+            for res in mm.extract_classes(cids, processes=n):
+                for _, cls in res.classes:
+                    mm.get_mermaid_text(cls)
+            results[f"workers ({n})"] = time.perf_counter() - t0
+    finally:
+        sys.path.remove(directory)
+        shutil.rmtree(directory)
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="benchmark of imports in worker processes")
+    parser.add_argument("--modules", type=int, default=32, help="number of modules; default: 32")
+    parser.add_argument(
+        "--classes",
+        type=int,
+        default=50,
+        help="number of classes per module; default: 50",
+    )
+    parser.add_argument(
+        "--import-time",
+        type=float,
+        default=0.05,
+        help="cpu time per module import in seconds; default: 0.05",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 8],
+        help="numbers of worker processes; default: 1 2 4 8",
+    )
+    args = parser.parse_args()
+
+    print(f"{'method':>14} {'time [ms]':>10}")
+    results = run(args.modules, args.classes, args.import_time, args.processes)
+    for method, duration in results.items():
+        print(f"{method:>14} {duration * 1e3:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
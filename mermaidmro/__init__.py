@@ -2,31 +2,65 @@
 
 from __future__ import annotations
 
+# public interface, including members of submodules that are loaded lazily on first access (see
+# _lazy_attrs below), so note that a star import loads all of these submodules
 __all__ = [
     "get_mermaid_text",
+    "iter_mermaid_lines",
+    "write_mermaid_text",
+    "get_mermaid_text_multi",
     "get_style_text",
+    "iter_style_lines",
     "get_relations",
+    "iter_relations",
+    "get_relations_multi",
+    "reduce_relations",
+    "UBIQUITOUS_BASES",
+    "CompactRelations",
     "encode_text",
     "encode_json",
     "download_graph",
+    "download_graphs",
+    "adownload_graph",
+    "adownload_graphs",
+    "render_graph",
+    "get_renderer",
+    "Renderer",
+    "SVGRenderer",
+    "InkRenderer",
+    "create_session",
+    "RenderCache",
+    "Stats",
+    "Selector",
+    "discover_modules",
+    "import_modules",
+    "discover_classes",
+    "InheritanceIndex",
+    "IncrementalGraphs",
+    "diff_lines",
+    "StaticExtractor",
+    "extract_classes",
+    "WorkerResult",
     "get_default_name_func",
 ]
 
 import os
-import zlib
-import base64
-import json
+import re
 import importlib
+import importlib.util
 import fnmatch
+import functools
+import contextlib
 import collections
-import urllib.request
-from typing import Callable
+from typing import (
+    TYPE_CHECKING, Any, BinaryIO, Callable, ContextManager, Generic, Iterable, Iterator, IO,
+)
+
+if TYPE_CHECKING:
+    import http.client
 
-try:
-    import requests
-    HAS_REQUESTS = True
-except ModuleNotFoundError:
-    HAS_REQUESTS = False
+# heavy dependencies are imported lazily where needed to keep the import (and cli startup) fast
+HAS_REQUESTS = importlib.util.find_spec("requests") is not None
 
 # package infos
 from mermaidmro.__meta__ import (  # noqa
@@ -47,62 +81,675 @@ URL_STATIC = "https://mermaid.ink/img/{}?type={}"
 URL_STATIC_JSON = "https://mermaid.ink/img/pako:{}?type={}"
 URL_EDIT_JSON = "https://mermaid.live/edit#pako:{}"
 
+# alternative names of file types, e.g. derived from file extensions
+_file_type_aliases = {"jpeg": "jpg"}
+
 #: Relation between two classes including a depth value and the mro index with respect to the
-#: requested root class (namedtuple).
+#: requested root class (namedtuple). Depth values of relations between subclasses of the root
+#: class are negative.
 Relation = collections.namedtuple("Relation", ["cls", "base_cls", "root_cls", "depth", "mro"])
 
 #: Container object with attributes to define css styles for one or multiple classes (namedtuple).
+#: Besides classes and their names, *cls* can contain :py:class:`Selector` objects or predicates.
 Style = collections.namedtuple("Style", ["name", "cls", "css"])
 
+#: Selector of classes in a graph for :py:class:`Style` objects, with glob patterns matching the
+#: *module* and the qualified *name* of classes, and / or a predicate *func* that receives a class
+#: and returns whether it is selected (namedtuple). Unset attributes match all classes.
+Selector = collections.namedtuple("Selector", ["module", "name", "func"], defaults=(None,) * 3)
+
+#: Base classes of most classes that are hidden from graphs with ``hide_bases=True``.
+UBIQUITOUS_BASES = (object, Generic)
+
+#: Result of a single download in :py:func:`download_graphs` with the index of the item, the path
+#: of the downloaded file, the error in case of a failure, the number of attempts and the duration
+#: in seconds (namedtuple).
+DownloadResult = collections.namedtuple(
+    "DownloadResult",
+    ["index", "path", "error", "attempts", "duration"],
+)
+
+
+class Stats(object):
+    """
+    Collector of durations of individual stages and of counters such as the number of nodes and
+    edges, cache hits or payload sizes, that can be passed as *stats* to
+    :py:func:`get_mermaid_text`, :py:func:`iter_mermaid_lines`, :py:func:`encode_json` and
+    :py:func:`download_graph` to find out which stage is slow. Example:
+
+    .. code-block:: python
+
+        stats = Stats()
+        mermaid_text = get_mermaid_text(D, stats=stats)
+        download_graph(mermaid_text, "graph.png", cache="~/.cache/mm", stats=stats)
+        print(stats.format())
+        # stage            time [ms]   calls
+        # names                0.010       1
+        # relations            0.015       1
+        # mermaid_text         0.043       1
+        # encode_json          0.036       1
+        # cache                0.021       1
+        # http               412.598       1
+        #
+        # counter              value
+        # graphs                   1
+        # nodes                    5
+        # ...
+
+    Durations of the ``relations``, ``names`` and ``styles`` stages are exclusive, whereas those of
+    enclosing stages such as ``mermaid_text`` include them. Values of repeated calls are
+    accumulated. Instances are thread-safe so that they can be shared across concurrent downloads.
+
+    :param callback: Optional function that is called with the name and the duration in seconds of
+        each completed stage, e.g. to forward them to a profiler or a metrics system.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[str, float], Any] | None = None,
+    ) -> None:
+        super().__init__()
+
+        import threading
+
+        self.callback = callback
+        self.durations: dict[str, float] = {}
+        self.calls: dict[str, int] = {}
+        self.counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add_time(
+        self,
+        stage: str,
+        duration: float,
+    ) -> None:
+        """
+        Adds a *duration* in seconds to a *stage* and invokes the callback.
+        """
+        with self._lock:
+            self.durations[stage] = self.durations.get(stage, 0.0) + duration
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+
+        if callable(self.callback):
+            self.callback(stage, duration)
+
+    def add(
+        self,
+        counter: str,
+        value: int = 1,
+    ) -> None:
+        """
+        Increments a *counter* by *value*.
+        """
+        with self._lock:
+            self.counts[counter] = self.counts.get(counter, 0) + value
+
+    @contextlib.contextmanager
+    def timer(
+        self,
+        stage: str,
+    ) -> Iterator[None]:
+        """
+        Context manager that adds the duration of its body to a *stage*.
+        """
+        import time
+
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - t0)
+
+    def to_dict(self) -> dict[str, dict[str, Any]]:
+        """
+        Returns a json serializable dictionary with durations in seconds, calls and counters.
+        """
+        with self._lock:
+            return {
+                "durations": dict(self.durations),
+                "calls": dict(self.calls),
+                "counts": dict(self.counts),
+            }
+
+    def format(self) -> str:
+        """
+        Returns a human readable table of durations in milliseconds, calls and counters.
+        """
+        data = self.to_dict()
+        lines = [f"{'stage':<16} {'time [ms]':>9} {'calls':>7}"]
+        for stage, duration in data["durations"].items():
+            lines.append(f"{stage:<16} {duration * 1e3:>9.3f} {data['calls'][stage]:>7}")
+        if data["counts"]:
+            lines.extend(["", f"{'counter':<16} {'value':>9}"])
+            for counter, value in data["counts"].items():
+                lines.append(f"{counter:<16} {value:>9}")
+
+        return "\n".join(lines)
+
+
+def _timer(
+    stats: Stats | None,
+    stage: str,
+) -> ContextManager[None]:
+    # timer of a stage when stats are collected, and a no-op otherwise
+    return contextlib.nullcontext() if stats is None else stats.timer(stage)
+
+
+def _measure_iter(
+    iterable: Iterable[Any],
+    durations: dict[str, float] | None,
+    stage: str,
+    exclude: str | None = None,
+) -> Iterable[Any]:
+    # adds the time spent in an iterable to durations[stage], excluding time that is added to
+    # durations[exclude] in the meantime
+    if durations is None:
+        return iterable
+
+    import time
+
+    def measure(it: Iterator[Any]) -> Iterator[Any]:
+        while True:
+            excluded = durations[exclude] if exclude else 0.0
+            t0 = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            finally:
+                excluded = (durations[exclude] - excluded) if exclude else 0.0
+                durations[stage] += time.perf_counter() - t0 - excluded
+            yield item
+
+    return measure(iter(iterable))
+
+
+def _measure_func(
+    func: Callable[[type], str],
+    durations: dict[str, float],
+    stage: str,
+) -> Callable[[type], str]:
+    # adds the time spent in func to durations[stage]
+    import time
+
+    @functools.wraps(func)
+    def wrapper(cls: type) -> str:
+        t0 = time.perf_counter()
+        try:
+            return func(cls)
+        finally:
+            durations[stage] += time.perf_counter() - t0
+
+    return wrapper
+
+
+def iter_relations(
+    root_cls: type,
+    max_depth: int = -1,
+    direction: str = "up",
+    max_nodes: int = -1,
+) -> Iterator[Relation]:
+    """
+    Generator that recursively extracts base classes of a *root_cls* down to a maximum depth
+    *max_depth* and yields :py:class:`Relation` objects as soon as they are discovered. When
+    *max_depth* is negative, the lookup is fully recursive, possibly down to ``object``.
+
+    The *direction* of the lookup can be ``"up"`` to follow base classes, ``"down"`` to follow
+    subclasses via ``__subclasses__()``, or ``"both"``, in which case base classes are looked up
+    first. Relations to subclasses have negative depth values and the mro index of their base class
+    is -1 unless it is the *root_cls*. Since subclass hierarchies can be huge, the traversal is
+    stopped once *max_nodes* classes, including *root_cls*, are reached when non-negative.
+
+    :param root_cls: The root class to use.
+    :param max_depth: Maximum recursion depth.
+    :param direction: The lookup direction, ``"up"``, ``"down"`` or ``"both"``.
+    :param max_nodes: Maximum number of classes to visit.
+    :return: Iterator over found :py:class:`Relation` objects.
+    """
+    if direction not in ("up", "down", "both"):
+        raise ValueError(f"invalid direction '{direction}'")
+
+    # stop early
+    if max_depth == 0 or max_nodes == 1:
+        return
+
+    # get the mro
+    mro = {cls: i for i, cls in enumerate(root_cls.__mro__)}
+
+    # classes visited so far, only tracked when there is a budget
+    nodes = {root_cls} if max_nodes >= 0 else None
+
+    # breadth-first traversal with a deque as lookup pattern, deduplicating classes as soon as they
+    # enter the frontier rather than when they leave it, so that each class is queued and expanded
+    # exactly once and the complexity is linear in the number of classes and edges
+    if direction in ("up", "both"):
+        lookup = collections.deque([(root_cls, 0)])
+        queued = {root_cls}
+        while lookup:
+            cls, depth = lookup.popleft()
+
+            # handle base classes
+            for base_cls in cls.__bases__:
+                # stop when the budget is exhausted
+                if nodes is not None and base_cls not in nodes:
+                    if len(nodes) >= max_nodes:
+                        return
+                    nodes.add(base_cls)
+
+                # yield class relation, starting at depth 1
+                yield Relation(cls, base_cls, root_cls, depth + 1, mro.get(base_cls, -1))
+
+                # ammend lookup when depth below maximum and not queued yet
+                if (max_depth < 0 or depth + 1 < max_depth) and base_cls not in queued:
+                    lookup.append((base_cls, depth + 1))
+                    queued.add(base_cls)
+
+    # same traversal for subclasses
+    if direction in ("down", "both"):
+        lookup = collections.deque([(root_cls, 0)])
+        queued = {root_cls}
+        while lookup:
+            cls, depth = lookup.popleft()
+
+            # handle subclasses, using the unbound method to support metaclasses
+            for sub_cls in type.__subclasses__(cls):
+                # stop when the budget is exhausted
+                if nodes is not None and sub_cls not in nodes:
+                    if len(nodes) >= max_nodes:
+                        return
+                    nodes.add(sub_cls)
+
+                # yield class relation, starting at depth -1
+                yield Relation(sub_cls, cls, root_cls, -(depth + 1), mro.get(cls, -1))
+
+                # ammend lookup when depth below maximum and not queued yet
+                if (max_depth < 0 or depth + 1 < max_depth) and sub_cls not in queued:
+                    lookup.append((sub_cls, depth + 1))
+                    queued.add(sub_cls)
+
 
 def get_relations(
     root_cls: type,
     max_depth: int = -1,
-) -> list[Relation]:
+    direction: str = "up",
+    max_nodes: int = -1,
+    compact: bool = False,
+) -> list[Relation] | CompactRelations:
     """
     Recursively extracts base classes of a *root_cls* down to a maximum depth *max_depth* and
     returns them in a list of :py:class:`Relation` objects. When *max_depth* is negative, the lookup
-    is fully recursive, possibly down to ``object``.
+    is fully recursive, possibly down to ``object``. See :py:func:`iter_relations` for a lazy
+    variant and more info on *direction* and *max_nodes*. When *compact* is *True*, relations are
+    stored in a memory efficient :py:class:`CompactRelations` container instead.
 
     :param root_cls: The root class to use.
     :param max_depth: Maximum recursion depth.
+    :param direction: The lookup direction, ``"up"``, ``"down"`` or ``"both"``.
+    :param max_nodes: Maximum number of classes to visit.
+    :param compact: Whether to return a :py:class:`CompactRelations` container.
     :return: The list of found :py:class:`Relation` objects.
     """
-    # stop early
-    if max_depth == 0:
-        return []
+    relations = iter_relations(
+        root_cls,
+        max_depth=max_depth,
+        direction=direction,
+        max_nodes=max_nodes,
+    )
 
-    # get the mro
-    mro = {cls: i for i, cls in enumerate(root_cls.__mro__)}
+    if compact:
+        compact_relations = CompactRelations(root_cls)
+        for rel in relations:
+            compact_relations.append(rel.cls, rel.base_cls, rel.depth, rel.mro)
+        compact_relations.compress()
+        return compact_relations
 
-    # iterate recursively with lookup pattern
-    lookup = [(root_cls, 0)]
-    seen = set()
-    relations = []
-    while lookup:
-        cls, depth = lookup.pop(0)
+    return list(relations)
 
-        # skip when cls already handled
-        if cls in seen:
-            continue
 
-        # handle base classes
-        for base_cls in cls.__bases__:
-            # add class relation, starting at depth 1
-            relations.append(Relation(cls, base_cls, root_cls, depth + 1, mro.get(base_cls, -1)))
+class CompactRelations(object):
+    """
+    Columnar container of relations of a *root_cls*, storing a shared table of classes and
+    parallel arrays of class ids, base class ids, depths and mro indices instead of one
+    :py:class:`Relation` object per edge, which considerably reduces the memory footprint of large
+    graphs. For compatibility, the container can be iterated, indexed and sliced like a list,
+    creating :py:class:`Relation` objects on the fly, with slices returning lists.
+
+    .. code-block:: python
+
+        relations = get_relations(root_cls, compact=True)
+        len(relations)
+        # -> 5
+        relations[0]
+        # -> Relation(cls=..., base_cls=..., root_cls=..., depth=1, mro=1)
+
+    :param root_cls: The root class of all relations.
+    """
+
+    __slots__ = ("root_cls", "classes", "cls_ids", "base_ids", "depths", "mros", "_ids")
+
+    def __init__(
+        self,
+        root_cls: type,
+    ) -> None:
+        super().__init__()
+
+        import array
+
+        self.root_cls = root_cls
+        self.classes: list[type] = []
+        self.cls_ids = array.array("i")
+        self.base_ids = array.array("i")
+        self.depths = array.array("i")
+        self.mros = array.array("i")
+        self._ids: dict[type, int] | None = {}
+
+    def _id(
+        self,
+        cls: type,
+    ) -> int:
+        # get the id of a class, adding it to the table if necessary
+        if self._ids is None:
+            self._ids = {cls: cls_id for cls_id, cls in enumerate(self.classes)}
+        cls_id = self._ids.get(cls)
+        if cls_id is None:
+            cls_id = self._ids[cls] = len(self.classes)
+            self.classes.append(cls)
+        return cls_id
+
+    def append(
+        self,
+        cls: type,
+        base_cls: type,
+        depth: int,
+        mro: int,
+    ) -> None:
+        """
+        Appends a relation between *cls* and its *base_cls* with a *depth* value and the *mro* index
+        of *base_cls* with respect to the root class.
+
+        :param cls: The class.
+        :param base_cls: The base class.
+        :param depth: The depth of the relation.
+        :param mro: The mro index of the base class.
+        """
+        self.cls_ids.append(self._id(cls))
+        self.base_ids.append(self._id(base_cls))
+        self.depths.append(depth)
+        self.mros.append(mro)
+
+    def compress(self) -> None:
+        """
+        Releases the lookup table of class ids that is only needed while appending relations and
+        that is recreated on demand.
+        """
+        self._ids = None
+
+    def __len__(self) -> int:
+        return len(self.cls_ids)
+
+    def __getitem__(self, index: int | slice) -> Relation | list[Relation]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return Relation(
+            self.classes[self.cls_ids[index]],
+            self.classes[self.base_ids[index]],
+            self.root_cls,
+            self.depths[index],
+            self.mros[index],
+        )
 
-            # ammend lookup when depth below maximum
-            if max_depth < 0 or depth + 1 < max_depth:
-                lookup.append((base_cls, depth + 1))
+    def __iter__(self) -> Iterator[Relation]:
+        classes, root_cls = self.classes, self.root_cls
+        for cls_id, base_id, depth, mro in zip(self.cls_ids, self.base_ids, self.depths, self.mros):
+            yield Relation(classes[cls_id], classes[base_id], root_cls, depth, mro)
 
-        # mark as seen
-        seen.add(cls)
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, CompactRelations):
+            other = list(other)
+        return isinstance(other, list) and list(self) == other
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} root_cls={self.root_cls} len={len(self)}>"
+
+
+def get_relations_multi(
+    root_classes: Iterable[type],
+    max_depth: int = -1,
+    merge: bool = False,
+) -> dict[type, list[Relation]]:
+    """
+    Extracts relations for multiple *root_classes* and returns them in a dictionary mapping root
+    classes to lists of :py:class:`Relation` objects. Without *merge*, each list is identical to
+    the one returned by :py:func:`get_relations`. Since the order and depths of relations depend on
+    the traversal starting at each root class, the hierarchy is walked separately per root class in
+    this case, and no work is shared across roots.
+
+    When *merge* is *True*, the union hierarchy of all root classes is walked only once with a
+    visited state that is shared across roots, so that classes already expanded for a previous root
+    are not walked again. Each relation is then only contained in the list of the first root class
+    that reaches it, with *depth* and *mro* values referring to that root class, and the
+    concatenation of all lists forms a graph without duplicate edges. When a class is reached by
+    a later root on a shorter path and *max_depth* is positive, its base classes are still followed
+    up to the depth allowed for that root.
+
+    :param root_classes: The root classes to use.
+    :param max_depth: Maximum recursion depth.
+    :param merge: Whether relations should be merged across root classes.
+    :return: Dictionary mapping root classes to lists of found :py:class:`Relation` objects.
+    """
+    root_classes = list(root_classes)
+
+    # simple case without merging
+    if not merge:
+        return {
+            root_cls: get_relations(root_cls, max_depth=max_depth)
+            for root_cls in root_classes
+        }
+
+    # shared state across roots, storing the smallest depth at which classes were queued and the
+    # classes whose relations were already added
+    depths: dict[type, int] = {}
+    expanded: set[type] = set()
+    relations: dict[type, list[Relation]] = {}
+    for root_cls in root_classes:
+        relations[root_cls] = root_relations = []
+
+        # stop early, also when the root class was already fully handled as part of a previous one
+        if max_depth == 0 or (root_cls in depths and (max_depth < 0 or depths[root_cls] == 0)):
+            continue
+
+        # get the mro
+        mro = {cls: i for i, cls in enumerate(root_cls.__mro__)}
+
+        # breadth-first traversal as in iter_relations, but with shared state
+        lookup = collections.deque([(root_cls, 0)])
+        depths[root_cls] = 0
+        while lookup:
+            cls, depth = lookup.popleft()
+
+            # add relations only once across roots
+            add_relations = cls not in expanded
+            expanded.add(cls)
+
+            # handle base classes
+            for base_cls in cls.__bases__:
+                # add class relation, starting at depth 1
+                if add_relations:
+                    root_relations.append(
+                        Relation(cls, base_cls, root_cls, depth + 1, mro.get(base_cls, -1)),
+                    )
+
+                # ammend lookup when depth below maximum and not queued yet, or only with a larger
+                # depth that might have prevented the lookup of further base classes
+                if max_depth < 0:
+                    queue = base_cls not in depths
+                else:
+                    queue = depth + 1 < max_depth and depths.get(base_cls, max_depth) > depth + 1
+                if queue:
+                    lookup.append((base_cls, depth + 1))
+                    depths[base_cls] = depth + 1
 
     return relations
 
 
+def reduce_relations(
+    relations: Iterable[Relation],
+    transitive: bool = True,
+    collapse_chains: bool = False,
+    hide: Iterable[type] | None = None,
+    min_chain: int = 2,
+) -> tuple[list[Relation], dict[type, list[type]]]:
+    """
+    Reduces the graph formed by *relations* to make large hierarchies easier to read and render,
+    and returns the remaining relations in their original order as well as a dictionary describing
+    collapsed chains. Root classes are never removed. Example:
+
+    .. code-block:: python
+
+        class A(object): pass
+        class B(A): pass
+        class C(B): pass
+        class D(C, A): pass
+
+        relations, chains = reduce_relations(get_relations(D), collapse_chains=True, hide=[object])
+        # relations: [Relation(cls=D, base_cls=C, ...)]
+        # chains: {C: [C, B, A]}
+
+    Relations with classes in *hide* are removed first. When *transitive* is *True*, the
+    transitive reduction is computed, removing relations to base classes that are also reached
+    through another base class, e.g. ``A`` in ``class D(C, A)`` when ``C`` already inherits from
+    ``A``. Only classes with multiple bases are checked, walking the ancestors of their bases
+    no further than the lowest of these bases in topological order, so that the cost stays close
+    to linear in the number of relations for typical hierarchies. When
+    *collapse_chains* is *True*, linear chains of at least *min_chain* classes with exactly one
+    base and one subclass in the graph are collapsed into their first class, i.e., the one closest
+    to the root class. The relation to the base class of the last class of each chain is moved to
+    the first class, and the returned dictionary maps first classes to all classes of their chains.
+
+    :param relations: The relations to reduce.
+    :param transitive: Whether to remove transitively redundant relations.
+    :param collapse_chains: Whether to collapse linear chains of classes.
+    :param hide: Classes to remove from the graph.
+    :param min_chain: Minimum number of classes of chains to collapse.
+    :return: The remaining relations and the dictionary of collapsed chains.
+    """
+    relations = list(relations)
+    roots = {rel.root_cls for rel in relations}
+
+    # remove hidden classes
+    hide = set(hide or ()) - roots
+    if hide:
+        relations = [
+            rel for rel in relations
+            if rel.cls not in hide and rel.base_cls not in hide
+        ]
+
+    if transitive:
+        relations = _transitive_reduction(relations)
+
+    chains: dict[type, list[type]] = {}
+    if collapse_chains:
+        relations, chains = _collapse_chains(relations, roots, min_chain)
+
+    return relations, chains
+
+
+def _transitive_reduction(
+    relations: list[Relation],
+) -> list[Relation]:
+    # bases and subclasses per class
+    bases: dict[type, list[type]] = collections.defaultdict(list)
+    subs: dict[type, list[type]] = collections.defaultdict(list)
+    for rel in relations:
+        bases[rel.cls].append(rel.base_cls)
+        subs[rel.base_cls].append(rel.cls)
+
+    # only classes with multiple bases can have redundant relations
+    if all(len(cls_bases) < 2 for cls_bases in bases.values()):
+        return relations
+
+    # rank classes in topological order starting at classes without bases, so that ancestors
+    # always have a lower rank than their subclasses
+    n_bases = {cls: len(cls_bases) for cls, cls_bases in bases.items()}
+    lookup = collections.deque(cls for cls in subs if cls not in n_bases)
+    rank: dict[type, int] = {}
+    while lookup:
+        cls = lookup.popleft()
+        rank[cls] = len(rank)
+        for sub_cls in subs.get(cls, ()):
+            n_bases[sub_cls] -= 1
+            if not n_bases[sub_cls]:
+                lookup.append(sub_cls)
+
+    # a base of a class with multiple bases is redundant when it is an ancestor of another base,
+    # so walk the ancestors of its bases, skipping classes ranked lower than all bases as none of
+    # their ancestors can be a base, which bounds the walk to the region between the bases
+    redundant: set[tuple[type, type]] = set()
+    for cls, cls_bases in bases.items():
+        if len(cls_bases) < 2:
+            continue
+        min_rank = min(rank[base_cls] for base_cls in cls_bases)
+        stack = [
+            ancestor
+            for base_cls in cls_bases
+            for ancestor in bases.get(base_cls, ())
+            if rank[ancestor] >= min_rank
+        ]
+        visited = set(stack)
+        while stack:
+            ancestor = stack.pop()
+            for base_cls in bases.get(ancestor, ()):
+                if base_cls not in visited and rank[base_cls] >= min_rank:
+                    visited.add(base_cls)
+                    stack.append(base_cls)
+        redundant.update((cls, base_cls) for base_cls in cls_bases if base_cls in visited)
+
+    return [rel for rel in relations if (rel.cls, rel.base_cls) not in redundant]
+
+
+def _collapse_chains(
+    relations: list[Relation],
+    roots: set[type],
+    min_chain: int,
+) -> tuple[list[Relation], dict[type, list[type]]]:
+    # indices of relations to bases and subclasses per class
+    bases: dict[type, list[int]] = collections.defaultdict(list)
+    subs: dict[type, list[int]] = collections.defaultdict(list)
+    for i, rel in enumerate(relations):
+        bases[rel.cls].append(i)
+        subs[rel.base_cls].append(i)
+
+    def linear(cls: type) -> bool:
+        return cls not in roots and len(bases.get(cls, ())) <= 1 and len(subs.get(cls, ())) == 1
+
+    # find chains starting at linear classes whose subclass is not linear
+    chains: dict[type, list[type]] = {}
+    removed: set[int] = set()
+    moved: dict[int, Relation] = {}
+    for cls in list(subs):
+        if not linear(cls) or linear(relations[subs[cls][0]].cls):
+            continue
+        chain = [cls]
+        while bases.get(chain[-1]) and linear(relations[bases[chain[-1]][0]].base_cls):
+            chain.append(relations[bases[chain[-1]][0]].base_cls)
+        if len(chain) < min_chain:
+            continue
+
+        # remove relations within the chain and move the relation of the last class to the first
+        chains[cls] = chain
+        removed.update(bases[chain_cls][0] for chain_cls in chain[:-1])
+        if bases.get(chain[-1]):
+            i = bases[chain[-1]][0]
+            moved[i] = relations[i]._replace(cls=cls)
+
+    relations = [moved.get(i, rel) for i, rel in enumerate(relations) if i not in removed]
+
+    return relations, chains
+
+
 def get_default_name_func(
     skip_modules: list[str] | set[str] | None = None,
+    cache_size: int | None = 4096,
 ) -> Callable[[type], str]:
     """
     Returns a function that takes an arbitrary class and extracts its name representation, usually
@@ -110,7 +757,14 @@ def get_default_name_func(
     of patterns matching module names that are not preprended. Please note that ``builtins`` and
     ``__main__`` are always skipped.
 
+    All patterns are compiled into a single regular expression once, and the decision whether a
+    module is skipped is cached per module name. Names of classes are cached as well, using a least
+    recently used cache with a maximum number of *cache_size* entries (unbounded when *None*). The
+    statistics and the clearing method of that cache are available via the ``cache_info`` and
+    ``cache_clear`` attributes of the returned function.
+
     :param skip_modules: Optional squence of module names (or patterns) to skip.
+    :param cache_size: Maximum number of class names to cache.
     :return: Function that takes a class and returns the name for visualization.
     """
     # default list of module names to skip
@@ -119,27 +773,47 @@ def get_default_name_func(
     # always skip certain modules
     skip_modules |= {"builtins", "__main__"}
 
+    # combine all patterns into a single expression
+    skip_re = re.compile("|".join(f"(?:{fnmatch.translate(m)})" for m in sorted(skip_modules)))
+
+    # cache of skip decisions per module name
+    skip_cache: dict[str, bool] = {}
+
+    @functools.lru_cache(maxsize=cache_size)
+    def cls_name(cls: type) -> str:
+        module = cls.__module__
+        if module:
+            skip = skip_cache.get(module)
+            if skip is None:
+                skip = skip_cache[module] = skip_re.match(module) is not None
+            if not skip:
+                return f"{module}.{cls.__qualname__}"
+
+        return cls.__qualname__
+
     def name_func(cls: type) -> str:
         if isinstance(cls, str):
             return cls
 
-        if cls.__module__ and not any(fnmatch.fnmatch(cls.__module__, m) for m in skip_modules):
-            return f"{cls.__module__}.{cls.__qualname__}"
+        return cls_name(cls)
 
-        return cls.__qualname__
+    # expose cache handles
+    name_func.cache_info = cls_name.cache_info
+    name_func.cache_clear = cls_name.cache_clear
 
     return name_func
 
 
-def get_style_text(
+def iter_style_lines(
     styles: list[Style | tuple],
     indentation: str = "    ",
     name_func: Callable[[type], str] | None = None,
     skip_modules: list[str] | set[str] | None = None,
-    join_lines: bool = True,
-) -> str | list[str]:
+    classes: Iterable[type] | None = None,
+    group: bool = False,
+) -> Iterator[str]:
     """
-    Creates the string representation of style statements for mermaid graphs consisting of style
+    Generator that lazily yields lines of style statements for mermaid graphs consisting of style
     definitions followed by assignments to graph nodes. *styles* should be a sequence of
     :py:class:`Style` objects (or tuples that can be interpreted as such) containing the name of the
     style, the name(s) of the class(es) it is applied to, and one or multiple css-like strings, e.g.
@@ -147,10 +821,10 @@ def get_style_text(
 
     .. code-block:: python
 
-        get_style_text([
+        list(iter_style_lines([
             Style(name="Bold", cls=["ClassA", "ClassB"], css=["stroke-width: 3px"]),
             Style(name="Colored", cls="ClassA", css=["stroke-width: 3px", "stroke: #83b"]),
-        ])
+        ]))
 
         #    classDef Bold stroke-width: 3px
         #    classDef Colored stroke-width: 3px, stroke: #83b
@@ -159,13 +833,33 @@ def get_style_text(
         #    class ClassB Bold
         #    class ClassA Colored
 
+    Instead of explicit classes, styles can contain :py:class:`Selector` objects or predicates
+    that are evaluated in a single pass over the nodes of the graph given in *classes*, e.g.
+    ``Style("Ext", Selector(module="numpy.*"), "fill: #ddd")``. The name of each class is resolved
+    only once, regardless of the number of styles it is assigned to.
+
+    When *group* is *True*, all classes of a style are assigned in a single, comma-separated
+    statement, and styles with identical css are merged into the definition of the first one:
+
+    .. code-block:: python
+
+        list(iter_style_lines([
+            Style(name="Bold", cls=["ClassA", "ClassB"], css=["stroke-width: 3px"]),
+            Style(name="Thick", cls="ClassC", css=["stroke-width: 3px"]),
+        ], group=True))
+
+        #    classDef Bold stroke-width: 3px
+        #
+        #    class ClassA,ClassB,ClassC Bold
+
     :param styles: Sequence of :py:class:`Style` objects or tuples that can be interpreted as such.
     :param indentation: The indentation of lines.
     :param name_func: A function to extract the string representation of a class, defaulting to the
         return value of :py:func:`get_default_name_func` passing *skip_modules*.
     :param skip_modules: Sequence of module names (or patterns) to skip when no *name_func* is set.
-    :param join_lines: Whether generated lines should be joined to a string.
-    :return: The style as a text representation or as single lines in a list.
+    :param classes: The classes in the graph, required when styles contain selectors.
+    :param group: Whether to group assignments per style and merge identical definitions.
+    :return: Iterator over lines of the style text.
     """
     # default name_func
     if name_func is None:
@@ -177,27 +871,458 @@ def get_style_text(
         for style in styles
     ]
 
-    # style definitions
-    lines = []
+    # style definitions, mapping names of merged styles to the first one with identical css
+    style_names: dict[str, str] = {}
+    css_names: dict[str, str] = {}
     for style in styles:
         attr_str = (
             style.css
             if isinstance(style.css, str)
             else ", ".join(style.css)
         )
-        lines.append(f"{indentation}classDef {style.name} {attr_str}")
+        if group:
+            if attr_str in css_names:
+                style_names.setdefault(style.name, css_names[attr_str])
+                continue
+            css_names[attr_str] = style_names[style.name] = style.name
+        yield f"{indentation}classDef {style.name} {attr_str}"
 
     # empty line
-    lines.append("")
+    yield ""
+
+    # resolve names of all assigned classes once
+    names: dict[Any, str] = {}
+    style_classes = _select_style_classes(styles, classes)
+    for style_cls in style_classes:
+        for cls in style_cls:
+            if cls not in names:
+                names[cls] = name_func(cls)
 
     # class assignments
-    for style in styles:
-        classes = style.cls if isinstance(style.cls, (list, tuple, set)) else [style.cls]
-        for cls in classes:
-            lines.append(f"{indentation}class {name_func(cls)} {style.name}")
+    if not group:
+        for style, style_cls in zip(styles, style_classes):
+            for cls in style_cls:
+                yield f"{indentation}class {names[cls]} {style.name}"
+        return
+
+    # grouped class assignments, keeping the order of first occurrences
+    groups: dict[str, dict[str, None]] = {}
+    for style, style_cls in zip(styles, style_classes):
+        group_names = groups.setdefault(style_names[style.name], {})
+        for cls in style_cls:
+            group_names[names[cls]] = None
+    for style_name, group_names in groups.items():
+        if group_names:
+            yield f"{indentation}class {','.join(group_names)} {style_name}"
+
+
+def _select_style_classes(
+    styles: list[Style],
+    classes: Iterable[type] | None,
+) -> list[list[Any]]:
+    # classes per style, replacing selectors and predicates by the matching classes which are
+    # determined in a single pass over all classes
+    entries = [
+        list(style.cls)
+        if isinstance(style.cls, (list, tuple, set)) and not isinstance(style.cls, Selector)
+        else [style.cls]
+        for style in styles
+    ]
+
+    # collect selectors, converting glob patterns into expressions
+    selectors: dict[int, tuple[Any, Any, Callable[[type], bool] | None]] = {}
+    for style_entries in entries:
+        for entry in style_entries:
+            if isinstance(entry, Selector):
+                selectors[id(entry)] = (
+                    entry.module and re.compile(fnmatch.translate(entry.module)).match,
+                    entry.name and re.compile(fnmatch.translate(entry.name)).match,
+                    entry.func,
+                )
+            elif callable(entry) and not isinstance(entry, type):
+                selectors[id(entry)] = (None, None, entry)
+    if not selectors:
+        return entries
+    if classes is None:
+        raise ValueError("style selectors require the classes of the graph")
+
+    # evaluate all selectors in a single pass
+    matches: dict[int, list[type]] = {key: [] for key in selectors}
+    for cls in classes:
+        module, name = cls.__module__, cls.__qualname__
+        for key, (match_module, match_name, func) in selectors.items():
+            if (
+                (not match_module or match_module(module)) and
+                (not match_name or match_name(name)) and
+                (not func or func(cls))
+            ):
+                matches[key].append(cls)
+
+    return [
+        [
+            cls
+            for entry in style_entries
+            for cls in (matches[id(entry)] if id(entry) in matches else [entry])
+        ]
+        for style_entries in entries
+    ]
+
+
+def get_style_text(
+    styles: list[Style | tuple],
+    indentation: str = "    ",
+    name_func: Callable[[type], str] | None = None,
+    skip_modules: list[str] | set[str] | None = None,
+    join_lines: bool = True,
+    classes: Iterable[type] | None = None,
+    group: bool = False,
+) -> str | list[str]:
+    """
+    Creates the string representation of style statements for mermaid graphs consisting of style
+    definitions followed by assignments to graph nodes. See :py:func:`iter_style_lines` for more
+    info.
+
+    :param styles: Sequence of :py:class:`Style` objects or tuples that can be interpreted as such.
+    :param indentation: The indentation of lines.
+    :param name_func: A function to extract the string representation of a class, defaulting to the
+        return value of :py:func:`get_default_name_func` passing *skip_modules*.
+    :param skip_modules: Sequence of module names (or patterns) to skip when no *name_func* is set.
+    :param join_lines: Whether generated lines should be joined to a string.
+    :param classes: The classes in the graph, required when styles contain selectors.
+    :param group: Whether to group assignments per style and merge identical definitions.
+    :return: The style as a text representation or as single lines in a list.
+    """
+    lines = iter_style_lines(
+        styles,
+        indentation=indentation,
+        name_func=name_func,
+        skip_modules=skip_modules,
+        classes=classes,
+        group=group,
+    )
 
     # join or return as list of lines
-    return "\n".join(lines) if join_lines else lines
+    return "\n".join(lines) if join_lines else list(lines)
+
+
+def iter_mermaid_lines(
+    root_cls: type,
+    max_depth: int = -1,
+    styles: list[Style | tuple] | None = None,
+    show_mro: bool = True,
+    graph_type: str = "TD",
+    arrow_type: str = "-->",
+    indentation: str = "    ",
+    skip_func: Callable[[type, Callable], bool] | None = None,
+    name_func: Callable[[type], str] | None = None,
+    skip_modules: list[str] | set[str] | None = None,
+    direction: str = "up",
+    max_nodes: int = -1,
+    group_styles: bool = False,
+    reduce_edges: bool = False,
+    collapse_chains: bool = False,
+    hide_bases: bool | Iterable[type] = False,
+    relations_cache: dict[tuple, list[Relation]] | None = None,
+    stats: Stats | None = None,
+) -> Iterator[str]:
+    """
+    Generator that lazily yields lines of the text representation of the inheritance graph for a
+    *root_cls*, down to a maximum recursion depth *max_depth*. Relations are converted to lines as
+    soon as they are discovered so that even huge graphs can be streamed with constant memory. When
+    *styles* is given, the representation contains style statements generated via
+    :py:func:`iter_style_lines`. When *show_mro* is *True*, mro indices with respect to *root_cls*
+    are shown. The type of the graph and style of arrows can be controlled with *graph_type* and
+    *arrow_type*. Subclasses can be included via *direction*, see :py:func:`iter_relations`. See
+    :py:func:`get_mermaid_text` for an example.
+
+    Large graphs can be reduced via *reduce_edges*, *collapse_chains* and *hide_bases*, see
+    :py:func:`reduce_relations`. In this case, relations are collected before lines are yielded.
+    *hide_bases* can be a sequence of classes or *True* to hide :py:data:`UBIQUITOUS_BASES`.
+    Collapsed chains are shown as single nodes labeled with the first and last class of the chain
+    and the number of classes.
+
+    When *relations_cache* is given, relations are stored in and reused from this dictionary per
+    root class and traversal options, so that repeated calls for the same classes skip the
+    traversal. Entries are not invalidated when subclasses are created or classes are reloaded.
+
+    When *stats* is given, the durations of the ``relations``, ``names``, ``styles`` and
+    ``reduce`` stages as well as the numbers of graphs, nodes, edges and lines are added once all
+    lines were consumed.
+
+    :param root_cls: The root class to use.
+    :param max_depth: Maximum recursion depth for the lookup in :py:func:`get_relations`.
+    :param styles: Sequence of :py:class:`Style` objects or tuples that can be interpreted as such.
+    :param show_mro: Whether mro indices should be included.
+    :param graph_type: The mermaid graph type to use, e.g. ``"TD"`` or ``"LR"``.
+    :param arrow_type: The default arrow type to use between classes, e.g. ``"-->"``.
+    :param indentation: The indentation of lines.
+    :param skip_func: A function to decide whether a specific base class should be skipped given
+        the class itself and the *name_func* as arguments.
+    :param name_func: A function to extract the string representation of a class, defaulting to the
+        return value of :py:func:`get_default_name_func` passing *skip_modules*.
+    :param skip_modules: Sequence of module names (or patterns) to skip when no *name_func* is set.
+    :param direction: The lookup direction, ``"up"``, ``"down"`` or ``"both"``.
+    :param max_nodes: Maximum number of classes to visit.
+    :param group_styles: Whether to group style assignments, see :py:func:`iter_style_lines`.
+    :param reduce_edges: Whether to remove transitively redundant relations.
+    :param collapse_chains: Whether to collapse linear chains of classes into single nodes.
+    :param hide_bases: Classes to hide, or *True* to hide :py:data:`UBIQUITOUS_BASES`.
+    :param relations_cache: Optional dictionary for caching relations across calls.
+    :param stats: Optional :py:class:`Stats` object to add durations and counters to.
+    :return: Iterator over lines of the graph text.
+    """
+    # default name_func
+    if name_func is None:
+        name_func = get_default_name_func(skip_modules=skip_modules)
+
+    # measure durations of stages when requested
+    durations = None
+    if stats is not None:
+        durations = collections.defaultdict(float)
+        name_func = _measure_func(name_func, durations, "names")
+
+    # relations of the traversal, optionally cached across calls
+    relations_kwargs = {"max_depth": max_depth, "direction": direction, "max_nodes": max_nodes}
+
+    def iter_graph_relations() -> Iterator[Relation]:
+        if relations_cache is None:
+            yield from iter_relations(root_cls, **relations_kwargs)
+            return
+        key = (root_cls, max_depth, direction, max_nodes)
+        if key not in relations_cache:
+            relations_cache[key] = list(iter_relations(root_cls, **relations_kwargs))
+        yield from relations_cache[key]
+
+    # determine pairs of mro indices and classes to label
+    mro_pairs = None
+    relations: Iterable[Relation] = iter_graph_relations()
+    if show_mro:
+        if max_depth < 0 and max_nodes < 0 and direction != "down":
+            # all classes in the mro are reached in a fully recursive lookup
+            mro_pairs = enumerate(root_cls.__mro__)
+        else:
+            # determine the base classes that are reached within the maximum depth and budget,
+            # materializing the relations once so that they are reused for the edges
+            relations = list(_measure_iter(relations, durations, "relations"))
+            mro_pairs = {(0, root_cls)} | {
+                (rel.mro, rel.base_cls)
+                for rel in relations
+                if rel.depth > 0
+            }
+            mro_pairs = sorted(mro_pairs, key=lambda tpl: tpl[0])
+
+    # reduce the graph
+    labels = None
+    if reduce_edges or collapse_chains or hide_bases:
+        mro_pairs, relations, labels, styles = _reduce_graph(
+            root_cls,
+            mro_pairs,
+            relations,
+            skip_func=skip_func,
+            name_func=name_func,
+            reduce_edges=reduce_edges,
+            collapse_chains=collapse_chains,
+            hide_bases=UBIQUITOUS_BASES if hide_bases is True else hide_bases,
+            styles=styles,
+            durations=durations,
+        )
+        skip_func = None
+
+    if stats is None:
+        yield from _iter_graph_lines(
+            mro_pairs,
+            relations,
+            styles=styles,
+            graph_type=graph_type,
+            arrow_type=arrow_type,
+            indentation=indentation,
+            skip_func=skip_func,
+            name_func=name_func,
+            group_styles=group_styles,
+            labels=labels,
+        )
+        return
+
+    # count nodes and edges of the traversal as well as lines
+    classes = {root_cls}
+    n_edges = n_lines = 0
+
+    def count(relations: Iterable[Relation]) -> Iterator[Relation]:
+        nonlocal n_edges
+        for rel in relations:
+            classes.add(rel.cls)
+            classes.add(rel.base_cls)
+            n_edges += 1
+            yield rel
+
+    try:
+        for line in _iter_graph_lines(
+            mro_pairs,
+            count(relations),
+            styles=styles,
+            graph_type=graph_type,
+            arrow_type=arrow_type,
+            indentation=indentation,
+            skip_func=skip_func,
+            name_func=name_func,
+            group_styles=group_styles,
+            labels=labels,
+            durations=durations,
+        ):
+            n_lines += 1
+            yield line
+    finally:
+        for stage, duration in durations.items():
+            stats.add_time(stage, duration)
+        stats.add("graphs")
+        stats.add("nodes", len(classes))
+        stats.add("edges", n_edges)
+        stats.add("lines", n_lines)
+
+
+def _iter_graph_lines(
+    mro_pairs: Iterable[tuple[int, type]] | None,
+    relations: Iterable[Relation],
+    styles: list[Style | tuple] | None,
+    graph_type: str,
+    arrow_type: str,
+    indentation: str,
+    skip_func: Callable[[type, Callable], bool] | None,
+    name_func: Callable[[type], str],
+    group_styles: bool = False,
+    labels: dict[type, str] | None = None,
+    durations: dict[str, float] | None = None,
+) -> Iterator[str]:
+    # classes in the graph for evaluating style selectors
+    classes: dict[type, None] | None = {} if styles else None
+
+    # start the graph
+    yield f"graph {graph_type}"
+
+    # add labels with mro indices, followed by custom labels of classes without mro indices
+    if labels:
+        mro_pairs = list(mro_pairs or [])
+        labeled = {cls for _, cls in mro_pairs}
+        mro_pairs.extend((None, cls) for cls in labels if cls not in labeled)
+    if mro_pairs is not None:
+        for mro, cls in mro_pairs:
+            name = name_func(cls)
+            label = labels.get(cls) if labels else None
+            yield f"{indentation}{name}(\"{label or f'{name} ({mro})'}\")"
+            if classes is not None:
+                classes[cls] = None
+        yield ""
+
+    # add relations
+    for rel in _measure_iter(relations, durations, "relations"):
+        # potentially skip
+        if callable(skip_func) and skip_func(rel.base_cls, name_func):
+            continue
+
+        # add line
+        yield f"{indentation}{name_func(rel.base_cls)} {arrow_type} {name_func(rel.cls)}"
+        if classes is not None:
+            classes[rel.base_cls] = None
+            classes[rel.cls] = None
+
+    # add styles
+    if styles:
+        yield ""
+        yield from _measure_iter(
+            iter_style_lines(
+                styles,
+                indentation=indentation,
+                name_func=name_func,
+                classes=classes,
+                group=group_styles,
+            ),
+            durations,
+            "styles",
+            exclude="names",
+        )
+
+
+def _filter_styles(
+    styles: list[Style | tuple],
+    classes: set[type],
+) -> list[Style]:
+    # remove explicitly assigned classes that are not in *classes* from styles, keeping names and
+    # selectors which are resolved later
+    def keep(entry: Any) -> bool:
+        return not isinstance(entry, type) or entry in classes
+
+    filtered = []
+    for style in styles:
+        style = style if isinstance(style, Style) else Style(*style)
+        if isinstance(style.cls, (list, tuple, set)) and not isinstance(style.cls, Selector):
+            style = style._replace(cls=[entry for entry in style.cls if keep(entry)])
+        elif not keep(style.cls):
+            style = style._replace(cls=[])
+        filtered.append(style)
+
+    return filtered
+
+
+def _reduce_graph(
+    root_cls: type,
+    mro_pairs: Iterable[tuple[int, type]] | None,
+    relations: Iterable[Relation],
+    skip_func: Callable[[type, Callable], bool] | None,
+    name_func: Callable[[type], str],
+    reduce_edges: bool,
+    collapse_chains: bool,
+    hide_bases: Iterable[type] | bool,
+    styles: list[Style | tuple] | None = None,
+    durations: dict[str, float] | None = None,
+) -> tuple[
+    list[tuple[int, type]] | None,
+    list[Relation],
+    dict[type, str],
+    list[Style] | None,
+]:
+    # reduce the graph after skipping relations, and create labels of collapsed chains
+    import time
+
+    relations = list(_measure_iter(relations, durations, "relations"))
+    if callable(skip_func):
+        relations = [rel for rel in relations if not skip_func(rel.base_cls, name_func)]
+
+    t0 = time.perf_counter()
+    relations, chains = reduce_relations(
+        relations,
+        transitive=reduce_edges,
+        collapse_chains=collapse_chains,
+        hide=hide_bases or None,
+    )
+    if durations is not None:
+        durations["reduce"] += time.perf_counter() - t0
+
+    # nodes of the reduced graph, used to remove labels and style assignments of hidden and
+    # collapsed classes, as well as of classes whose relations were all removed
+    nodes = {root_cls}
+    for rel in relations:
+        nodes.add(rel.cls)
+        nodes.add(rel.base_cls)
+    mro_indices = {}
+    if mro_pairs is not None:
+        mro_pairs = list(mro_pairs)
+        mro_indices = {cls: mro for mro, cls in mro_pairs}
+        mro_pairs = [(mro, cls) for mro, cls in mro_pairs if cls in nodes]
+    if styles:
+        styles = _filter_styles(styles, nodes)
+
+    # labels of chains, containing the first and last class, and their mro indices if known, which
+    # is not the case for subclasses
+    def label(cls: type) -> str:
+        name = name_func(cls)
+        return f"{name} ({mro_indices[cls]})" if cls in mro_indices else name
+
+    labels = {
+        cls: f"{label(chain[0])} ... {label(chain[-1])} [{len(chain)} classes]"
+        for cls, chain in chains.items()
+    }
+
+    return mro_pairs, relations, labels, styles
 
 
 def get_mermaid_text(
@@ -212,13 +1337,22 @@ def get_mermaid_text(
     name_func: Callable[[type], str] | None = None,
     skip_modules: list[str] | set[str] | None = None,
     join_lines: bool = True,
+    direction: str = "up",
+    max_nodes: int = -1,
+    group_styles: bool = False,
+    reduce_edges: bool = False,
+    collapse_chains: bool = False,
+    hide_bases: bool | Iterable[type] = False,
+    relations_cache: dict[tuple, list[Relation]] | None = None,
+    stats: Stats | None = None,
 ) -> str | list[str]:
     """
     Creates a text representation of the inheritance graph for a *root_cls*, down to a maximum
-    recursion depth *max_depth*. When *styles* is given, the representation contains style
-    statements generated via :py:func:`get_style_text`. When *show_mro* is *True*, mro indices with
-    respect to *root_cls* are shown. The type of the graph and style of arrows can be controlled
-    with *graph_type* and *arrow_type*. Example:
+    recursion depth *max_depth*, based on the lines yielded by :py:func:`iter_mermaid_lines`. When
+    *styles* is given, the representation contains style statements generated via
+    :py:func:`get_style_text`. When *show_mro* is *True*, mro indices with respect to *root_cls*
+    are shown. The type of the graph and style of arrows can be controlled with *graph_type* and
+    *arrow_type*. Example:
 
     .. code-block:: python
 
@@ -262,50 +1396,158 @@ def get_mermaid_text(
         return value of :py:func:`get_default_name_func` passing *skip_modules*.
     :param skip_modules: Sequence of module names (or patterns) to skip when no *name_func* is set.
     :param join_lines: Whether generated lines should be joined to a string.
-    :return: The style as a text representation or as single lines in a list.
+    :param direction: The lookup direction, ``"up"``, ``"down"`` or ``"both"``.
+    :param max_nodes: Maximum number of classes to visit.
+    :param group_styles: Whether to group style assignments, see :py:func:`iter_style_lines`.
+    :param reduce_edges: Whether to remove transitively redundant relations.
+    :param collapse_chains: Whether to collapse linear chains of classes into single nodes.
+    :param hide_bases: Classes to hide, or *True* to hide :py:data:`UBIQUITOUS_BASES`.
+    :param relations_cache: Optional dictionary for caching relations across calls, see
+        :py:func:`iter_mermaid_lines`.
+    :param stats: Optional :py:class:`Stats` object to add durations and counters to, see
+        :py:func:`iter_mermaid_lines`, with the total duration added to the ``mermaid_text`` stage.
+    :return: The graph as a text representation or as single lines in a list.
     """
+    lines = iter_mermaid_lines(
+        root_cls,
+        max_depth=max_depth,
+        styles=styles,
+        show_mro=show_mro,
+        graph_type=graph_type,
+        arrow_type=arrow_type,
+        indentation=indentation,
+        skip_func=skip_func,
+        name_func=name_func,
+        skip_modules=skip_modules,
+        direction=direction,
+        max_nodes=max_nodes,
+        group_styles=group_styles,
+        reduce_edges=reduce_edges,
+        collapse_chains=collapse_chains,
+        hide_bases=hide_bases,
+        relations_cache=relations_cache,
+        stats=stats,
+    )
+
+    # join or return as list of lines
+    with _timer(stats, "mermaid_text"):
+        return "\n".join(lines) if join_lines else list(lines)
+
+
+def write_mermaid_text(
+    root_cls: type,
+    fileobj: IO[str],
+    **kwargs,
+) -> int:
+    """
+    Writes the text representation of the inheritance graph for a *root_cls* line by line to a
+    writable, text-based *fileobj*, such as an opened file or a buffer of an http response. All
+    additional *kwargs* are forwarded to :py:func:`iter_mermaid_lines`. The written text is
+    identical to the one returned by :py:func:`get_mermaid_text`, but it is never held in memory
+    as a whole.
+
+    :param root_cls: The root class to use.
+    :param fileobj: The file object to write to.
+    :return: The number of written lines.
+    """
+    n = 0
+    for n, line in enumerate(iter_mermaid_lines(root_cls, **kwargs), 1):
+        if n > 1:
+            fileobj.write("\n")
+        fileobj.write(line)
+
+    return n
+
+
+def get_mermaid_text_multi(
+    root_classes: Iterable[type],
+    max_depth: int = -1,
+    merge: bool = True,
+    styles: list[Style | tuple] | None = None,
+    show_mro: bool = True,
+    graph_type: str = "TD",
+    arrow_type: str = "-->",
+    indentation: str = "    ",
+    skip_func: Callable[[type, Callable], bool] | None = None,
+    name_func: Callable[[type], str] | None = None,
+    skip_modules: list[str] | set[str] | None = None,
+    join_lines: bool = True,
+    group_styles: bool = False,
+) -> str | list[str] | dict[type, str | list[str]]:
+    """
+    Creates text representations of inheritance graphs for multiple *root_classes*, sharing a
+    single *name_func* (and thus its cache) across all of them.
+
+    When *merge* is *True*, a single graph is created from the union hierarchy that is walked only
+    once via :py:func:`get_relations_multi`, containing each edge only once. With *show_mro*, each
+    class is labeled with its mro index with respect to the first root class that reaches it,
+    which is always ``0`` for root classes themselves. Otherwise, a dictionary mapping root
+    classes to their graphs is returned, which are identical to those created by
+    :py:func:`get_mermaid_text`, with hierarchies walked separately per root class and only the
+    name cache being shared.
+
+    All other arguments are forwarded to :py:func:`get_mermaid_text`.
+
+    :param root_classes: The root classes to use.
+    :param max_depth: Maximum recursion depth for the lookup in :py:func:`get_relations_multi`.
+    :param merge: Whether to create a single, merged graph.
+    :return: The merged graph as a text representation or as single lines in a list, or a
+        dictionary mapping root classes to such graphs.
+    """
+    root_classes = list(root_classes)
+
     # default name_func
     if name_func is None:
         name_func = get_default_name_func(skip_modules=skip_modules)
 
-    # get relations
-    relations = get_relations(root_cls, max_depth=max_depth)
-
-    # build lines
-    lines = [f"graph {graph_type}"]
-
-    # add labels with mro indices
-    if show_mro:
-        mro_label = lambda cls, i: f"{indentation}{name_func(cls)}(\"{name_func(cls)} ({i})\")"
-        mro_pairs = {(root_cls, 0)} | {(rel.base_cls, rel.mro) for rel in relations}
-        lines.extend([
-            mro_label(base_cls, mro)
-            for base_cls, mro in sorted(mro_pairs, key=lambda tpl: tpl[1])
-        ])
-        lines.append("")
+    # graph options
+    opts = dict(
+        styles=styles,
+        graph_type=graph_type,
+        arrow_type=arrow_type,
+        indentation=indentation,
+        skip_func=skip_func,
+        name_func=name_func,
+        group_styles=group_styles,
+    )
 
-    # add relations
-    for rel in relations:
-        # potentially skip
-        if callable(skip_func) and skip_func(rel.base_cls, name_func):
-            continue
+    # one graph per root
+    if not merge:
+        return {
+            root_cls: get_mermaid_text(
+                root_cls,
+                max_depth=max_depth,
+                show_mro=show_mro,
+                join_lines=join_lines,
+                **opts,
+            )
+            for root_cls in root_classes
+        }
 
-        # add line
-        lines.append(f"{indentation}{name_func(rel.base_cls)} {arrow_type} {name_func(rel.cls)}")
+    # get merged relations
+    relations = get_relations_multi(root_classes, max_depth=max_depth, merge=True)
 
-    # add styles
-    if styles:
-        # add lines
-        lines.append("")
-        lines.extend(get_style_text(
-            styles,
-            indentation=indentation,
-            name_func=name_func,
-            join_lines=False,
-        ))
+    # determine pairs of mro indices and classes to label, ordered by root and then mro index
+    mro_pairs = None
+    if show_mro:
+        mro_pairs = []
+        labeled = set()
+        for root_cls, root_relations in relations.items():
+            root_pairs = []
+            for mro, cls in [(0, root_cls)] + [(rel.mro, rel.base_cls) for rel in root_relations]:
+                if cls not in labeled:
+                    root_pairs.append((mro, cls))
+                    labeled.add(cls)
+            mro_pairs.extend(sorted(root_pairs, key=lambda tpl: tpl[0]))
+
+    lines = _iter_graph_lines(
+        mro_pairs,
+        (rel for root_relations in relations.values() for rel in root_relations),
+        **opts,
+    )
 
     # join or return as list of lines
-    return "\n".join(lines) if join_lines else lines
+    return "\n".join(lines) if join_lines else list(lines)
 
 
 def encode_text(
@@ -318,12 +1560,15 @@ def encode_text(
     :param mermaid_text: The graph as a string representation.
     :return: The base64 encoded representation of the text.
     """
+    import base64
+
     return base64.urlsafe_b64encode(mermaid_text.encode("utf-8")).decode("utf-8")
 
 
 def encode_json(
     mermaid_text: str,
     theme: str | None = "default",
+    stats: Stats | None = None,
 ) -> str:
     r"""
     Returns a base64 encoded and compressed variant of a mermaid graph given in *mermaid_text* and
@@ -339,18 +1584,418 @@ def encode_json(
             "mermaid": "{\"theme\": ...}"
         }
 
-    as expected by mermaidjs.
+    as expected by mermaidjs. When *stats* is given, the duration is added to the ``encode_json``
+    stage, and the sizes of the structured data and of the returned payload to the ``json_bytes``
+    and ``payload_bytes`` counters.
 
     :param mermaid_text: The graph as a string representation.
     :param theme: Name of the theme to use.
+    :param stats: Optional :py:class:`Stats` object to add durations and counters to.
     :return: The base64 encoded and compressed representation of the structured data containing
         the graph and configuration options.
     """
-    data = json.dumps({
-        "code": mermaid_text,
-        "mermaid": json.dumps({"theme": theme} if theme else {}),
-    })
-    return base64.urlsafe_b64encode(zlib.compress(data.encode("utf-8"), level=9)).decode("utf-8")
+    import base64
+    import json
+    import zlib
+
+    with _timer(stats, "encode_json"):
+        data = json.dumps({
+            "code": mermaid_text,
+            "mermaid": json.dumps({"theme": theme} if theme else {}),
+        }).encode("utf-8")
+        payload = base64.urlsafe_b64encode(zlib.compress(data, level=9)).decode("utf-8")
+
+    if stats is not None:
+        stats.add("json_bytes", len(data))
+        stats.add("payload_bytes", len(payload))
+
+    return payload
+
+
+@functools.lru_cache(maxsize=1)
+def _get_umask() -> int:
+    # umask of the process, which can only be read by setting it, so it is determined once
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+@contextlib.contextmanager
+def _atomic_write(
+    path: str,
+) -> Iterator[BinaryIO]:
+    # yields a file object of a temporary file next to path that is renamed to path on success and
+    # removed otherwise, so that no partial files are ever visible at path
+    import tempfile
+
+    # temporary files are only accessible by the owner, so apply the mode of an existing file or
+    # the default mode of new files
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except OSError:
+        mode = 0o666 & ~_get_umask()
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or None, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class RenderCache(object):
+    """
+    Persistent, content-addressed cache of rendered graph files in a *directory*. Entries are keyed
+    by a hash of the encoded graph data as returned by :py:func:`encode_json` and the file type, so
+    that identical graphs rendered with identical options are only downloaded once. Files are
+    written atomically, and when the total size of all cached files exceeds *max_size* bytes, least
+    recently used entries are removed. Cache hits and misses are counted in :py:attr:`hits` and
+    :py:attr:`misses`. Instances can be shared between threads.
+
+    .. code-block:: python
+
+        cache = RenderCache("~/.cache/mermaidmro")
+        download_graph(mermaid_text, "graph.png", file_type="png", cache=cache)
+        download_graph(mermaid_text, "graph.png", file_type="png", cache=cache)
+        cache.stats()
+        # -> {"hits": 1, "misses": 1, "entries": 1, "size": ...}
+
+    :param directory: The directory in which cached files are stored, created if missing.
+    :param max_size: Maximum size of all cached files in bytes; no limit when negative.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_size: int = 100 * 1024**2,
+    ) -> None:
+        super().__init__()
+
+        import threading
+
+        self.directory = os.path.normpath(os.path.expandvars(os.path.expanduser(directory)))
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(
+        self,
+        mermaid_json: str,
+        file_type: str,
+    ) -> str:
+        """
+        Returns the cache key for the encoded graph data *mermaid_json* and a *file_type*.
+        """
+        import hashlib
+
+        return hashlib.sha256(f"{file_type}:{mermaid_json}".encode("utf-8")).hexdigest()
+
+    def path(
+        self,
+        mermaid_json: str,
+        file_type: str,
+    ) -> str:
+        """
+        Returns the path of the cached file for the encoded graph data *mermaid_json* and a
+        *file_type*, regardless of whether it exists.
+        """
+        return os.path.join(self.directory, f"{self.key(mermaid_json, file_type)}.{file_type}")
+
+    def get(
+        self,
+        mermaid_json: str,
+        file_type: str,
+    ) -> str | None:
+        """
+        Returns the path of the cached file for the encoded graph data *mermaid_json* and a
+        *file_type*, or *None* if it is not cached. The access time is updated on hits.
+        """
+        path = self.path(mermaid_json, file_type)
+        with self._lock:
+            # mark as recently used
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        return path
+
+    def put(
+        self,
+        mermaid_json: str,
+        file_type: str,
+        src: str,
+    ) -> str:
+        """
+        Atomically copies the file at *src* into the cache as the entry for the encoded graph data
+        *mermaid_json* and a *file_type*, evicts old entries if needed, and returns the path of the
+        cached file.
+        """
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory, exist_ok=True)
+
+        import shutil
+
+        # copy to a temporary file first and move it into place
+        path = self.path(mermaid_json, file_type)
+        with _atomic_write(path) as f, open(src, "rb") as f_src:
+            shutil.copyfileobj(f_src, f)
+
+        self.evict()
+
+        return path
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        # modification time, size and path of all cached files
+        if not os.path.exists(self.directory):
+            return []
+
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        return entries
+
+    def evict(self) -> int:
+        """
+        Removes least recently used entries until the total size of cached files is below the
+        maximum size and returns the number of removed entries.
+        """
+        if self.max_size < 0:
+            return 0
+
+        with self._lock:
+            entries = sorted(self._entries())
+            size = sum(entry[1] for entry in entries)
+            n = 0
+            for _, entry_size, path in entries:
+                if size <= self.max_size:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                size -= entry_size
+                n += 1
+
+        return n
+
+    def clear(self) -> None:
+        """
+        Removes all cached files and resets the statistics.
+        """
+        with self._lock:
+            for _, _, path in self._entries():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns a dictionary with the number of cache ``"hits"`` and ``"misses"``, and the number
+        of ``"entries"`` and their total ``"size"`` in bytes.
+        """
+        with self._lock:
+            entries = self._entries()
+            hits, misses = self.hits, self.misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "entries": len(entries),
+            "size": sum(entry[1] for entry in entries),
+        }
+
+
+class _RequestsSession(object):
+    """
+    Wrapper around a :py:class:`requests.Session` with a connection pool of *pool_size*.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+    ) -> None:
+        super().__init__()
+
+        import requests
+        import requests.adapters
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = f"mermaidmro/{__version__}"
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def download(
+        self,
+        url: str,
+        fileobj: BinaryIO,
+        timeout: float | None = None,
+        chunk_size: int = 64 * 1024,
+    ) -> None:
+        import requests
+
+        with self.session.get(url, allow_redirects=True, timeout=timeout, stream=True) as r:
+            r.raise_for_status()
+            if not 200 <= r.status_code < 300:
+                raise requests.HTTPError(f"unexpected status {r.status_code}", response=r)
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                fileobj.write(chunk)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class _KeepAliveSession(object):
+    """
+    Minimal session based on :py:mod:`http.client` that keeps one persistent connection per thread
+    and host, but at most *pool_size* connections in total, used when requests is not installed.
+    Redirects are followed up to :py:attr:`max_redirects` times.
+    """
+
+    #: Maximum number of redirects to follow per download.
+    max_redirects = 30
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+    ) -> None:
+        super().__init__()
+
+        import threading
+
+        self.pool_size = pool_size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: list[http.client.HTTPConnection] = []
+
+    def _connection(
+        self,
+        scheme: str,
+        netloc: str,
+        timeout: float | None,
+        new: bool = False,
+    ) -> tuple[http.client.HTTPConnection, bool]:
+        # returns a connection and whether it is kept in the pool, which is not the case for
+        # connections created when the pool is full and that should be closed after use
+        import http.client
+
+        conns = self._local.__dict__.setdefault("connections", {})
+        conn = conns.get((scheme, netloc))
+        if conn is not None and new:
+            conn.close()
+            del conns[(scheme, netloc)]
+            with self._lock:
+                self._connections.remove(conn)
+            conn = None
+        pooled = True
+        if conn is None:
+            conn_cls = http.client.HTTPConnection
+            if scheme == "https":
+                conn_cls = http.client.HTTPSConnection
+            conn = conn_cls(netloc, timeout=timeout)
+            with self._lock:
+                pooled = len(self._connections) < self.pool_size
+                if pooled:
+                    self._connections.append(conn)
+            if pooled:
+                conns[(scheme, netloc)] = conn
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, pooled
+
+    def _request(
+        self,
+        url: str,
+        timeout: float | None,
+    ) -> tuple[http.client.HTTPConnection, http.client.HTTPResponse, bool]:
+        # send a get request and return the connection, the response and whether the connection is
+        # pooled
+        import http.client
+        import urllib.parse
+
+        parts = urllib.parse.urlsplit(url)
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+        headers = {"User-Agent": f"mermaidmro/{__version__}"}
+
+        conn, pooled = self._connection(parts.scheme, parts.netloc, timeout)
+        reused = conn.sock is not None
+        try:
+            conn.request("GET", target, headers=headers)
+            return conn, conn.getresponse(), pooled
+        except (http.client.RemoteDisconnected, ConnectionError):
+            # the server might have closed an idle connection, so retry once with a new one
+            if not reused:
+                raise
+            conn, pooled = self._connection(parts.scheme, parts.netloc, timeout, new=True)
+            conn.request("GET", target, headers=headers)
+            return conn, conn.getresponse(), pooled
+
+    def download(
+        self,
+        url: str,
+        fileobj: BinaryIO,
+        timeout: float | None = None,
+        chunk_size: int = 64 * 1024,
+    ) -> None:
+        import shutil
+        import urllib.error
+        import urllib.parse
+
+        for _ in range(self.max_redirects + 1):
+            conn, r, pooled = self._request(url, timeout)
+            try:
+                # consume responses that are not written to allow connection reuse
+                location = r.getheader("Location")
+                if 300 <= r.status < 400 and location:
+                    r.read()
+                    url = urllib.parse.urljoin(url, location)
+                    continue
+                if not 200 <= r.status < 300:
+                    r.read()
+                    raise urllib.error.HTTPError(url, r.status, r.reason, r.headers, None)
+
+                shutil.copyfileobj(r, fileobj, chunk_size)
+                return
+            finally:
+                if not pooled:
+                    conn.close()
+
+        raise urllib.error.HTTPError(url, r.status, "too many redirects", r.headers, None)
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            del self._connections[:]
+
+
+def create_session(
+    pool_size: int = 10,
+) -> _RequestsSession | _KeepAliveSession:
+    """
+    Creates a session that keeps connections to the mermaidjs service alive and can be passed to
+    :py:func:`download_graph`, based on requests if installed and on :py:mod:`http.client`
+    otherwise. *pool_size* defines the maximum number of pooled connections. The session should be
+    closed via its ``close()`` method when no longer needed.
+
+    :param pool_size: Maximum number of pooled connections.
+    :return: The session object.
+    """
+    return (_RequestsSession if HAS_REQUESTS else _KeepAliveSession)(pool_size=pool_size)
 
 
 def download_graph(
@@ -358,40 +2003,261 @@ def download_graph(
     path: str,
     file_type: str = "jpg",
     theme: str | None = "default",
+    cache: RenderCache | str | None = None,
+    session: Any | None = None,
+    timeout: float | None = None,
+    chunk_size: int = 64 * 1024,
+    stats: Stats | None = None,
 ) -> str:
     """
     Downloads a mermaid graph represented by *mermaid_text* from the mermaidjs service to a *path*
-    in a specific *file_type*. Missing intermediate directories are created first.
+    in a specific *file_type*. Missing intermediate directories are created first. The response is
+    streamed in chunks of *chunk_size* bytes to a temporary file next to *path* which is renamed
+    once the download succeeded, so that no partial files are left at *path*. Unsuccessful http
+    responses raise an exception before anything is written.
+
+    When a *cache* is given, either as a :py:class:`RenderCache` or a directory for creating one,
+    the graph is copied from there when it was rendered before, and added to it otherwise.
+
+    A *session* as returned by :py:func:`create_session` can be passed to reuse open connections
+    across multiple downloads.
+
+    When *stats* is given, the durations of the ``encode_json``, ``cache`` and ``http`` stages are
+    added, the latter covering the entire request including the transfer of the response, as well
+    as the ``cache_hits``, ``cache_misses``, ``downloads`` and ``download_bytes`` counters.
 
     :param mermaid_text: The graph as a string representation.
     :param path: The path where the downloaded file should be saved.
     :param file_type: The file type to write, usually ``"jpg"`` or ``"png"``.
     :param theme: Name of the theme to use.
+    :param cache: Optional cache of previously rendered graphs.
+    :param session: Optional session for pooling connections.
+    :param timeout: Optional timeout in seconds for connecting and reading data.
+    :param chunk_size: Size of chunks in bytes that are written at a time.
+    :param stats: Optional :py:class:`Stats` object to add durations and counters to.
     :return: The absolute, normalized and expanded path.
     """
+    # normalize path and ensure parent directory exists
+    path = _prepare_path(path)
+
+    # copy from the cache if possible
+    mermaid_json = encode_json(mermaid_text, theme=theme, stats=stats)
+    cache = _get_cache(cache)
+    if cache is not None:
+        with _timer(stats, "cache"):
+            cached = _copy_from_cache(cache, mermaid_json, file_type, path)
+        if stats is not None:
+            stats.add("cache_hits" if cached else "cache_misses")
+        if cached:
+            return path
+
+    # download and write
+    import shutil
+
+    url = URL_STATIC_JSON.format(mermaid_json, file_type)
+    with _timer(stats, "http"), _atomic_write(path) as f:
+        if session is not None:
+            session.download(url, f, timeout=timeout, chunk_size=chunk_size)
+        elif HAS_REQUESTS:
+            import requests
+
+            with requests.get(url, allow_redirects=True, timeout=timeout, stream=True) as r:
+                r.raise_for_status()
+                for chunk in r.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+        else:
+            import urllib.request
+
+            opener = urllib.request.build_opener()
+            opener.addheaders = [("User-Agent", f"mermaidmro/{__version__}")]
+            open_kwargs = {} if timeout is None else {"timeout": timeout}
+            with opener.open(url, **open_kwargs) as r:
+                shutil.copyfileobj(r, f, chunk_size)
+
+    if stats is not None:
+        stats.add("downloads")
+        stats.add("download_bytes", os.path.getsize(path))
+
+    # add to the cache
+    if cache is not None:
+        with _timer(stats, "cache"):
+            cache.put(mermaid_json, file_type, path)
+
+    return path
+
+
+def _prepare_path(
+    path: str,
+) -> str:
     # normalize path
     path = os.path.normpath(os.path.expandvars(os.path.expanduser(path)))
 
     # ensure parent directory exists
     parent = os.path.dirname(path)
     if parent and not os.path.exists(parent):
-        os.makedirs(parent)
-
-    # download and write
-    url = URL_STATIC_JSON.format(encode_json(mermaid_text, theme=theme), file_type)
-    if HAS_REQUESTS:
-        with open(path, "wb") as f:
-            r = requests.get(url, allow_redirects=True)
-            f.write(r.content)
-    else:
-        opener = urllib.request.build_opener()
-        opener.addheaders = [("User-Agent", f"mermaidmro/{__version__}")]
-        urllib.request.install_opener(opener)
-        urllib.request.urlretrieve(url, path)
+        os.makedirs(parent, exist_ok=True)
 
     return path
 
 
+def _get_cache(
+    cache: RenderCache | str | None,
+) -> RenderCache | None:
+    # create a cache object from a directory
+    return RenderCache(cache) if isinstance(cache, str) else cache
+
+
+def _copy_from_cache(
+    cache: RenderCache | None,
+    mermaid_json: str,
+    file_type: str,
+    path: str,
+) -> bool:
+    # copy a cached file atomically to path and return whether it existed
+    if cache is None:
+        return False
+
+    cached_path = cache.get(mermaid_json, file_type)
+    if not cached_path:
+        return False
+
+    import shutil
+
+    try:
+        src = open(cached_path, "rb")
+    except FileNotFoundError:
+        # evicted by another process in the meantime
+        with cache._lock:
+            cache.hits -= 1
+            cache.misses += 1
+        return False
+    with src, _atomic_write(path) as f:
+        shutil.copyfileobj(src, f)
+
+    return True
+
+
+def download_graphs(
+    items: Iterable[tuple | dict[str, Any]],
+    max_workers: int = 8,
+    retries: int = 2,
+    backoff: float = 0.5,
+    timeout: float | None = 30.0,
+    **kwargs,
+) -> list[DownloadResult]:
+    """
+    Downloads multiple graphs concurrently on a pool of at most *max_workers* threads that share a
+    single session created by :py:func:`create_session`, so that connections are kept alive and
+    reused. Each item in *items* is either a tuple ``(mermaid_text, path)`` or a dictionary of
+    arguments passed to :py:func:`download_graph`, updating the default arguments in *kwargs*.
+    Example:
+
+    .. code-block:: python
+
+        results = download_graphs(
+            [(get_mermaid_text(cls), f"graphs/{cls.__name__}.png") for cls in classes],
+            file_type="png",
+        )
+        failed = [res for res in results if res.error]
+
+    Failed downloads are retried up to *retries* times with an exponential backoff, starting at
+    *backoff* seconds, but only after network errors, timeouts, server errors and 429 responses
+    from the service. Each request is subject to a *timeout* in seconds. Errors are not raised but
+    reported in the returned :py:class:`DownloadResult` objects, which are in the same order as
+    *items*. Cache directories passed as strings are opened once and shared by all items.
+
+    :param items: Sequence of tuples or dictionaries describing the graphs to download.
+    :param max_workers: Maximum number of concurrent downloads.
+    :param retries: Maximum number of retries per item.
+    :param backoff: Initial delay in seconds before retrying.
+    :param timeout: Timeout in seconds per request.
+    :return: List of :py:class:`DownloadResult` objects.
+    """
+    import time
+    import concurrent.futures
+
+    # build arguments per item
+    items_kwargs = _build_items_kwargs(items, kwargs)
+
+    def download(index: int, item_kwargs: dict[str, Any]) -> DownloadResult:
+        t0 = time.perf_counter()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                path = download_graph(session=session, timeout=timeout, **item_kwargs)
+            except Exception as e:
+                # stop for errors that are not transient and when reaching the maximum number of
+                # retries
+                if attempt > retries or not _is_transient(e):
+                    return DownloadResult(index, None, e, attempt, time.perf_counter() - t0)
+                time.sleep(backoff * 2**(attempt - 1))
+            else:
+                return DownloadResult(index, path, None, attempt, time.perf_counter() - t0)
+
+    session = create_session(pool_size=max_workers)
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(download, range(len(items_kwargs)), items_kwargs))
+    finally:
+        session.close()
+
+
+def _build_items_kwargs(
+    items: Iterable[tuple | dict[str, Any]],
+    kwargs: dict[str, Any],
+) -> list[dict[str, Any]]:
+    # build download arguments per item, updating the default kwargs
+    items_kwargs = []
+    for item in items:
+        item_kwargs = dict(kwargs)
+        item_kwargs.update(item if isinstance(item, dict) else zip(["mermaid_text", "path"], item))
+        items_kwargs.append(item_kwargs)
+
+    # create cache objects from directories once, so that they are shared by all items
+    caches: dict[str, RenderCache] = {}
+    for item_kwargs in items_kwargs:
+        cache = item_kwargs.get("cache")
+        if isinstance(cache, str):
+            if cache not in caches:
+                caches[cache] = RenderCache(cache)
+            item_kwargs["cache"] = caches[cache]
+
+    return items_kwargs
+
+
+def _http_status(
+    e: Exception,
+) -> int | None:
+    # extract the http status code of an exception raised during a download, if any
+    import urllib.error
+
+    if isinstance(e, urllib.error.HTTPError):
+        return e.code
+    response = getattr(e, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def _is_transient(
+    e: Exception,
+) -> bool:
+    # whether a download failed due to a transient error that is worth retrying, i.e., a network
+    # error or timeout, a server error or rate limiting
+    import http.client
+    import concurrent.futures
+
+    status = _http_status(e)
+    if status is not None:
+        return status >= 500 or status == 429
+
+    return isinstance(e, (
+        OSError,
+        EOFError,
+        http.client.HTTPException,
+        concurrent.futures.TimeoutError,
+    ))
+
+
 def _import_class(
     cid: str,
 ) -> type:
@@ -411,10 +2277,95 @@ def _import_class(
     return cls
 
 
+def _resolve_classes(
+    cids: list[str],
+    extractor: Any | None = None,
+) -> list[tuple[str, type]]:
+    # resolve class identifiers to (cid, cls) pairs, expanding glob patterns over class names such
+    # as "pkg.models:*" to all classes defined in that module and importing each module only once,
+    # or parsing it when a static extractor is given
+    modules: dict[str, Any] = {}
+    resolved: dict[type, str] = {}
+    for cid in cids:
+        if ":" not in cid:
+            raise ValueError(f"invalid format, cannot import '{cid}'")
+        module_name, pattern = cid.split(":", 1)
+
+        if extractor is not None:
+            if not _is_pattern(pattern):
+                resolved.setdefault(extractor.get_class(cid), cid)
+                continue
+            for cls in extractor.classes(module_name):
+                if fnmatch.fnmatchcase(cls.__name__, pattern):
+                    resolved.setdefault(cls, f"{module_name}:{cls.__name__}")
+            continue
+
+        if not _is_pattern(pattern):
+            resolved.setdefault(_import_class(cid), cid)
+            continue
+
+        # import the module once and match classes defined in it
+        if module_name not in modules:
+            modules[module_name] = importlib.import_module(module_name)
+        mod = modules[module_name]
+        for name, obj in vars(mod).items():
+            if (
+                isinstance(obj, type) and
+                obj.__module__ == mod.__name__ and
+                fnmatch.fnmatchcase(name, pattern)
+            ):
+                resolved.setdefault(obj, f"{module_name}:{name}")
+
+    return [(cid, cls) for cls, cid in resolved.items()]
+
+
+def _extract_classes(
+    args: Any,
+    cids: list[str],
+    errors: dict[str, str],
+) -> list[tuple[str, Any]]:
+    # resolve class identifiers to (cid, cls) pairs in isolated worker processes like
+    # _resolve_classes, storing error messages of failed imports in errors
+    from mermaidmro.workers import extract_classes
+
+    memory_limit = args.memory_limit and int(args.memory_limit * 1024**2)
+    resolved: dict[Any, str] = {}
+    for res in extract_classes(
+        cids,
+        processes=args.workers,
+        timeout=args.timeout,
+        memory_limit=memory_limit,
+    ):
+        if res.error:
+            errors[res.cid] = res.error
+        for cid, cls in res.classes:
+            resolved.setdefault(cls, cid)
+
+    return [(cid, cls) for cls, cid in resolved.items()]
+
+
+def _is_pattern(
+    s: str,
+) -> bool:
+    # whether a string contains glob characters
+    return any(c in s for c in "*?[")
+
+
+def _read_manifest(
+    path: str,
+) -> list[str]:
+    # read class identifiers from a file, one per line, skipping empty lines and comments
+    with open(os.path.expandvars(os.path.expanduser(path)), "r") as f:
+        lines = (line.split("#", 1)[0].strip() for line in f)
+        return [line for line in lines if line]
+
+
 def main(
     cli_args: list[str] | None = None,
     test: bool = False,
-) -> None | list[str] | str:
+    name_func: Callable[[type], str] | None = None,
+    relations_cache: dict[tuple, list[Relation]] | None = None,
+) -> None | list[str] | str | dict[str, Any]:
     """
     Main entry hook of the mermaidmro cli.
 
@@ -422,15 +2373,40 @@ def main(
     *test* is *True*, no command is executed by created texts and / or commands are returned instead
     for testing purposes.
 
+    When multiple classes are given, either explicitly, via glob patterns or a manifest file, they
+    are processed in a single process, sharing imports and name caches, and graphs are downloaded
+    in parallel to paths built from the ``--download`` template. In this case and when *test* is
+    *True*, a dictionary mapping class identifiers to texts or output paths is returned.
+
+    The subcommands ``daemon`` and ``serve`` are handled by :py:func:`mermaidmro.daemon.main` and
+    :py:func:`mermaidmro.server.main`.
+
+    A *name_func* and a *relations_cache* (see :py:func:`get_mermaid_text`) can be passed to reuse
+    names and relations across invocations, as done by :py:class:`mermaidmro.daemon.Daemon`. Both
+    are not used in watch mode, which reloads modules.
+
     :param cli_args: Custom cli arguments.
     :param test: Whether texts and or commands are returned for testing purposes.
+    :param name_func: A function to extract the string representation of a class.
+    :param relations_cache: Optional dictionary for caching relations across invocations.
     :return: Texts or commands if *test* is *True* and *None* otherwise.
     """
-    import subprocess
-    import tempfile
+    import sys
     import shlex
     import argparse
 
+    # subcommands
+    if cli_args is None:
+        cli_args = sys.argv[1:]
+    if cli_args[:1] == ["daemon"]:
+        from mermaidmro.daemon import main as daemon_main
+
+        return daemon_main(cli_args[1:])
+    if cli_args[:1] == ["serve"]:
+        from mermaidmro.server import main as serve_main
+
+        return serve_main(cli_args[1:])
+
     # setup arguments
     parser = argparse.ArgumentParser(
         description="visualize class inheritance structures with mermaidjs using the mro",
@@ -438,7 +2414,15 @@ def main(
     )
     parser.add_argument(
         "cls",
-        help="the root class to visualize in the format 'module.to.import:class'",
+        nargs="*",
+        help="the root classes to visualize in the format 'module.to.import:class', with glob "
+        "patterns such as 'module.to.import:*' matching all classes defined in that module",
+    )
+    parser.add_argument(
+        "--manifest",
+        "-M",
+        metavar="PATH",
+        help="file containing additional class identifiers or patterns, one per line",
     )
     parser.add_argument(
         "--max-depth",
@@ -448,6 +2432,36 @@ def main(
         type=int,
         default=-1,
     )
+    parser.add_argument(
+        "--direction",
+        "-D",
+        choices=["up", "down", "both"],
+        default="up",
+        help="whether to show base classes ('up'), subclasses ('down') or both; default: 'up'",
+    )
+    parser.add_argument(
+        "--max-nodes",
+        metavar="VALUE",
+        help="the maximum number of classes in the graph, stopping the lookup when reached; "
+        "default: -1",
+        type=int,
+        default=-1,
+    )
+    parser.add_argument(
+        "--reduce",
+        action="store_true",
+        help="remove edges to base classes that are also reached through other base classes",
+    )
+    parser.add_argument(
+        "--collapse-chains",
+        action="store_true",
+        help="collapse linear chains of classes with a single base and subclass into one node",
+    )
+    parser.add_argument(
+        "--hide-bases",
+        action="store_true",
+        help="hide ubiquitous base classes, i.e., 'object' and 'typing.Generic'",
+    )
     parser.add_argument(
         "--no-mro",
         "-n",
@@ -482,7 +2496,29 @@ def main(
         "--download",
         "-d",
         metavar="PATH",
-        help="path for downloading the graph file instead",
+        help="path for downloading the graph file instead; for multiple classes, a template "
+        "containing '{module}' and / or '{name}' placeholders",
+    )
+    parser.add_argument(
+        "--renderer",
+        "-r",
+        choices=["ink", "local"],
+        help="the renderer to use for --download and --visualize, with 'ink' referring to the "
+        "mermaid.ink service for png and jpg files and 'local' to the offline svg renderer; "
+        "default: 'local' for svg files, 'ink' otherwise",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        metavar="PATH",
+        help="directory for caching downloaded graphs; no caching when empty",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        metavar="N",
+        type=int,
+        default=8,
+        help="maximum number of parallel downloads for multiple classes; default: 8",
     )
     parser.add_argument(
         "--visualize",
@@ -494,32 +2530,253 @@ def main(
         "--file-type",
         "-f",
         metavar="TYPE",
-        help="the file type to open or download; has no effect when --edit is set",
-        choices=["png", "jpg"],
-        default="png",
+        help="the file type to open or download; has no effect when --edit is set; default: 'svg' "
+        "for the local renderer, 'png' otherwise",
+        choices=["png", "jpg", "svg"],
     )
     parser.add_argument(
         "--args",
         help="additional arguments to be added to the commands given via --cmd or --visualize",
         type=shlex.split,
     )
+    parser.add_argument(
+        "--watch",
+        "-w",
+        action="store_true",
+        help="keep running, watch the source files of involved modules and repeat all actions "
+        "when the graph changes",
+    )
+    parser.add_argument(
+        "--interval",
+        metavar="SECONDS",
+        type=float,
+        default=1.0,
+        help="polling interval for --watch in seconds; default: 1.0",
+    )
+    parser.add_argument(
+        "--static",
+        "-s",
+        action="store_true",
+        help="extract classes by parsing source files instead of importing them, caching parsed "
+        "files in --cache-dir if set; only supports base classes ('--direction up')",
+    )
+    parser.add_argument(
+        "--workers",
+        "-W",
+        metavar="N",
+        type=int,
+        default=0,
+        help="import classes and extract their relations in up to N isolated worker processes in "
+        "parallel instead of in the current process; only supports base classes ('--direction "
+        "up'); default: 0",
+    )
+    parser.add_argument(
+        "--timeout",
+        metavar="SECONDS",
+        type=float,
+        help="maximum duration of imports per class with --workers; no timeout when empty",
+    )
+    parser.add_argument(
+        "--memory-limit",
+        metavar="MB",
+        type=float,
+        help="maximum address space per worker process in MB with --workers; no limit when empty",
+    )
+    parser.add_argument(
+        "--timings",
+        "-t",
+        action="store_true",
+        help="print durations of all stages and counters such as the number of nodes, cache hits "
+        "and payload sizes to stderr",
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="do not forward the invocation to a running daemon (see 'mermaidmro daemon --help')",
+    )
     args = parser.parse_args(cli_args)
+    args.name_func = name_func
+    args.relations_cache = relations_cache
+
+    # forward to a running daemon, except for actions that need to run in the current process,
+    # checking for its socket first to avoid further imports when no daemon was started
+    if (
+        not test and
+        not (args.no_daemon or args.watch or args.cmd or args.visualize) and
+        os.path.exists(_get_socket_path())
+    ):
+        from mermaidmro.daemon import forward
+
+        status = forward(cli_args)
+        if status:
+            sys.exit(status)
+        if status is not None:
+            return None
+
+    # collect class identifiers
+    cids = list(args.cls)
+    if args.manifest:
+        cids.extend(_read_manifest(args.manifest))
+    if not cids:
+        parser.error("no classes given")
 
     # overwrite the file type when downloading
     if args.download:
-        args.file_type = os.path.splitext(args.download)[-1].strip(".") or args.file_type
+        ext = os.path.splitext(args.download)[-1].strip(".").lower()
+        args.file_type = _file_type_aliases.get(ext, ext) or args.file_type
 
-    # import the class
-    cls = _import_class(args.cls)
+    # default renderer and file type, depending on each other
+    if not args.renderer:
+        args.renderer = "local" if args.file_type == "svg" else "ink"
+    if not args.file_type:
+        args.file_type = "svg" if args.renderer == "local" else "png"
 
-    # generate the mermaid text
-    mermaid_text = get_mermaid_text(
-        cls,
-        max_depth=args.max_depth,
-        show_mro=not args.no_mro,
-        graph_type=args.graph_type.strip(),
-        arrow_type=args.arrow_type.strip(),
-    )
+    # check that the renderer supports the file type
+    if args.download or args.visualize:
+        from mermaidmro.render import renderers
+
+        file_types = renderers[args.renderer].file_types
+        if args.file_type not in file_types:
+            parser.error(
+                f"file type '{args.file_type}' not supported by renderer '{args.renderer}', "
+                f"choose from {','.join(file_types)}",
+            )
+
+    # batch mode for multiple classes
+    batch = len(cids) > 1 or any(_is_pattern(cid.split(":", 1)[-1]) for cid in cids)
+    if batch:
+        if args.cmd or args.visualize:
+            parser.error("--cmd and --visualize are not supported for multiple classes")
+        if args.download:
+            import string
+
+            try:
+                fields = {
+                    field for _, field, _, _ in string.Formatter().parse(args.download)
+                    if field is not None
+                }
+            except ValueError as e:
+                parser.error(f"invalid --download template '{args.download}': {e}")
+            if not fields:
+                parser.error("--download must be a path template for multiple classes")
+            unknown = fields - {"module", "name"}
+            if unknown:
+                parser.error(
+                    f"unknown placeholders in --download template: "
+                    f"{','.join(sorted(f'{{{field}}}' for field in unknown))}, "
+                    "choose from {module},{name}",
+                )
+
+    # static extraction
+    extractor = None
+    if args.static:
+        if args.watch:
+            parser.error("--static is not supported with --watch")
+        if args.direction != "up":
+            parser.error("--static only supports '--direction up'")
+
+        from mermaidmro.static import StaticExtractor
+
+        static_cache = args.cache_dir and os.path.join(args.cache_dir, "static")
+        extractor = StaticExtractor(cache_dir=static_cache)
+
+    # isolated workers
+    if args.workers:
+        if args.static or args.watch:
+            parser.error("--workers is not supported with --static or --watch")
+        if args.direction != "up":
+            parser.error("--workers only supports '--direction up'")
+
+    # watch mode
+    if args.watch:
+        args.name_func = args.relations_cache = None
+        return _main_watch(args, cids, batch)
+
+    args.stats = Stats() if args.timings else None
+    try:
+        if batch:
+            import_errors: dict[str, str] = {}
+            with _timer(args.stats, "import"):
+                if args.workers:
+                    classes = _extract_classes(args, cids, import_errors)
+                else:
+                    classes = _resolve_classes(cids, extractor=extractor)
+            result = _main_batch(args, classes, _get_mermaid_texts(args, classes), test=test)
+
+            # report failed imports of isolated workers
+            if import_errors:
+                for cid, error in import_errors.items():
+                    print(f"failed to import {cid}: {error}", file=sys.stderr)
+                if not test:
+                    sys.exit(1)
+
+            return result
+
+        # import or parse the class and generate the mermaid text
+        with _timer(args.stats, "import"):
+            if args.workers:
+                import_errors = {}
+                classes = _extract_classes(args, cids, import_errors)
+                if import_errors:
+                    raise ImportError(f"failed to import {cids[0]}: {import_errors[cids[0]]}")
+                cls = classes[0][1]
+            elif extractor is not None:
+                cls = extractor.get_class(cids[0])
+            else:
+                cls = _import_class(cids[0])
+        mermaid_text = get_mermaid_text(cls, **_get_graph_kwargs(args))
+
+        return _main_single(args, mermaid_text, test=test)
+    finally:
+        _print_timings(args)
+
+
+def _get_graph_kwargs(
+    args: Any,
+) -> dict[str, Any]:
+    # arguments for creating graph texts from parsed cli arguments
+    return {
+        "max_depth": args.max_depth,
+        "show_mro": not args.no_mro,
+        "graph_type": args.graph_type.strip(),
+        "arrow_type": args.arrow_type.strip(),
+        "direction": args.direction,
+        "max_nodes": args.max_nodes,
+        "reduce_edges": args.reduce,
+        "collapse_chains": args.collapse_chains,
+        "hide_bases": args.hide_bases,
+        "name_func": args.name_func or get_default_name_func(),
+        "relations_cache": args.relations_cache,
+        "stats": args.stats,
+    }
+
+
+def _print_timings(
+    args: Any,
+) -> None:
+    # print collected durations and counters
+    if args.stats is not None:
+        import sys
+
+        print(args.stats.format(), file=sys.stderr)
+
+
+def _get_mermaid_texts(
+    args: Any,
+    classes: list[tuple[str, type]],
+) -> dict[str, str]:
+    # create the texts of all classes, sharing the name function and its cache
+    graph_kwargs = _get_graph_kwargs(args)
+    return {cid: get_mermaid_text(cls, **graph_kwargs) for cid, cls in classes}
+
+
+def _main_single(
+    args: Any,
+    mermaid_text: str,
+    test: bool = False,
+) -> None | list[str] | str:
+    import subprocess
+    import tempfile
 
     # trigger actions
     show_text = True
@@ -527,11 +2784,19 @@ def main(
     # download and / or visualize
     if args.download or args.visualize:
         with tempfile.NamedTemporaryFile(suffix=f".{args.file_type}") as f:
-            vis_path = download_graph(
-                mermaid_text,
-                args.download or f.name,
-                file_type=args.file_type,
-            )
+            from mermaidmro.render import render_graph
+
+            renderer_kwargs = {}
+            if args.renderer == "ink":
+                renderer_kwargs = {"cache": args.cache_dir or None, "stats": args.stats}
+            with _timer(args.stats, "render"):
+                vis_path = render_graph(
+                    mermaid_text,
+                    args.download or f.name,
+                    file_type=args.file_type,
+                    renderer=args.renderer,
+                    **renderer_kwargs,
+                )
 
             if args.visualize:
                 cmd = [args.visualize, vis_path] + (args.args or [])
@@ -543,7 +2808,7 @@ def main(
 
     if args.cmd:
         # open an url
-        mermaid_json = encode_json(mermaid_text)
+        mermaid_json = encode_json(mermaid_text, stats=args.stats)
         if args.edit:
             url = URL_EDIT_JSON.format(mermaid_json)
         else:
@@ -564,6 +2829,247 @@ def main(
         print(mermaid_text)
 
 
+def _main_batch(
+    args: Any,
+    classes: list[tuple[str, type]],
+    mermaid_texts: dict[str, str],
+    test: bool = False,
+) -> None | dict[str, Any]:
+    if not args.download:
+        # just print the texts, separated by comments
+        if test:
+            return mermaid_texts
+        print("\n\n".join(f"%% {cid}\n{text}" for cid, text in mermaid_texts.items()))
+        return None
+
+    # build output paths
+    paths = {
+        cid: args.download.format(module=cls.__module__, name=cls.__name__)
+        for cid, cls in classes
+    }
+    if len(set(paths.values())) != len(paths):
+        raise ValueError(f"download template '{args.download}' yields ambiguous paths")
+
+    # render locally or download in parallel
+    results: dict[str, Any] = {}
+    if args.renderer == "local":
+        from mermaidmro.render import render_graph
+
+        for cid, mermaid_text in mermaid_texts.items():
+            try:
+                with _timer(args.stats, "render"):
+                    results[cid] = render_graph(mermaid_text, paths[cid], file_type=args.file_type)
+            except Exception as e:
+                results[cid] = e
+    else:
+        with _timer(args.stats, "render"):
+            download_results = download_graphs(
+                [(mermaid_texts[cid], paths[cid]) for cid in mermaid_texts],
+                max_workers=args.jobs,
+                file_type=args.file_type,
+                cache=args.cache_dir or None,
+                stats=args.stats,
+            )
+        for cid, res in zip(mermaid_texts, download_results):
+            results[cid] = res.error or res.path
+
+    if test:
+        return results
+
+    # report failures
+    import sys
+
+    failed = {cid: res for cid, res in results.items() if isinstance(res, Exception)}
+    for cid, e in failed.items():
+        print(f"failed to render graph of {cid}: {e}", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+    return None
+
+
+def _get_watched_modules(
+    args: Any,
+    classes: list[tuple[str, type]],
+) -> list[Any]:
+    # modules of all classes in the graphs that are defined in source files outside of the python
+    # installation, with modules of base classes first so that they can be reloaded in order
+    import sys
+
+    relations_kwargs = {
+        attr: getattr(args, attr)
+        for attr in ["max_depth", "direction", "max_nodes"]
+    }
+
+    modules: dict[str, Any] = {}
+    for _, root_cls in classes:
+        graph_classes = list(reversed(root_cls.__mro__))
+        for rel in iter_relations(root_cls, **relations_kwargs):
+            graph_classes.append(rel.cls)
+        for cls in graph_classes:
+            mod = sys.modules.get(cls.__module__)
+            if cls.__module__ in modules or not _get_source_file(mod):
+                continue
+            modules[cls.__module__] = mod
+
+    return list(modules.values())
+
+
+def _get_source_file(
+    mod: Any,
+) -> str | None:
+    # path of the source file of a module, or None when it is not a python file or located within
+    # the python installation
+    path = getattr(mod, "__file__", None)
+    if (
+        not isinstance(path, str) or
+        not path.endswith(".py") or
+        os.path.realpath(path).startswith(_get_install_prefixes())
+    ):
+        return None
+
+    return path
+
+
+@functools.lru_cache(maxsize=1)
+def _get_install_prefixes() -> tuple[str, ...]:
+    # directory prefixes of the python installation
+    import sys
+
+    return tuple(
+        os.path.join(os.path.realpath(prefix), "")
+        for prefix in {sys.prefix, sys.base_prefix, sys.exec_prefix}
+    )
+
+
+def _get_socket_path() -> str:
+    # path of the unix socket of the daemon, see mermaidmro.daemon.get_socket_path, determined
+    # without further imports so that it can be checked cheaply on every invocation
+    path = os.getenv("MERMAIDMRO_SOCKET")
+    if path:
+        return os.path.expandvars(os.path.expanduser(path))
+
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, "mermaidmro.sock")
+
+    uid = os.getuid() if hasattr(os, "getuid") else os.getenv("USERNAME", "")
+    return os.path.join(_get_temp_dir(), f"mermaidmro-{uid}", "daemon.sock")
+
+
+def _get_temp_dir() -> str:
+    # the temporary directory defined by the TMPDIR, TEMP or TMP variables like in
+    # tempfile.gettempdir, defaulting to /tmp on posix systems without importing tempfile
+    for var in ("TMPDIR", "TEMP", "TMP"):
+        path = os.getenv(var)
+        if path:
+            return os.path.abspath(path)
+    if os.name == "posix":
+        return "/tmp"
+
+    import tempfile
+
+    return tempfile.gettempdir()
+
+
+def _get_mtime(
+    path: str,
+) -> int:
+    # modification time of a file in nanoseconds, or -1 when it does not exist
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return -1
+
+
+def _main_watch(
+    args: Any,
+    cids: list[str],
+    batch: bool,
+) -> None:
+    # run actions whenever the graph text changes after modules were reloaded
+    import sys
+    import time
+
+    def mtime(mod: Any) -> int:
+        return _get_mtime(mod.__file__)
+
+    mermaid_texts = None
+    modules: list[Any] = []
+    try:
+        while True:
+            # create texts and trigger actions when changed
+            try:
+                args.stats = Stats() if args.timings else None
+                with _timer(args.stats, "import"):
+                    classes = _resolve_classes(cids)
+                modules = _get_watched_modules(args, classes)
+                new_texts = _get_mermaid_texts(args, classes)
+                if new_texts != mermaid_texts:
+                    mermaid_texts = new_texts
+                    if batch:
+                        _main_batch(args, classes, mermaid_texts)
+                    else:
+                        _main_single(args, mermaid_texts[classes[0][0]])
+                    sys.stdout.flush()
+                    _print_timings(args)
+            except SystemExit:
+                # failures were already reported
+                pass
+            except Exception as e:
+                print(f"{e.__class__.__name__}: {e}", file=sys.stderr)
+            mtimes = [mtime(mod) for mod in modules]
+
+            # wait for changes
+            changed = None
+            while changed is None:
+                time.sleep(args.interval)
+                changed = next(
+                    (i for i, mod in enumerate(modules) if mtime(mod) != mtimes[i]),
+                    None,
+                )
+
+            # reload the first changed module and all subsequent ones that might depend on it
+            importlib.invalidate_caches()
+            for mod in modules[changed:]:
+                try:
+                    importlib.reload(mod)
+                except Exception as e:
+                    print(f"reloading {mod.__name__} failed: {e}", file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
+
+
+# members of submodules that are exposed lazily, mapped to the submodule name
+_lazy_attrs = {
+    "adownload_graph": "aio",
+    "adownload_graphs": "aio",
+    "render_graph": "render",
+    "get_renderer": "render",
+    "Renderer": "render",
+    "SVGRenderer": "render",
+    "InkRenderer": "render",
+    "discover_modules": "discover",
+    "import_modules": "discover",
+    "discover_classes": "discover",
+    "InheritanceIndex": "index",
+    "IncrementalGraphs": "incremental",
+    "diff_lines": "incremental",
+    "StaticExtractor": "static",
+    "extract_classes": "workers",
+    "WorkerResult": "workers",
+}
+
+
+def __getattr__(attr: str) -> Any:
+    # lazily expose members of submodules with heavier dependencies
+    if attr in _lazy_attrs:
+        mod = importlib.import_module(f"{__name__}.{_lazy_attrs[attr]}")
+        return getattr(mod, attr)
+
+    raise AttributeError(f"module '{__name__}' has no attribute '{attr}'")
+
+
 # entry hook
 if __name__ == "__main__":
     main()
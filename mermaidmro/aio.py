@@ -0,0 +1,231 @@
+# coding: utf-8
+
+"""
+Asynchronous variants of download functions based on :py:mod:`asyncio` streams.
+"""
+
+from __future__ import annotations
+
+__all__ = ["adownload_graph", "adownload_graphs"]
+
+import ssl
+import time
+import asyncio
+import urllib.error
+import urllib.parse
+from typing import Any, BinaryIO, Iterable
+
+import mermaidmro as mm
+
+
+#: Maximum number of redirects to follow.
+MAX_REDIRECTS = 5
+
+
+async def _read_headers(
+    reader: asyncio.StreamReader,
+) -> tuple[int, str, dict[str, str]]:
+    # parse the status line
+    status_line = (await reader.readline()).decode("latin-1").strip()
+    parts = status_line.split(None, 2)
+    if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+        raise ConnectionError(f"invalid status line '{status_line}'")
+    status = int(parts[1])
+    reason = parts[2] if len(parts) > 2 else ""
+
+    # parse headers until the empty line
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        key, _, value = line.partition(":")
+        headers[key.strip().lower()] = value.strip()
+
+    return status, reason, headers
+
+
+async def _read_body(
+    reader: asyncio.StreamReader,
+    headers: dict[str, str],
+    fileobj: BinaryIO,
+    chunk_size: int,
+) -> int:
+    # stream the response body to fileobj in chunks and return the number of written bytes
+    n = 0
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";", 1)[0].strip(), 16)
+            if size == 0:
+                # skip trailers
+                while (await reader.readline()).strip():
+                    pass
+                break
+            while size > 0:
+                data = await reader.readexactly(min(chunk_size, size))
+                fileobj.write(data)
+                size -= len(data)
+                n += len(data)
+            await reader.readexactly(2)
+    elif "content-length" in headers:
+        remaining = int(headers["content-length"])
+        while remaining > 0:
+            data = await reader.read(min(chunk_size, remaining))
+            if not data:
+                raise asyncio.IncompleteReadError(b"", remaining)
+            fileobj.write(data)
+            remaining -= len(data)
+            n += len(data)
+    else:
+        while True:
+            data = await reader.read(chunk_size)
+            if not data:
+                break
+            fileobj.write(data)
+            n += len(data)
+
+    return n
+
+
+async def _fetch(
+    url: str,
+    fileobj: BinaryIO,
+    chunk_size: int,
+) -> int:
+    # perform a get request, following redirects, and stream the body to fileobj
+    for _ in range(MAX_REDIRECTS + 1):
+        parts = urllib.parse.urlsplit(url)
+        https = parts.scheme == "https"
+        port = parts.port or (443 if https else 80)
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+        reader, writer = await asyncio.open_connection(
+            parts.hostname,
+            port,
+            ssl=ssl.create_default_context() if https else None,
+        )
+        try:
+            writer.write((
+                f"GET {target} HTTP/1.1\r\n"
+                f"Host: {parts.netloc}\r\n"
+                f"User-Agent: mermaidmro/{mm.__version__}\r\n"
+                "Accept: */*\r\n"
+                "Connection: close\r\n"
+                "\r\n"
+            ).encode("latin-1"))
+            await writer.drain()
+
+            status, reason, headers = await _read_headers(reader)
+
+            # handle redirects
+            if status in (301, 302, 303, 307, 308) and "location" in headers:
+                url = urllib.parse.urljoin(url, headers["location"])
+                continue
+
+            # check the status before writing
+            if status >= 400:
+                raise urllib.error.HTTPError(url, status, reason, headers, None)
+
+            return await _read_body(reader, headers, fileobj, chunk_size)
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+
+    raise ConnectionError(f"too many redirects for '{url}'")
+
+
+async def adownload_graph(
+    mermaid_text: str,
+    path: str,
+    file_type: str = "jpg",
+    theme: str | None = "default",
+    cache: mm.RenderCache | str | None = None,
+    timeout: float | None = None,
+    chunk_size: int = 64 * 1024,
+) -> str:
+    """
+    Asynchronous variant of :py:func:`mermaidmro.download_graph` based on :py:mod:`asyncio`
+    streams. The response body is streamed in chunks of *chunk_size* bytes to a temporary file next
+    to *path* which is renamed once the download succeeded, so that neither failures nor
+    cancellations leave partial files at *path*.
+
+    :param mermaid_text: The graph as a string representation.
+    :param path: The path where the downloaded file should be saved.
+    :param file_type: The file type to write, usually ``"jpg"`` or ``"png"``.
+    :param theme: Name of the theme to use.
+    :param cache: Optional cache of previously rendered graphs.
+    :param timeout: Optional timeout in seconds for the entire request.
+    :param chunk_size: Size of chunks in bytes that are written at a time.
+    :return: The absolute, normalized and expanded path.
+    """
+    # normalize path and ensure parent directory exists
+    path = mm._prepare_path(path)
+
+    # copy from the cache if possible
+    mermaid_json = mm.encode_json(mermaid_text, theme=theme)
+    cache = mm._get_cache(cache)
+    if mm._copy_from_cache(cache, mermaid_json, file_type, path):
+        return path
+
+    # download into a temporary file
+    url = mm.URL_STATIC_JSON.format(mermaid_json, file_type)
+    with mm._atomic_write(path) as f:
+        await asyncio.wait_for(_fetch(url, f, chunk_size), timeout)
+
+    # add to the cache
+    if cache is not None:
+        cache.put(mermaid_json, file_type, path)
+
+    return path
+
+
+async def adownload_graphs(
+    items: Iterable[tuple | dict[str, Any]],
+    max_concurrency: int = 8,
+    retries: int = 2,
+    backoff: float = 0.5,
+    timeout: float | None = 30.0,
+    **kwargs,
+) -> list[mm.DownloadResult]:
+    """
+    Asynchronous variant of :py:func:`mermaidmro.download_graphs` that downloads multiple graphs
+    concurrently via :py:func:`adownload_graph`, with at most *max_concurrency* downloads at a time.
+    Items, retries and results are handled in the same way. When the returned coroutine is
+    cancelled, all pending downloads are cancelled as well.
+
+    :param items: Sequence of tuples or dictionaries describing the graphs to download.
+    :param max_concurrency: Maximum number of concurrent downloads.
+    :param retries: Maximum number of retries per item.
+    :param backoff: Initial delay in seconds before retrying.
+    :param timeout: Timeout in seconds per request.
+    :return: List of :py:class:`mermaidmro.DownloadResult` objects.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def download(index: int, item_kwargs: dict[str, Any]) -> mm.DownloadResult:
+        async with semaphore:
+            t0 = time.perf_counter()
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    path = await adownload_graph(timeout=timeout, **item_kwargs)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # stop for errors that are not transient and when reaching the maximum number
+                    # of retries
+                    transient = isinstance(e, asyncio.TimeoutError) or mm._is_transient(e)
+                    if attempt > retries or not transient:
+                        return mm.DownloadResult(index, None, e, attempt, time.perf_counter() - t0)
+                    await asyncio.sleep(backoff * 2**(attempt - 1))
+                else:
+                    return mm.DownloadResult(index, path, None, attempt, time.perf_counter() - t0)
+
+    return list(await asyncio.gather(*(
+        download(index, item_kwargs)
+        for index, item_kwargs in enumerate(mm._build_items_kwargs(items, kwargs))
+    )))
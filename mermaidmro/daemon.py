@@ -0,0 +1,393 @@
+# coding: utf-8
+
+"""
+Long-running daemon that keeps imported modules warm and executes cli invocations forwarded
+through a local unix socket.
+"""
+
+from __future__ import annotations
+
+__all__ = ["Daemon", "forward", "get_socket_path"]
+
+import os
+import io
+import sys
+import json
+import socket
+import importlib
+import contextlib
+from typing import Any
+
+import mermaidmro as mm
+
+
+def get_socket_path() -> str:
+    """
+    Returns the path of the unix socket of the daemon, defined by the ``MERMAIDMRO_SOCKET``
+    environment variable and defaulting to a file in the user-specific runtime directory given by
+    ``XDG_RUNTIME_DIR``, or in a user-specific directory in the temporary directory, i.e.,
+    ``TMPDIR`` or ``/tmp``, that is only accessible by the user.
+
+    :return: The socket path.
+    """
+    return mm._get_socket_path()
+
+
+def _is_owned(
+    path: str,
+) -> bool:
+    # whether a file exists and is owned by the current user, without following symlinks
+    try:
+        return not hasattr(os, "getuid") or os.lstat(path).st_uid == os.getuid()
+    except OSError:
+        return False
+
+
+def _prepare_socket_dir(
+    socket_path: str,
+) -> None:
+    # create the directory of the default socket path that is only accessible by the current user,
+    # and refuse directories that were created by other users or are accessible by them
+    socket_dir = os.path.dirname(socket_path)
+    if os.path.dirname(socket_dir) != mm._get_temp_dir():
+        return
+
+    os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+    if not _is_owned(socket_dir) or os.stat(socket_dir).st_mode & 0o077:
+        raise RuntimeError(f"socket directory {socket_dir} is not private to the current user")
+
+
+def _send(
+    request: dict[str, Any],
+    socket_path: str | None = None,
+    timeout: float | None = None,
+) -> dict[str, Any]:
+    # send a request to the daemon and return its response, raising an OSError when no daemon is
+    # listening
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path or get_socket_path())
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError("daemon closed the connection without response")
+
+    return json.loads(line)
+
+
+def _get_environment() -> dict[str, Any]:
+    # description of the environment that determines which modules are imported
+    return {"executable": sys.executable, "path": sys.path}
+
+
+def forward(
+    cli_args: list[str],
+    socket_path: str | None = None,
+    timeout: float | None = 30.0,
+) -> int | None:
+    """
+    Forwards *cli_args* to a daemon listening on *socket_path*, defaulting to
+    :py:func:`get_socket_path`, writes its output to stdout and stderr and returns the exit code.
+    *None* is returned when no daemon is running, it runs in a different environment, i.e., with a
+    different interpreter or ``sys.path``, the socket is owned by another user, the platform
+    does not support unix sockets, or the daemon does not respond within *timeout* seconds, e.g.
+    because it hangs or is busy with other invocations, in which case the invocation should be
+    handled in the current process. The environment variables of the current process are applied
+    for the invocation in the daemon.
+
+    :param cli_args: Arguments of the cli invocation.
+    :param socket_path: The path of the socket.
+    :param timeout: Timeout in seconds for connecting to and receiving the response of the daemon.
+    :return: The exit code or *None*.
+    """
+    socket_path = socket_path or get_socket_path()
+    if not hasattr(socket, "AF_UNIX") or not _is_owned(socket_path):
+        return None
+
+    request = {
+        "command": "run",
+        "args": cli_args,
+        "cwd": os.getcwd(),
+        "env": dict(os.environ),
+        **_get_environment(),
+    }
+    try:
+        response = _send(request, socket_path=socket_path, timeout=timeout)
+    except socket.timeout:
+        print(f"daemon did not respond within {timeout}s, running locally", file=sys.stderr)
+        return None
+    except (OSError, ValueError):
+        return None
+    if response.get("error"):
+        return None
+
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+
+    return response["status"]
+
+
+class Daemon(object):
+    """
+    Daemon that executes cli invocations forwarded by :py:func:`forward` through a unix socket at
+    *socket_path*, defaulting to :py:func:`get_socket_path`, in a single long-running process.
+    Example:
+
+    .. code-block:: python
+
+        Daemon().serve()
+
+    Modules imported during invocations are kept, so that subsequent invocations for the same
+    packages only spend the time needed to create and process graphs. Before each invocation,
+    the source files of all imported modules outside of the python installation are checked for
+    changes, and if any has changed, all of these modules are removed so that they are imported
+    again, whereas packages installed in the python installation remain imported until the daemon
+    is restarted. Invocations are processed one at a time in the working directory of the client.
+
+    Names of classes and relations per root class are cached as well and passed to
+    :py:func:`mermaidmro.main`. Both caches are cleared when modules are removed, and cached
+    relations including subclasses are cleared whenever an invocation imports new modules.
+
+    Only clients with the same interpreter and ``sys.path`` as the daemon are served, others are
+    refused and handle invocations themselves.
+
+    :param socket_path: The path of the socket.
+    """
+
+    def __init__(
+        self,
+        socket_path: str | None = None,
+    ) -> None:
+        super().__init__()
+
+        self.socket_path = socket_path or get_socket_path()
+
+        # source files and modification times of imported modules per module name
+        self.files: dict[str, tuple[str, int]] = {}
+
+        # name function and relations shared across invocations
+        self.name_func = mm.get_default_name_func()
+        self.relations_cache: dict[tuple, list[mm.Relation]] = {}
+
+        # number of processed invocations and of evictions of changed modules
+        self.invocations = 0
+        self.evictions = 0
+
+        self._n_modules = len(sys.modules)
+        self._stopped = False
+
+    def refresh(self) -> bool:
+        """
+        Removes all imported modules outside of the python installation if the source file of any
+        of them changed since it was imported, and returns whether this was the case.
+
+        :return: Whether modules were removed.
+        """
+        importlib.invalidate_caches()
+        if all(mm._get_mtime(path) == mtime for path, mtime in self.files.values()):
+            return False
+
+        for name in self.files:
+            sys.modules.pop(name, None)
+        self.files.clear()
+        self.name_func = mm.get_default_name_func()
+        self.relations_cache.clear()
+        self.evictions += 1
+
+        return True
+
+    def _record(self) -> None:
+        # store source files and modification times of newly imported modules, except for modules
+        # of this package and the main module which are never removed
+        if len(sys.modules) != self._n_modules:
+            # new modules might define subclasses of cached classes
+            for key in [key for key in self.relations_cache if key[2] != "up"]:
+                del self.relations_cache[key]
+            self._n_modules = len(sys.modules)
+        for name, mod in list(sys.modules.items()):
+            if name in self.files or name == "__main__" or name.split(".", 1)[0] == "mermaidmro":
+                continue
+            path = mm._get_source_file(mod)
+            if path:
+                self.files[name] = (path, mm._get_mtime(path))
+
+    def run(
+        self,
+        cli_args: list[str],
+        cwd: str | None = None,
+        env: dict[str, str] | None = None,
+    ) -> dict[str, Any]:
+        """
+        Executes a cli invocation with *cli_args* in the working directory *cwd* and with the
+        environment variables *env* and returns a dictionary with its exit code, stdout and stderr.
+        The working directory and environment of the daemon are restored afterwards.
+
+        :param cli_args: Arguments of the cli invocation.
+        :param cwd: The working directory.
+        :param env: The environment variables.
+        :return: Dictionary with fields ``status``, ``stdout`` and ``stderr``.
+        """
+        self.refresh()
+
+        stdout, stderr = io.StringIO(), io.StringIO()
+        status = 0
+        prev_cwd = os.getcwd()
+        prev_env = dict(os.environ)
+        try:
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                try:
+                    if cwd:
+                        os.chdir(cwd)
+                    if env is not None:
+                        os.environ.clear()
+                        os.environ.update(env)
+                    mm.main(
+                        list(cli_args) + ["--no-daemon"],
+                        name_func=self.name_func,
+                        relations_cache=self.relations_cache,
+                    )
+                except SystemExit as e:
+                    if isinstance(e.code, str):
+                        print(e.code, file=sys.stderr)
+                    status = e.code if isinstance(e.code, int) else int(e.code is not None)
+                except Exception:
+                    import traceback
+
+                    traceback.print_exc()
+                    status = 1
+        finally:
+            os.chdir(prev_cwd)
+            if env is not None:
+                os.environ.clear()
+                os.environ.update(prev_env)
+            self._record()
+            self.invocations += 1
+
+        return {"status": status, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+
+    def handle(
+        self,
+        request: dict[str, Any],
+    ) -> dict[str, Any]:
+        """
+        Handles a *request* received through the socket and returns the response.
+
+        :param request: The request.
+        :return: The response.
+        """
+        command = request.get("command")
+        if command == "stop":
+            self._stopped = True
+            return {"status": 0}
+        if command == "ping":
+            return {"status": 0, "invocations": self.invocations, "evictions": self.evictions}
+        if command != "run":
+            return {"error": f"unknown command '{command}'"}
+
+        # compare environments
+        env = _get_environment()
+        if any(request.get(key) != value for key, value in env.items()):
+            return {"error": "environment mismatch"}
+
+        return self.run(request["args"], cwd=request.get("cwd"), env=request.get("env"))
+
+    def serve(self) -> None:
+        """
+        Listens on the socket and handles requests until a ``stop`` request is received, or the
+        process is interrupted.
+        """
+        # check for a running daemon and remove stale sockets, refusing those of other users
+        _prepare_socket_dir(self.socket_path)
+        if os.path.lexists(self.socket_path) and not _is_owned(self.socket_path):
+            raise RuntimeError(f"socket {self.socket_path} is owned by another user")
+        if os.path.exists(self.socket_path):
+            try:
+                _send({"command": "ping"}, socket_path=self.socket_path, timeout=1.0)
+            except (OSError, ValueError):
+                os.remove(self.socket_path)
+            else:
+                raise RuntimeError(f"daemon already listening on {self.socket_path}")
+
+        # only allow connections by the current user
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o177)
+        try:
+            server.bind(self.socket_path)
+        finally:
+            os.umask(umask)
+
+        self._stopped = False
+        try:
+            server.listen()
+            while not self._stopped:
+                conn, _ = server.accept()
+                with conn, conn.makefile("rwb") as f:
+                    try:
+                        response = self.handle(json.loads(f.readline()))
+                    except ValueError as e:
+                        response = {"error": f"invalid request: {e}"}
+                    try:
+                        f.write(json.dumps(response).encode("utf-8") + b"\n")
+                        f.flush()
+                    except OSError:
+                        # the client disconnected
+                        pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            os.remove(self.socket_path)
+
+
+def main(
+    cli_args: list[str] | None = None,
+) -> None:
+    """
+    Entry hook of the ``mermaidmro daemon`` command.
+
+    :param cli_args: Custom cli arguments.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="run a daemon that keeps imported modules warm and executes mermaidmro "
+        "invocations forwarded through a unix socket",
+        prog="mermaidmro daemon",
+    )
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="path of the unix socket; default: $MERMAIDMRO_SOCKET or a user-specific file in the "
+        "temporary directory",
+    )
+    parser.add_argument(
+        "--stop",
+        action="store_true",
+        help="stop a running daemon",
+    )
+    parser.add_argument(
+        "--status",
+        action="store_true",
+        help="print the status of a running daemon",
+    )
+    args = parser.parse_args(cli_args)
+
+    if args.stop or args.status:
+        try:
+            response = _send({"command": "stop" if args.stop else "ping"}, socket_path=args.socket)
+        except (OSError, ValueError):
+            print("no daemon running", file=sys.stderr)
+            sys.exit(1)
+        if args.status:
+            print(
+                f"daemon running, {response['invocations']} invocations, "
+                f"{response['evictions']} evictions",
+            )
+        return
+
+    try:
+        Daemon(socket_path=args.socket).serve()
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
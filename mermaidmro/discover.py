@@ -0,0 +1,197 @@
+# coding: utf-8
+
+"""
+Discovery of classes in entire packages, with per-module import timings and optional imports in
+parallel worker processes.
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    "discover_modules",
+    "import_modules",
+    "discover_classes",
+    "ModuleInfo",
+    "DiscoveryResult",
+]
+
+import os
+import sys
+import time
+import fnmatch
+import pkgutil
+import importlib
+import importlib.util
+import collections
+from typing import Iterable
+
+
+#: Information about an imported module, with its name, the import duration in seconds, a tuple of
+#: identifiers of classes defined in it in the format ``"module:class"``, and an error message in
+#: case the import failed (namedtuple).
+ModuleInfo = collections.namedtuple("ModuleInfo", ["name", "duration", "classes", "error"])
+
+#: Result of :py:func:`discover_classes`, with the list of discovered classes and a list of
+#: :py:class:`ModuleInfo` objects for all visited modules (namedtuple).
+DiscoveryResult = collections.namedtuple("DiscoveryResult", ["classes", "modules"])
+
+
+def discover_modules(
+    package: str,
+    exclude: Iterable[str] | None = None,
+) -> list[str]:
+    """
+    Returns the names of all modules in a *package*, including the package itself and modules in
+    subpackages, without importing them. Modules whose names match any of the patterns in *exclude*
+    are skipped, together with all their submodules.
+
+    :param package: The name of the package.
+    :param exclude: Patterns of module names to skip.
+    :return: List of module names.
+    """
+    exclude = list(exclude or [])
+
+    def skip(name: str) -> bool:
+        return any(fnmatch.fnmatchcase(name, pattern) for pattern in exclude)
+
+    spec = importlib.util.find_spec(package)
+    if spec is None:
+        raise ModuleNotFoundError(f"no package named '{package}'")
+    if skip(package):
+        return []
+
+    # walk search locations recursively and depth-first
+    names = [package]
+
+    def walk(paths: list[str], prefix: str) -> None:
+        for info in sorted(pkgutil.iter_modules(paths, prefix), key=lambda info: info.name):
+            if skip(info.name):
+                continue
+            names.append(info.name)
+            if info.ispkg:
+                sub_name = info.name.rsplit(".", 1)[-1]
+                walk([os.path.join(path, sub_name) for path in paths], f"{info.name}.")
+
+    if spec.submodule_search_locations:
+        walk(list(spec.submodule_search_locations), f"{package}.")
+
+    return names
+
+
+def _inspect_module(
+    name: str,
+) -> ModuleInfo:
+    # import a module, measure the duration and collect identifiers of classes defined in it
+    t0 = time.perf_counter()
+    try:
+        mod = importlib.import_module(name)
+    except BaseException as e:
+        # also catch system exits of modules that are not meant to be imported
+        if isinstance(e, KeyboardInterrupt):
+            raise
+        return ModuleInfo(name, time.perf_counter() - t0, (), f"{e.__class__.__name__}: {e}")
+    duration = time.perf_counter() - t0
+
+    classes = tuple(
+        f"{name}:{attr}"
+        for attr, obj in list(vars(mod).items())
+        if isinstance(obj, type) and obj.__module__ == name
+    )
+
+    return ModuleInfo(name, duration, classes, None)
+
+
+def _init_worker(
+    sys_path: list[str],
+) -> None:
+    # use the same import paths as the parent process, even when workers are spawned
+    sys.path[:] = sys_path
+
+
+def import_modules(
+    names: Iterable[str],
+    processes: int = 0,
+) -> list[ModuleInfo]:
+    """
+    Imports all modules in *names* and returns a list of :py:class:`ModuleInfo` objects in the same
+    order, containing import durations, identifiers of classes defined in each module and error
+    messages of failed imports, which are not raised.
+
+    When *processes* is positive, modules are imported in that many worker processes instead. Since
+    class objects cannot be transferred between processes, only their identifiers are returned.
+    This is useful to profile imports and to identify broken modules without affecting the
+    calling process. Note that durations measured in a worker do not include the time to import
+    dependencies that were already imported by a previous module in the same worker.
+
+    :param names: Names of modules to import.
+    :param processes: Number of worker processes, with imports done in the calling process when 0.
+    :return: List of :py:class:`ModuleInfo` objects.
+    """
+    names = list(names)
+
+    if processes <= 0:
+        return [_inspect_module(name) for name in names]
+
+    import concurrent.futures
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=processes,
+        initializer=_init_worker,
+        initargs=(list(sys.path),),
+    ) as pool:
+        chunksize = max(1, len(names) // (4 * processes))
+        return list(pool.map(_inspect_module, names, chunksize=chunksize))
+
+
+def discover_classes(
+    package: str,
+    pattern: str = "*",
+    base: type | None = None,
+    exclude: Iterable[str] | None = None,
+    processes: int = 0,
+) -> DiscoveryResult:
+    """
+    Discovers all classes defined in the modules of a *package* and returns a
+    :py:class:`DiscoveryResult` containing the classes and a :py:class:`ModuleInfo` object per
+    visited module with its import duration. Example:
+
+    .. code-block:: python
+
+        result = discover_classes("mypackage", base=BaseTask)
+
+        # slowest imports
+        sorted(result.modules, key=lambda info: -info.duration)[:10]
+
+        # the full forest of all tasks
+        get_mermaid_text_multi(result.classes, show_mro=False)
+
+    Classes can be filtered by matching their identifiers in the format ``"module:class"`` against
+    *pattern*, and by requiring them to be subclasses of *base*. Modules matching any of the
+    patterns in *exclude* are not imported. When *processes* is positive, modules are first
+    imported in worker processes via :py:func:`import_modules` to measure import timings in
+    isolation, and only modules that were imported successfully and that define matching classes
+    are imported in the calling process afterwards. This adds overhead, but protects the calling
+    process from modules that fail or exit during their import.
+
+    :param package: The name of the package.
+    :param pattern: Pattern that class identifiers must match.
+    :param base: Optional class that discovered classes must inherit from.
+    :param exclude: Patterns of module names to skip.
+    :param processes: Number of worker processes, with imports done in the calling process when 0.
+    :return: A :py:class:`DiscoveryResult` object.
+    """
+    infos = import_modules(discover_modules(package, exclude=exclude), processes=processes)
+
+    # collect matching classes, deduplicated in case of aliases
+    classes: dict[type, None] = {}
+    for info in infos:
+        cids = [cid for cid in info.classes if fnmatch.fnmatchcase(cid, pattern)]
+        if not cids:
+            continue
+        mod = importlib.import_module(info.name)
+        for cid in cids:
+            cls = getattr(mod, cid.split(":", 1)[1])
+            if base is None or issubclass(cls, base):
+                classes[cls] = None
+
+    return DiscoveryResult(list(classes), infos)
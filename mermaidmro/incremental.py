@@ -0,0 +1,249 @@
+# coding: utf-8
+
+"""
+Incremental updates of many graphs, e.g. for live-reloading documentation, where only graphs that
+are affected by changed classes or modules are recomputed.
+"""
+
+from __future__ import annotations
+
+__all__ = ["IncrementalGraphs", "GraphDiff", "diff_lines"]
+
+import sys
+import collections
+from typing import Any, Hashable, Iterable
+
+import mermaidmro as mm
+
+
+#: Difference between two versions of a graph identified by *key*, with the lists of removed and
+#: added lines (namedtuple).
+GraphDiff = collections.namedtuple("GraphDiff", ["key", "removed", "added"])
+
+
+def diff_lines(
+    old_lines: list[str],
+    new_lines: list[str],
+) -> tuple[list[str], list[str]]:
+    """
+    Computes the minimal difference between two lists of lines *old_lines* and *new_lines* of
+    graph texts, whose meaning does not depend on the order of node and relation lines, and returns
+    the lists of removed and added lines in their original order. Lines occurring multiple times
+    are compared by their number of occurrences.
+
+    :param old_lines: The previous lines.
+    :param new_lines: The new lines.
+    :return: Tuple of removed and added lines.
+    """
+    old_counts = collections.Counter(old_lines)
+    new_counts = collections.Counter(new_lines)
+
+    def diff(lines: list[str], counts: collections.Counter) -> list[str]:
+        # lines whose count exceeds that in counts, keeping the last occurrences
+        excess = collections.Counter(lines)
+        excess.subtract(counts)
+        result = []
+        for line in reversed(lines):
+            if excess[line] > 0:
+                result.append(line)
+                excess[line] -= 1
+        return result[::-1]
+
+    return diff(old_lines, new_counts), diff(new_lines, old_counts)
+
+
+def _resolve_class(
+    cls: type,
+) -> type | None:
+    # look up the current version of a class in its module, e.g. after the module was reloaded
+    obj: Any = sys.modules.get(cls.__module__)
+    for attr in cls.__qualname__.split("."):
+        obj = getattr(obj, attr, None)
+    return obj if isinstance(obj, type) else None
+
+
+class IncrementalGraphs(object):
+    """
+    Container of graphs for multiple root classes, identified by arbitrary keys, that keeps track
+    of the classes and modules each graph depends on. When classes or modules change, e.g. after
+    reloading a module during live-reloading of documentation, :py:meth:`update` only recomputes the
+    affected graphs and returns their line-based differences. Example:
+
+    .. code-block:: python
+
+        graphs = IncrementalGraphs(show_mro=False)
+        for cls in classes:
+            graphs.add(cls.__name__, cls)
+
+        importlib.reload(some_module)
+        for diff in graphs.update(modules=["some_module"]):
+            print(diff.key, diff.removed, diff.added)
+
+    Root classes of affected graphs are looked up again by their qualified name. Since classes
+    keep references to the base classes they were created with, modules defining subclasses of
+    changed classes must be reloaded as well, in the order of their dependencies, while passing
+    the first changed module is sufficient:
+
+    .. code-block:: python
+
+        # pkg.tasks defines subclasses of classes in pkg.base
+        importlib.reload(pkg.base)
+        importlib.reload(pkg.tasks)
+        graphs.update(modules=["pkg.base"])
+
+    All *kwargs* are forwarded to :py:func:`mermaidmro.get_relations` and
+    :py:func:`mermaidmro.iter_mermaid_lines` where applicable.
+
+    :param kwargs: Default arguments for creating graphs.
+    """
+
+    _relation_args = ("max_depth", "direction", "max_nodes")
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__()
+
+        # share the name function across graphs
+        if kwargs.get("name_func") is None:
+            kwargs["name_func"] = mm.get_default_name_func(skip_modules=kwargs.get("skip_modules"))
+        self.kwargs = kwargs
+
+        # root classes, lines and dependencies per key
+        self.roots: dict[Hashable, type] = {}
+        self.lines: dict[Hashable, list[str]] = {}
+        self._classes: dict[Hashable, set[type]] = {}
+
+        # reverse lookups of keys per class and module
+        self._class_keys: dict[type, set[Hashable]] = collections.defaultdict(set)
+        self._module_keys: dict[str, set[Hashable]] = collections.defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self.roots)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.roots
+
+    def text(
+        self,
+        key: Hashable,
+    ) -> str:
+        """
+        Returns the current text of the graph identified by *key*.
+
+        :param key: The key of the graph.
+        :return: The graph text.
+        """
+        return "\n".join(self.lines[key])
+
+    def add(
+        self,
+        key: Hashable,
+        root_cls: type,
+    ) -> str:
+        """
+        Adds or replaces the graph of a *root_cls* identified by *key* and returns its text.
+
+        :param key: The key of the graph.
+        :param root_cls: The root class of the graph.
+        :return: The graph text.
+        """
+        self.remove(key)
+
+        # determine dependencies
+        relations_kwargs = {
+            attr: self.kwargs[attr]
+            for attr in self._relation_args
+            if attr in self.kwargs
+        }
+        classes = {root_cls}
+        for rel in mm.iter_relations(root_cls, **relations_kwargs):
+            classes.add(rel.cls)
+            classes.add(rel.base_cls)
+
+        # create lines
+        self.roots[key] = root_cls
+        self.lines[key] = list(mm.iter_mermaid_lines(root_cls, **self.kwargs))
+        self._classes[key] = classes
+        for cls in classes:
+            self._class_keys[cls].add(key)
+            self._module_keys[cls.__module__].add(key)
+
+        return self.text(key)
+
+    def remove(
+        self,
+        key: Hashable,
+    ) -> None:
+        """
+        Removes the graph identified by *key*, if existing.
+
+        :param key: The key of the graph.
+        """
+        if key not in self.roots:
+            return
+
+        for cls in self._classes.pop(key):
+            for lookup, lookup_key in [(self._class_keys, cls), (self._module_keys, cls.__module__)]:
+                keys = lookup.get(lookup_key)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del lookup[lookup_key]
+        del self.roots[key]
+        del self.lines[key]
+
+    def affected(
+        self,
+        classes: Iterable[type] = (),
+        modules: Iterable[str] = (),
+    ) -> set[Hashable]:
+        """
+        Returns the keys of all graphs that depend on any of the *classes* or on classes defined in
+        any of the *modules*.
+
+        :param classes: Changed classes.
+        :param modules: Names of changed modules.
+        :return: Set of keys.
+        """
+        keys: set[Hashable] = set()
+        for cls in classes:
+            keys |= self._class_keys.get(cls, set())
+        for module in modules:
+            keys |= self._module_keys.get(module, set())
+        return keys
+
+    def update(
+        self,
+        classes: Iterable[type] = (),
+        modules: Iterable[str] = (),
+    ) -> list[GraphDiff]:
+        """
+        Recomputes all graphs that depend on any of the changed *classes* or on classes defined in
+        any of the changed *modules*, and returns a list of :py:class:`GraphDiff` objects for graphs
+        whose text changed. Root classes of affected graphs are looked up again in their modules,
+        which must have been reloaded if they depend on changed modules, and graphs whose root class
+        in a changed module no longer exists are removed, with all their lines reported as removed.
+
+        :param classes: Changed classes.
+        :param modules: Names of changed modules.
+        :return: List of :py:class:`GraphDiff` objects.
+        """
+        modules = set(modules)
+        diffs = []
+        for key in sorted(self.affected(classes, modules), key=str):
+            root_cls = self.roots[key]
+            old_lines = self.lines[key]
+
+            # look up the root class again, e.g. after its module was reloaded as a dependent of a
+            # changed module, keeping classes that cannot be looked up in unchanged modules
+            resolved_cls = _resolve_class(root_cls)
+            if resolved_cls is None and root_cls.__module__ in modules:
+                self.remove(key)
+                diffs.append(GraphDiff(key, old_lines, []))
+                continue
+
+            self.add(key, resolved_cls or root_cls)
+            removed, added = diff_lines(old_lines, self.lines[key])
+            if removed or added:
+                diffs.append(GraphDiff(key, removed, added))
+
+        return diffs
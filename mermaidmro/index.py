@@ -0,0 +1,310 @@
+# coding: utf-8
+
+"""
+Precomputed inheritance index for answering many graph queries over a fixed set of classes.
+"""
+
+from __future__ import annotations
+
+__all__ = ["InheritanceIndex"]
+
+import functools
+import collections
+from typing import Callable, Iterable, Iterator
+
+import mermaidmro as mm
+
+
+class InheritanceIndex(object):
+    """
+    Index over a set of *classes* and all their base classes that is built once and answers
+    queries for relations, ancestors, descendants and mermaid texts in time proportional to the
+    size of the output. Example:
+
+    .. code-block:: python
+
+        index = InheritanceIndex(discover_classes("mypackage").classes)
+
+        index.mermaid_text(SomeClass, max_depth=2)
+        index.descendants(BaseTask)
+
+    Each class is assigned a compact integer id, and base classes, subclasses and mros are stored
+    as tuples and lists of ids. Names are computed once via *name_func*, defaulting to the return
+    value of :py:func:`mermaidmro.get_default_name_func` passing *skip_modules*. Subclasses are
+    only tracked within the index, i.e., for classes passed to the constructor or :py:meth:`add`
+    and their base classes. Relations per root class and depth are additionally cached in a least
+    recently used cache with *cache_size* entries.
+
+    :param classes: Classes to add to the index.
+    :param name_func: A function to extract the string representation of a class.
+    :param skip_modules: Sequence of module names (or patterns) to skip when no *name_func* is set.
+    :param cache_size: Maximum number of cached relation lookups.
+    """
+
+    def __init__(
+        self,
+        classes: Iterable[type] = (),
+        name_func: Callable[[type], str] | None = None,
+        skip_modules: list[str] | set[str] | None = None,
+        cache_size: int = 1024,
+    ) -> None:
+        super().__init__()
+
+        # default name_func
+        if name_func is None:
+            name_func = mm.get_default_name_func(skip_modules=skip_modules)
+        self.name_func = name_func
+
+        # node table and adjacency
+        self.classes: list[type] = []
+        self._ids: dict[type, int] = {}
+        self._names: list[str] = []
+        self._bases: list[tuple[int, ...]] = []
+        self._subclasses: list[list[int]] = []
+        self._mros: list[tuple[int, ...]] = []
+
+        # cached relation lookups
+        self._relation_ids = functools.lru_cache(maxsize=cache_size)(self._compute_relation_ids)
+
+        for cls in classes:
+            self.add(cls)
+
+    def __len__(self) -> int:
+        return len(self.classes)
+
+    def __contains__(self, cls: type) -> bool:
+        return cls in self._ids
+
+    def __iter__(self) -> Iterator[type]:
+        return iter(self.classes)
+
+    def add(
+        self,
+        cls: type,
+    ) -> int:
+        """
+        Adds a class *cls* and all its base classes to the index and returns its id.
+
+        :param cls: The class to add.
+        :return: The id of the class.
+        """
+        if cls in self._ids:
+            return self._ids[cls]
+
+        # add bases first, in reversed mro order so that each base is added after its own bases,
+        # while relations of already indexed classes remain unchanged and cached lookups stay valid
+        for base_cls in reversed(cls.__mro__[1:]):
+            self.add(base_cls)
+
+        # add the node
+        cls_id = len(self.classes)
+        self.classes.append(cls)
+        self._ids[cls] = cls_id
+        self._names.append(self.name_func(cls))
+        self._bases.append(tuple(self._ids[base_cls] for base_cls in cls.__bases__))
+        self._subclasses.append([])
+        self._mros.append(tuple(self._ids[mro_cls] for mro_cls in cls.__mro__))
+        for base_id in self._bases[cls_id]:
+            self._subclasses[base_id].append(cls_id)
+
+        return cls_id
+
+    def id(
+        self,
+        cls: type,
+    ) -> int:
+        """
+        Returns the id of a class *cls*, raising a *KeyError* if it is not indexed.
+
+        :param cls: The class to look up.
+        :return: The id of the class.
+        """
+        try:
+            return self._ids[cls]
+        except KeyError:
+            raise KeyError(f"class {cls} not in index")
+
+    def name(
+        self,
+        cls: type,
+    ) -> str:
+        """
+        Returns the precomputed name of a class *cls*, or falls back to the name function of the
+        index if it is not indexed.
+
+        :param cls: The class to look up.
+        :return: The name of the class.
+        """
+        cls_id = self._ids.get(cls)
+        return self.name_func(cls) if cls_id is None else self._names[cls_id]
+
+    def _compute_relation_ids(
+        self,
+        root_id: int,
+        max_depth: int,
+    ) -> tuple[tuple[int, int, int, int], ...]:
+        # same traversal as in iter_relations, but on ids, returning tuples of
+        # (cls_id, base_id, depth, mro)
+        if max_depth == 0:
+            return ()
+
+        mro = {cls_id: i for i, cls_id in enumerate(self._mros[root_id])}
+        relations = []
+        lookup = collections.deque([(root_id, 0)])
+        queued = {root_id}
+        while lookup:
+            cls_id, depth = lookup.popleft()
+            for base_id in self._bases[cls_id]:
+                relations.append((cls_id, base_id, depth + 1, mro.get(base_id, -1)))
+                if (max_depth < 0 or depth + 1 < max_depth) and base_id not in queued:
+                    lookup.append((base_id, depth + 1))
+                    queued.add(base_id)
+
+        return tuple(relations)
+
+    def relations(
+        self,
+        root_cls: type,
+        max_depth: int = -1,
+    ) -> list[mm.Relation]:
+        """
+        Returns the same list of :py:class:`mermaidmro.Relation` objects as
+        :py:func:`mermaidmro.get_relations` for a *root_cls* and maximum depth *max_depth*.
+
+        :param root_cls: The root class to use.
+        :param max_depth: Maximum recursion depth.
+        :return: The list of found :py:class:`mermaidmro.Relation` objects.
+        """
+        classes = self.classes
+        return [
+            mm.Relation(classes[cls_id], classes[base_id], root_cls, depth, mro)
+            for cls_id, base_id, depth, mro in self._relation_ids(self.id(root_cls), max_depth)
+        ]
+
+    def ancestors(
+        self,
+        cls: type,
+        max_depth: int = -1,
+    ) -> list[type]:
+        """
+        Returns all base classes of a class *cls* that are reached within a maximum depth
+        *max_depth*, in the order of the mro of *cls*.
+
+        :param cls: The class to look up.
+        :param max_depth: Maximum recursion depth.
+        :return: List of base classes.
+        """
+        cls_id = self.id(cls)
+        if max_depth < 0:
+            return [self.classes[mro_id] for mro_id in self._mros[cls_id][1:]]
+
+        mro_ids = sorted({mro for _, _, _, mro in self._relation_ids(cls_id, max_depth)})
+        return [self.classes[self._mros[cls_id][mro]] for mro in mro_ids]
+
+    def descendants(
+        self,
+        cls: type,
+        max_depth: int = -1,
+    ) -> list[type]:
+        """
+        Returns all indexed subclasses of a class *cls* that are reached within a maximum depth
+        *max_depth*, in breadth-first order.
+
+        :param cls: The class to look up.
+        :param max_depth: Maximum recursion depth.
+        :return: List of subclasses.
+        """
+        cls_id = self.id(cls)
+        descendants = []
+        lookup = collections.deque([(cls_id, 0)])
+        queued = {cls_id}
+        while lookup:
+            cls_id, depth = lookup.popleft()
+            if 0 <= max_depth <= depth:
+                continue
+            for sub_id in self._subclasses[cls_id]:
+                if sub_id not in queued:
+                    descendants.append(self.classes[sub_id])
+                    lookup.append((sub_id, depth + 1))
+                    queued.add(sub_id)
+
+        return descendants
+
+    def mermaid_text(
+        self,
+        root_cls: type,
+        max_depth: int = -1,
+        styles: list[mm.Style | tuple] | None = None,
+        show_mro: bool = True,
+        graph_type: str = "TD",
+        arrow_type: str = "-->",
+        indentation: str = "    ",
+        skip_func: Callable[[type, Callable], bool] | None = None,
+        join_lines: bool = True,
+        group_styles: bool = False,
+    ) -> str | list[str]:
+        """
+        Returns the same text representation as :py:func:`mermaidmro.get_mermaid_text` for a
+        *root_cls*, using the precomputed relations and names of the index. See there for more info
+        on the arguments.
+
+        :param root_cls: The root class to use.
+        :param max_depth: Maximum recursion depth.
+        :param styles: Sequence of :py:class:`mermaidmro.Style` objects or tuples that can be
+            interpreted as such.
+        :param show_mro: Whether mro indices should be included.
+        :param graph_type: The mermaid graph type to use, e.g. ``"TD"`` or ``"LR"``.
+        :param arrow_type: The default arrow type to use between classes, e.g. ``"-->"``.
+        :param indentation: The indentation of lines.
+        :param skip_func: A function to decide whether a specific base class should be skipped
+            given the class itself and the name function of the index as arguments.
+        :param join_lines: Whether to join lines and return a string rather than a list of lines.
+        :param group_styles: Whether to group style assignments, see
+            :py:func:`mermaidmro.iter_style_lines`.
+        :return: The graph text.
+        """
+        root_id = self.id(root_cls)
+        relation_ids = self._relation_ids(root_id, max_depth)
+        names = self._names
+
+        # build lines directly from ids in the same format as iter_mermaid_lines
+        lines = [f"graph {graph_type}"]
+
+        # add labels with mro indices
+        if show_mro:
+            mro_ids = self._mros[root_id]
+            if max_depth < 0:
+                mros = range(len(mro_ids))
+            else:
+                mros = sorted({0} | {mro for _, _, _, mro in relation_ids})
+            for mro in mros:
+                name = names[mro_ids[mro]]
+                lines.append(f"{indentation}{name}(\"{name} ({mro})\")")
+            lines.append("")
+
+        # add relations
+        for cls_id, base_id, _, _ in relation_ids:
+            # potentially skip
+            if callable(skip_func) and skip_func(self.classes[base_id], self.name):
+                continue
+            lines.append(f"{indentation}{names[base_id]} {arrow_type} {names[cls_id]}")
+
+        # add styles
+        if styles:
+            # ids of classes in the graph for evaluating style selectors, in order of appearance
+            node_ids = dict.fromkeys(mro_ids[mro] for mro in mros) if show_mro else {}
+            for cls_id, base_id, _, _ in relation_ids:
+                if not (callable(skip_func) and skip_func(self.classes[base_id], self.name)):
+                    node_ids[base_id] = None
+                    node_ids[cls_id] = None
+
+            lines.append("")
+            lines.extend(mm.iter_style_lines(
+                styles,
+                indentation=indentation,
+                name_func=self.name,
+                classes=[self.classes[node_id] for node_id in node_ids],
+                group=group_styles,
+            ))
+
+        return "\n".join(lines) if join_lines else lines
@@ -0,0 +1,506 @@
+# coding: utf-8
+
+"""
+Pluggable renderers that turn mermaid graphs into image files, including a pure-Python backend that
+lays out graphs locally and writes svg files without network access.
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    "render_graph",
+    "get_renderer",
+    "parse_mermaid_text",
+    "renderers",
+    "Renderer",
+    "InkRenderer",
+    "SVGRenderer",
+    "ParsedGraph",
+]
+
+import re
+import abc
+import html
+import collections
+
+import mermaidmro as mm
+
+
+#: Parsed representation of a mermaid graph as created by :py:func:`parse_mermaid_text`, with
+#: the graph type, a dictionary mapping node names to labels in order of appearance, a list of
+#: edges as ``(source, target, arrow_type)`` tuples, a dictionary mapping style names to css
+#: strings, and a dictionary mapping node names to lists of style names (namedtuple).
+ParsedGraph = collections.namedtuple(
+    "ParsedGraph",
+    ["graph_type", "labels", "edges", "class_defs", "node_classes"],
+)
+
+# patterns of lines created by get_mermaid_text
+_re_graph = re.compile(r"^(?:graph|flowchart)\s+(\w+)$")
+_re_label = re.compile(r"^(\S+?)\(\"(.*)\"\)$")
+_re_class_def = re.compile(r"^classDef\s+(\S+)\s+(.*)$")
+_re_class = re.compile(r"^class\s+(\S+)\s+(\S+)$")
+_re_edge = re.compile(r"^(\S+)\s+([-=.ox<>]*[-=.][-=.ox<>]*)\s+(\S+)$")
+
+# theme colors as (node fill, node stroke, text, edge, background)
+_theme_colors = {
+    "default": ("#ECECFF", "#9370DB", "#333333", "#333333", "#FFFFFF"),
+    "neutral": ("#EEEEEE", "#999999", "#333333", "#666666", "#FFFFFF"),
+    "forest": ("#CDE498", "#13540C", "#333333", "#000000", "#FFFFFF"),
+    "dark": ("#1F2020", "#81B1DB", "#CCCCCC", "#D3D3D3", "#333333"),
+}
+
+
+def parse_mermaid_text(
+    mermaid_text: str,
+) -> ParsedGraph:
+    """
+    Parses the subset of the mermaid flowchart syntax that is created by
+    :py:func:`mermaidmro.get_mermaid_text` and returns a :py:class:`ParsedGraph`. Unknown lines are
+    ignored.
+
+    :param mermaid_text: The graph as a string representation.
+    :return: The parsed graph.
+    """
+    graph_type = "TD"
+    labels: dict[str, str] = {}
+    edges: list[tuple[str, str, str]] = []
+    class_defs: dict[str, str] = {}
+    node_classes: dict[str, list[str]] = collections.defaultdict(list)
+
+    for line in mermaid_text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+
+        m = _re_graph.match(line)
+        if m:
+            graph_type = m.group(1).upper()
+            continue
+
+        m = _re_class_def.match(line)
+        if m:
+            class_defs[m.group(1)] = m.group(2)
+            continue
+
+        m = _re_class.match(line)
+        if m:
+            for name in m.group(1).split(","):
+                node_classes[name].append(m.group(2))
+            continue
+
+        m = _re_label.match(line)
+        if m:
+            labels[m.group(1)] = m.group(2)
+            continue
+
+        m = _re_edge.match(line)
+        if m:
+            src, arrow_type, dst = m.groups()
+            edges.append((src, dst, arrow_type))
+            labels.setdefault(src, src)
+            labels.setdefault(dst, dst)
+
+    return ParsedGraph(graph_type, labels, edges, class_defs, dict(node_classes))
+
+
+class Renderer(abc.ABC):
+    """
+    Base class of renderers that write a graph given as mermaid text to a file. Subclasses must
+    implement :py:meth:`render` and define the supported :py:attr:`file_types`, the first of which
+    is used by default.
+    """
+
+    #: Supported file types.
+    file_types: tuple[str, ...] = ()
+
+    def check_file_type(
+        self,
+        file_type: str | None,
+    ) -> str:
+        """
+        Returns *file_type*, or the default file type when *None*, and raises a ``ValueError``
+        when it is not supported. Alternative names such as ``"jpeg"`` are accepted as well.
+        """
+        if file_type is None:
+            return self.file_types[0]
+        file_type = mm._file_type_aliases.get(file_type, file_type)
+        if file_type not in self.file_types:
+            raise ValueError(
+                f"file type '{file_type}' not supported by {self.__class__.__name__}, "
+                f"choose from {','.join(self.file_types)}",
+            )
+        return file_type
+
+    @abc.abstractmethod
+    def render(
+        self,
+        mermaid_text: str,
+        path: str,
+        file_type: str | None = None,
+        theme: str | None = "default",
+    ) -> str:
+        """
+        Renders the graph represented by *mermaid_text* to a *path* in a specific *file_type* and
+        returns the absolute, normalized and expanded path.
+        """
+        raise NotImplementedError
+
+
+class InkRenderer(Renderer):
+    """
+    Renderer that downloads graphs from the mermaid.ink service via
+    :py:func:`mermaidmro.download_graph`, forwarding all *kwargs* such as ``cache`` or ``timeout``.
+    """
+
+    file_types = ("png", "jpg")
+
+    def __init__(
+        self,
+        **kwargs,
+    ) -> None:
+        super().__init__()
+
+        self.kwargs = kwargs
+
+    def render(
+        self,
+        mermaid_text: str,
+        path: str,
+        file_type: str | None = None,
+        theme: str | None = "default",
+    ) -> str:
+        file_type = self.check_file_type(file_type)
+        return mm.download_graph(mermaid_text, path, file_type=file_type, theme=theme, **self.kwargs)
+
+
+class SVGRenderer(Renderer):
+    """
+    Renderer that lays out graphs locally and writes svg files, without any network access or
+    additional dependencies. The layout follows the layered approach by Sugiyama et al.: nodes are
+    assigned to layers by the length of the longest path from the most basic classes, edges
+    spanning multiple layers are split by virtual nodes, and nodes within layers are reordered by
+    their barycenters in a few alternating sweeps to reduce edge crossings.
+
+    :param font_size: The font size of labels in pixels.
+    :param node_sep: The spacing between nodes within a layer in pixels.
+    :param rank_sep: The spacing between layers in pixels.
+    :param sweeps: The number of sweeps for reducing edge crossings.
+    """
+
+    file_types = ("svg",)
+
+    def __init__(
+        self,
+        font_size: int = 14,
+        node_sep: int = 30,
+        rank_sep: int = 50,
+        sweeps: int = 4,
+    ) -> None:
+        super().__init__()
+
+        self.font_size = font_size
+        self.node_sep = node_sep
+        self.rank_sep = rank_sep
+        self.sweeps = sweeps
+
+    def node_size(
+        self,
+        label: str,
+    ) -> tuple[float, float]:
+        """
+        Returns the estimated width and height of a node with a *label*.
+        """
+        return len(label) * self.font_size * 0.6 + 2 * self.font_size, 2.6 * self.font_size
+
+    def layers(
+        self,
+        nodes: list[str],
+        edges: list[tuple[str, str, str]],
+    ) -> dict[str, int]:
+        """
+        Assigns *nodes* to layers given *edges* as ``(source, target, arrow_type)`` tuples, using
+        the longest path from nodes without incoming edges, and returns a dictionary mapping nodes
+        to their layer index. Nodes that are part of cycles are placed after all other layers.
+        """
+        succs = collections.defaultdict(list)
+        n_preds = collections.Counter()
+        for src, dst, _ in edges:
+            succs[src].append(dst)
+            n_preds[dst] += 1
+
+        # kahn's algorithm in topological order
+        layers = {node: 0 for node in nodes}
+        queue = collections.deque(node for node in nodes if not n_preds[node])
+        done = set()
+        while queue:
+            node = queue.popleft()
+            done.add(node)
+            for succ in succs[node]:
+                layers[succ] = max(layers[succ], layers[node] + 1)
+                n_preds[succ] -= 1
+                if not n_preds[succ]:
+                    queue.append(succ)
+
+        # handle remaining nodes in cycles
+        if len(done) < len(nodes):
+            last = max([layers[node] for node in done] + [-1]) + 1
+            for node in nodes:
+                if node not in done:
+                    layers[node] = last
+
+        return layers
+
+    def layout(
+        self,
+        graph: ParsedGraph,
+    ) -> tuple[dict[str, tuple], list[tuple[list[str], str]], float, float]:
+        """
+        Computes the layout of a parsed *graph* and returns a dictionary mapping node names to
+        their center coordinates, width and height, a list of edges given as lists of (real and
+        virtual) node names to pass through and the arrow type, and the total width and height.
+        """
+        nodes = list(graph.labels)
+        layers = self.layers(nodes, graph.edges)
+
+        # sizes of nodes, with virtual nodes being small
+        sizes = {node: self.node_size(graph.labels[node]) for node in nodes}
+
+        # split edges spanning multiple layers with virtual nodes
+        routes = []
+        preds = collections.defaultdict(list)
+        succs = collections.defaultdict(list)
+        for i, (src, dst, arrow_type) in enumerate(graph.edges):
+            route = [src]
+            for layer in range(layers[src] + 1, layers[dst]):
+                virtual = f"\0{i}:{layer}"
+                layers[virtual] = layer
+                sizes[virtual] = (0.0, 0.0)
+                route.append(virtual)
+            route.append(dst)
+            for a, b in zip(route[:-1], route[1:]):
+                succs[a].append(b)
+                preds[b].append(a)
+            routes.append((route, arrow_type))
+
+        # build ordered layers by first appearance
+        n_layers = max(layers.values(), default=-1) + 1
+        ordered = [[] for _ in range(n_layers)]
+        for node in nodes + [node for node in layers if node not in graph.labels]:
+            ordered[layers[node]].append(node)
+
+        # reduce crossings with alternating barycenter sweeps
+        pos = {node: i for layer in ordered for i, node in enumerate(layer)}
+        for sweep in range(self.sweeps):
+            down = sweep % 2 == 0
+            neighbors = preds if down else succs
+            for layer in (ordered[1:] if down else ordered[-2::-1]):
+                def barycenter(node: str) -> float:
+                    ns = [pos[n] for n in neighbors[node] if layers[n] != layers[node]]
+                    return sum(ns) / len(ns) if ns else pos[node]
+
+                layer.sort(key=barycenter)
+                pos.update((node, i) for i, node in enumerate(layer))
+
+        # main axis along layers, cross axis within layers
+        horizontal = graph.graph_type in ("LR", "RL")
+        main_size = lambda node: sizes[node][0 if horizontal else 1]
+        cross_size = lambda node: sizes[node][1 if horizontal else 0]
+        margin = self.font_size
+
+        # extents of layers
+        layer_main = [max(map(main_size, layer), default=0.0) for layer in ordered]
+        layer_cross = [
+            sum(map(cross_size, layer)) + self.node_sep * max(len(layer) - 1, 0)
+            for layer in ordered
+        ]
+        total_main = sum(layer_main) + self.rank_sep * max(n_layers - 1, 0) + 2 * margin
+        total_cross = max(layer_cross, default=0.0) + 2 * margin
+
+        # coordinates
+        coords = {}
+        main = margin
+        for layer, extent_main, extent_cross in zip(ordered, layer_main, layer_cross):
+            cross = margin + (total_cross - 2 * margin - extent_cross) / 2
+            for node in layer:
+                c_main = main + extent_main / 2
+                c_cross = cross + cross_size(node) / 2
+                if graph.graph_type in ("BT", "RL"):
+                    c_main = total_main - c_main
+                x, y = (c_main, c_cross) if horizontal else (c_cross, c_main)
+                coords[node] = (x, y) + sizes[node]
+                cross += cross_size(node) + self.node_sep
+            main += extent_main + self.rank_sep
+
+        width, height = (total_main, total_cross) if horizontal else (total_cross, total_main)
+
+        return coords, routes, width, height
+
+    def to_svg(
+        self,
+        mermaid_text: str,
+        theme: str | None = "default",
+    ) -> str:
+        """
+        Returns the svg representation of the graph given by *mermaid_text* using a *theme*.
+        """
+        graph = parse_mermaid_text(mermaid_text)
+        coords, routes, width, height = self.layout(graph)
+        fill, stroke, text_color, edge_color, background = _theme_colors.get(
+            theme or "default",
+            _theme_colors["default"],
+        )
+
+        lines = [
+            "<svg xmlns=\"http://www.w3.org/2000/svg\" "
+            f"width=\"{width:.0f}\" height=\"{height:.0f}\" "
+            f"viewBox=\"0 0 {width:.1f} {height:.1f}\">",
+            "  <defs>",
+            "    <marker id=\"arrow\" viewBox=\"0 0 10 10\" refX=\"10\" refY=\"5\" "
+            "markerWidth=\"8\" markerHeight=\"8\" orient=\"auto-start-reverse\">",
+            f"      <path d=\"M 0 0 L 10 5 L 0 10 z\" fill=\"{edge_color}\"/>",
+            "    </marker>",
+            "  </defs>",
+            f"  <rect width=\"100%\" height=\"100%\" fill=\"{background}\"/>",
+        ]
+
+        # edges
+        horizontal = graph.graph_type in ("LR", "RL")
+        for route, arrow_type in routes:
+            points = [coords[node][:2] for node in route]
+
+            # move end points to node borders
+            for i, j, sign in ((0, 1, 1), (-1, -2, -1)):
+                x, y, w, h = coords[route[i]]
+                axis = 0 if horizontal else 1
+                direction = 1 if points[j][axis] >= points[i][axis] else -1
+                offset = (w if horizontal else h) / 2 * direction
+                points[i] = (x + offset, y) if horizontal else (x, y + offset)
+
+            attrs = f"fill=\"none\" stroke=\"{edge_color}\""
+            if "." in arrow_type:
+                attrs += " stroke-dasharray=\"4 3\""
+            attrs += f" stroke-width=\"{3 if '=' in arrow_type else 1.5}\""
+            if arrow_type.endswith((">", "x", "o")):
+                attrs += " marker-end=\"url(#arrow)\""
+            d = " ".join(f"{x:.1f},{y:.1f}" for x, y in points)
+            lines.append(f"  <polyline points=\"{d}\" {attrs}/>")
+
+        # nodes
+        for node, label in graph.labels.items():
+            x, y, w, h = coords[node]
+            rect_style, text_style = self._node_styles(graph, node)
+            lines.extend([
+                f"  <g class=\"node\" id=\"{html.escape(node)}\">",
+                f"    <rect x=\"{x - w / 2:.1f}\" y=\"{y - h / 2:.1f}\" width=\"{w:.1f}\" "
+                f"height=\"{h:.1f}\" rx=\"5\" fill=\"{fill}\" stroke=\"{stroke}\" "
+                f"stroke-width=\"1\"{rect_style}/>",
+                f"    <text x=\"{x:.1f}\" y=\"{y:.1f}\" text-anchor=\"middle\" "
+                f"dominant-baseline=\"central\" font-family=\"sans-serif\" "
+                f"font-size=\"{self.font_size}\" fill=\"{text_color}\"{text_style}>"
+                f"{html.escape(label)}</text>",
+                "  </g>",
+            ])
+
+        lines.append("</svg>")
+
+        return "\n".join(lines) + "\n"
+
+    def _node_styles(
+        self,
+        graph: ParsedGraph,
+        node: str,
+    ) -> tuple[str, str]:
+        # convert css of assigned class definitions to style attributes of rects and texts
+        rect_css, text_css = [], []
+        for name in graph.node_classes.get(node, []):
+            css = graph.class_defs.get(name, "")
+            for prop in re.split(r",(?![^(]*\))", css):
+                key, _, value = prop.partition(":")
+                key, value = key.strip(), value.strip()
+                if not key or not value:
+                    continue
+                if key == "color":
+                    text_css.append(f"fill:{value}")
+                elif key.startswith("font-"):
+                    text_css.append(f"{key}:{value}")
+                else:
+                    rect_css.append(f"{key}:{value}")
+
+        to_attr = lambda css: f" style=\"{html.escape(';'.join(css))}\"" if css else ""
+        return to_attr(rect_css), to_attr(text_css)
+
+    def render(
+        self,
+        mermaid_text: str,
+        path: str,
+        file_type: str | None = None,
+        theme: str | None = "default",
+    ) -> str:
+        self.check_file_type(file_type)
+        path = mm._prepare_path(path)
+        with mm._atomic_write(path) as f:
+            f.write(self.to_svg(mermaid_text, theme=theme).encode("utf-8"))
+        return path
+
+
+#: Registry of renderer classes by name, used by :py:func:`get_renderer`.
+renderers: dict[str, type[Renderer]] = {
+    "ink": InkRenderer,
+    "local": SVGRenderer,
+}
+
+
+def get_renderer(
+    renderer: str | Renderer,
+    **kwargs,
+) -> Renderer:
+    """
+    Returns a :py:class:`Renderer` instance. When *renderer* is a string, the class registered
+    under that name in :py:data:`renderers` is instantiated with all *kwargs*.
+
+    :param renderer: A renderer instance or the name of a registered renderer class.
+    :return: The renderer instance.
+    """
+    if isinstance(renderer, Renderer):
+        return renderer
+
+    if renderer not in renderers:
+        raise ValueError(
+            f"unknown renderer '{renderer}', choose from {','.join(renderers)}",
+        )
+
+    return renderers[renderer](**kwargs)
+
+
+def render_graph(
+    mermaid_text: str,
+    path: str,
+    file_type: str | None = None,
+    theme: str | None = "default",
+    renderer: str | Renderer = "local",
+    **kwargs,
+) -> str:
+    """
+    Renders a mermaid graph represented by *mermaid_text* to a *path* in a specific *file_type*
+    using a *renderer*, which is either a :py:class:`Renderer` instance or the name of a registered
+    renderer class that is instantiated with *kwargs*. Example:
+
+    .. code-block:: python
+
+        # local svg rendering
+        render_graph(get_mermaid_text(D), "graph.svg")
+
+        # download from mermaid.ink
+        render_graph(get_mermaid_text(D), "graph.png", renderer="ink", cache="~/.cache/mm")
+
+    :param mermaid_text: The graph as a string representation.
+    :param path: The path where the rendered file should be saved.
+    :param file_type: The file type to write, defaulting to the first type supported by the
+        renderer.
+    :param theme: Name of the theme to use.
+    :param renderer: The renderer to use.
+    :return: The absolute, normalized and expanded path.
+    """
+    renderer = get_renderer(renderer, **kwargs)
+    return renderer.render(mermaid_text, path, file_type=file_type, theme=theme)
@@ -0,0 +1,581 @@
+# coding: utf-8
+
+"""
+HTTP service that creates mermaid texts, edit urls and rendered images of classes given via query
+parameters, with in-memory caches and metrics.
+"""
+
+from __future__ import annotations
+
+__all__ = ["GraphServer", "LRUCache"]
+
+import os
+import sys
+import json
+import time
+import fnmatch
+import hashlib
+import tempfile
+import threading
+import collections
+import http.server
+import urllib.parse
+import concurrent.futures
+from typing import Any, Callable
+
+import mermaidmro as mm
+
+
+class LRUCache(object):
+    """
+    Thread-safe, in-memory cache that evicts least recently used entries when the total size of all
+    values exceeds *max_size* bytes. Values are either bytes or strings, whose sizes are measured
+    in utf-8 encoding. Values larger than *max_size* are not stored. Cache hits and misses are
+    counted in :py:attr:`hits` and :py:attr:`misses`.
+
+    :param max_size: Maximum size of all values in bytes.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+    ) -> None:
+        super().__init__()
+
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: collections.OrderedDict[Any, tuple[bytes | str, int]] = \
+            collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self,
+        key: Any,
+    ) -> bytes | str | None:
+        """
+        Returns the value stored for *key* and marks it as recently used, or *None* if it is not
+        cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(
+        self,
+        key: Any,
+        value: bytes | str,
+    ) -> None:
+        """
+        Stores a *value* for *key* and evicts least recently used entries if needed.
+        """
+        size = len(value.encode("utf-8") if isinstance(value, str) else value)
+        if size > self.max_size:
+            return
+
+        with self._lock:
+            prev = self._entries.pop(key, None)
+            if prev is not None:
+                self.size -= prev[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_size:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Returns a dictionary with the number of hits and misses, the hit rate, the number of entries
+        and their total size in bytes.
+        """
+        with self._lock:
+            n = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / n if n else 0.0,
+                "entries": len(self._entries),
+                "size": self.size,
+            }
+
+
+def _parse_bool(
+    value: str,
+) -> bool:
+    # parse boolean query parameters
+    value = value.lower()
+    if value in ("1", "true", "yes"):
+        return True
+    if value in ("0", "false", "no"):
+        return False
+    raise ValueError(f"invalid boolean value '{value}'")
+
+
+#: Options of :py:func:`mermaidmro.get_mermaid_text` accepted as query parameters, mapped to
+#: functions converting their values.
+graph_options: dict[str, Callable[[str], Any]] = {
+    "max_depth": int,
+    "show_mro": _parse_bool,
+    "graph_type": str,
+    "arrow_type": str,
+    "direction": str,
+    "max_nodes": int,
+    "skip_modules": lambda value: tuple(value.split(",")),
+    "reduce_edges": _parse_bool,
+    "collapse_chains": _parse_bool,
+    "hide_bases": _parse_bool,
+}
+
+# content types per file type
+_content_types = {"png": "image/png", "jpg": "image/jpeg", "svg": "image/svg+xml"}
+
+
+class _HTTPError(Exception):
+
+    def __init__(
+        self,
+        status: int,
+        message: str,
+    ) -> None:
+        super().__init__(message)
+
+        self.status = status
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    server: GraphServer
+
+    def setup(self) -> None:
+        # close idle keep-alive connections so that they do not block threads of the pool
+        self.timeout = self.server.idle_timeout
+        super().setup()
+
+    def do_GET(self) -> None:
+        t0 = time.perf_counter()
+        url = urllib.parse.urlsplit(self.path)
+        endpoint = url.path.rstrip("/") or "/"
+        headers: dict[str, str] = {}
+        try:
+            query = urllib.parse.parse_qs(url.query, keep_blank_values=True)
+            params = {key: values[-1] for key, values in query.items()}
+            status, content_type, body, headers = self.server.handle(endpoint, params)
+        except _HTTPError as e:
+            status, content_type, body = e.status, "text/plain", str(e).encode("utf-8")
+        except Exception as e:
+            status, content_type = 500, "text/plain"
+            body = f"{e.__class__.__name__}: {e}".encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+        self.server.record(endpoint, status, time.perf_counter() - t0)
+
+    def log_message(self, *args, **kwargs) -> None:
+        if self.server.verbose:
+            super().log_message(*args, **kwargs)
+
+
+class GraphServer(http.server.HTTPServer):
+    """
+    HTTP server that creates graphs of classes given via query parameters, handling requests
+    concurrently in a pool of *threads* worker threads. Example:
+
+    .. code-block:: python
+
+        server = GraphServer(("127.0.0.1", 8000), renderer="local", allow=["mypkg.*"])
+        server.serve_forever()
+
+    The following endpoints are available, all accepting the class in the format
+    ``"module.to.import:class"`` via the ``cls`` parameter and options of
+    :py:func:`mermaidmro.get_mermaid_text` defined in :py:data:`graph_options` as further query
+    parameters, e.g. ``/text?cls=pkg.models:Task&max_depth=2&show_mro=false``:
+
+        - ``/text``: The mermaid text.
+        - ``/edit``: Redirect to the mermaid live editor, with the url in the response body.
+        - ``/image``: The rendered image, using the *renderer* created via
+          :py:func:`mermaidmro.get_renderer` with *renderer_kwargs*, with optional ``file_type``
+          and ``theme`` parameters. The mermaid.ink service is used as a proxy by the default
+          ``"ink"`` renderer, and ``"local"`` renders svg files without network access.
+        - ``/metrics``: Numbers of requests per endpoint and status code, latency percentiles in
+          milliseconds, statistics of both caches, and durations and counters of stages as
+          collected by a :py:class:`mermaidmro.Stats` object, as json.
+
+    Generated texts and images are kept in :py:class:`LRUCache` objects limited to
+    *text_cache_size* and *image_cache_size* bytes. Classes are imported once in the server
+    process, so that changes to their source files require a restart.
+
+    Since importing a module executes its code, only classes in modules matching any of the
+    patterns in *allow* can be requested, and no classes at all when it is empty. Pass ``["*"]``
+    to allow all modules only when the server is not reachable by untrusted clients. Connections
+    are kept alive between requests, but closed after being idle for *idle_timeout* seconds, so
+    that idle clients do not occupy the threads of the pool.
+
+    :param server_address: The host and port to listen on.
+    :param threads: The number of worker threads.
+    :param renderer: The renderer to use for images.
+    :param renderer_kwargs: Arguments for creating the renderer.
+    :param text_cache_size: Maximum size of cached texts in bytes.
+    :param image_cache_size: Maximum size of cached images in bytes.
+    :param allow: Patterns of module names of classes that can be requested.
+    :param idle_timeout: Seconds after which idle connections are closed.
+    :param verbose: Whether requests are logged to stderr.
+    """
+
+    #: Number of recent requests per endpoint used for latency percentiles.
+    latency_window = 10000
+
+    def __init__(
+        self,
+        server_address: tuple[str, int] = ("127.0.0.1", 8000),
+        threads: int = 8,
+        renderer: str | Any = "ink",
+        renderer_kwargs: dict[str, Any] | None = None,
+        text_cache_size: int = 16 * 1024**2,
+        image_cache_size: int = 256 * 1024**2,
+        allow: list[str] | None = None,
+        idle_timeout: float = 10.0,
+        verbose: bool = False,
+    ) -> None:
+        from mermaidmro.render import get_renderer
+
+        self.stats = mm.Stats()
+        renderer_kwargs = dict(renderer_kwargs or {})
+        if renderer == "ink":
+            renderer_kwargs.setdefault("stats", self.stats)
+        self.renderer = get_renderer(renderer, **renderer_kwargs)
+        self.text_cache = LRUCache(text_cache_size)
+        self.image_cache = LRUCache(image_cache_size)
+        self.allow = list(allow or [])
+        self.idle_timeout = idle_timeout
+        self.verbose = verbose
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=threads)
+
+        # request counts per endpoint and status code, and recent latencies per endpoint
+        self.start_time = time.time()
+        self.requests: collections.Counter[str] = collections.Counter()
+        self.statuses: collections.Counter[int] = collections.Counter()
+        self.latencies: dict[str, collections.deque[float]] = {}
+        self._lock = threading.Lock()
+
+        super().__init__(server_address, _Handler)
+
+    def process_request(
+        self,
+        request: Any,
+        client_address: Any,
+    ) -> None:
+        # handle requests in the thread pool
+        self.pool.submit(self._process_request, request, client_address)
+
+    def _process_request(
+        self,
+        request: Any,
+        client_address: Any,
+    ) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+    def handle_error(
+        self,
+        request: Any,
+        client_address: Any,
+    ) -> None:
+        # clients disconnecting early are not an error of the server
+        if self.verbose:
+            super().handle_error(request, client_address)
+
+    def record(
+        self,
+        endpoint: str,
+        status: int,
+        duration: float,
+    ) -> None:
+        """
+        Records a request to an *endpoint* with a response *status* that took *duration* seconds.
+        """
+        with self._lock:
+            self.requests[endpoint] += 1
+            self.statuses[status] += 1
+            if endpoint not in self.latencies:
+                self.latencies[endpoint] = collections.deque(maxlen=self.latency_window)
+            self.latencies[endpoint].append(duration)
+
+    def metrics(self) -> dict[str, Any]:
+        """
+        Returns a dictionary with all metrics as served by the ``/metrics`` endpoint.
+        """
+        def percentile(values: list[float], p: float) -> float:
+            return values[min(len(values) - 1, int(p * len(values)))] * 1e3
+
+        with self._lock:
+            latency = {}
+            for endpoint, durations in self.latencies.items():
+                values = sorted(durations)
+                latency[endpoint] = {
+                    "p50": percentile(values, 0.5),
+                    "p90": percentile(values, 0.9),
+                    "p99": percentile(values, 0.99),
+                    "max": values[-1] * 1e3,
+                }
+            return {
+                "uptime": time.time() - self.start_time,
+                "requests": {
+                    "total": sum(self.requests.values()),
+                    "endpoints": dict(self.requests),
+                    "statuses": {str(status): n for status, n in sorted(self.statuses.items())},
+                },
+                "latency": latency,
+                "caches": {"text": self.text_cache.stats(), "image": self.image_cache.stats()},
+                "stages": self.stats.to_dict(),
+            }
+
+    def handle(
+        self,
+        endpoint: str,
+        params: dict[str, str],
+    ) -> tuple[int, str, bytes, dict[str, str]]:
+        """
+        Handles a request to an *endpoint* with query *params* and returns the status code, content
+        type, body and additional headers of the response.
+        """
+        if endpoint == "/metrics":
+            body = json.dumps(self.metrics(), indent=4).encode("utf-8")
+            return 200, "application/json", body, {}
+
+        if endpoint == "/text":
+            mermaid_text = self.get_text(params)
+            return 200, "text/plain; charset=utf-8", mermaid_text.encode("utf-8"), {}
+
+        if endpoint == "/edit":
+            url = mm.URL_EDIT_JSON.format(mm.encode_json(self.get_text(params), stats=self.stats))
+            return 302, "text/plain", url.encode("utf-8"), {"Location": url}
+
+        if endpoint == "/image":
+            params = dict(params)
+            theme = params.pop("theme", "default")
+            try:
+                file_type = self.renderer.check_file_type(params.pop("file_type", None))
+            except ValueError as e:
+                raise _HTTPError(400, str(e))
+            image = self.get_image(self.get_text(params), file_type, theme)
+            return 200, _content_types[file_type], image, {}
+
+        raise _HTTPError(404, f"unknown endpoint '{endpoint}'")
+
+    def get_text(
+        self,
+        params: dict[str, str],
+    ) -> str:
+        """
+        Returns the mermaid text for query *params*, taken from the cache if possible.
+        """
+        params = dict(params)
+        cid = params.pop("cls", None)
+        if not cid:
+            raise _HTTPError(400, "missing parameter 'cls'")
+        if ":" not in cid or mm._is_pattern(cid):
+            raise _HTTPError(400, f"invalid class '{cid}', expected format 'module:class'")
+
+        # convert options
+        options = {}
+        for key, value in params.items():
+            if key not in graph_options:
+                raise _HTTPError(
+                    400,
+                    f"unknown parameter '{key}', choose from cls,{','.join(graph_options)}",
+                )
+            try:
+                options[key] = graph_options[key](value)
+            except ValueError as e:
+                raise _HTTPError(400, f"invalid value of parameter '{key}': {e}")
+
+        key = (cid, tuple(sorted(options.items())))
+        mermaid_text = self.text_cache.get(key)
+        if mermaid_text is not None:
+            return mermaid_text
+
+        # import the class
+        module_name = cid.split(":", 1)[0]
+        if not any(fnmatch.fnmatchcase(module_name, p) for p in self.allow):
+            raise _HTTPError(403, f"module '{module_name}' is not allowed")
+        try:
+            with self.stats.timer("import"):
+                cls = mm._import_class(cid)
+        except (ImportError, AttributeError) as e:
+            raise _HTTPError(404, f"{e.__class__.__name__}: {e}")
+
+        try:
+            mermaid_text = mm.get_mermaid_text(cls, stats=self.stats, **options)
+        except (ValueError, TypeError) as e:
+            raise _HTTPError(400, str(e))
+        self.text_cache.put(key, mermaid_text)
+
+        return mermaid_text
+
+    def get_image(
+        self,
+        mermaid_text: str,
+        file_type: str,
+        theme: str = "default",
+    ) -> bytes:
+        """
+        Returns the image of a graph represented by *mermaid_text* in a *file_type* and *theme*,
+        taken from the cache if possible.
+        """
+        key = (file_type, theme, hashlib.sha256(mermaid_text.encode("utf-8")).hexdigest())
+        image = self.image_cache.get(key)
+        if image is not None:
+            return image
+
+        with tempfile.TemporaryDirectory() as d:
+            try:
+                with self.stats.timer("render"):
+                    path = self.renderer.render(
+                        mermaid_text,
+                        os.path.join(d, f"graph.{file_type}"),
+                        file_type=file_type,
+                        theme=theme,
+                    )
+            except Exception as e:
+                raise _HTTPError(502, f"rendering failed: {e.__class__.__name__}: {e}")
+            with open(path, "rb") as f:
+                image = f.read()
+        self.image_cache.put(key, image)
+
+        return image
+
+
+def main(
+    cli_args: list[str] | None = None,
+) -> None:
+    """
+    Entry hook of the ``mermaidmro serve`` command.
+
+    :param cli_args: Custom cli arguments.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="serve mermaid texts, edit urls and images of classes over http",
+        prog="mermaidmro serve",
+    )
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="the host to listen on; default: 127.0.0.1",
+    )
+    parser.add_argument(
+        "--port",
+        "-p",
+        type=int,
+        default=8000,
+        help="the port to listen on; default: 8000",
+    )
+    parser.add_argument(
+        "--threads",
+        metavar="N",
+        type=int,
+        default=8,
+        help="number of threads handling requests; default: 8",
+    )
+    parser.add_argument(
+        "--renderer",
+        "-r",
+        choices=["ink", "local"],
+        default="ink",
+        help="the renderer to use for images, with 'ink' referring to the mermaid.ink service and "
+        "'local' to the offline svg renderer; default: 'ink'",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        metavar="PATH",
+        help="directory for caching images downloaded from mermaid.ink on disk; no caching when "
+        "empty",
+    )
+    parser.add_argument(
+        "--text-cache-size",
+        metavar="MB",
+        type=float,
+        default=16,
+        help="maximum size of texts cached in memory in MB; default: 16",
+    )
+    parser.add_argument(
+        "--image-cache-size",
+        metavar="MB",
+        type=float,
+        default=256,
+        help="maximum size of images cached in memory in MB; default: 256",
+    )
+    parser.add_argument(
+        "--allow",
+        metavar="PATTERN",
+        nargs="+",
+        required=True,
+        help="patterns of module names of classes that can be requested, e.g. 'mypkg.*'; note "
+        "that requesting a class imports its module and thus executes its code, so use '*' to "
+        "allow all modules only when the server is not reachable by untrusted clients",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        metavar="SECONDS",
+        type=float,
+        default=10.0,
+        help="seconds after which idle connections are closed; default: 10",
+    )
+    parser.add_argument(
+        "--verbose",
+        "-v",
+        action="store_true",
+        help="log requests to stderr",
+    )
+    args = parser.parse_args(cli_args)
+
+    renderer_kwargs = {}
+    if args.renderer == "ink" and args.cache_dir:
+        renderer_kwargs["cache"] = args.cache_dir
+
+    server = GraphServer(
+        (args.host, args.port),
+        threads=args.threads,
+        renderer=args.renderer,
+        renderer_kwargs=renderer_kwargs,
+        text_cache_size=int(args.text_cache_size * 1024**2),
+        image_cache_size=int(args.image_cache_size * 1024**2),
+        allow=args.allow,
+        idle_timeout=args.idle_timeout,
+        verbose=args.verbose,
+    )
+    host, port = server.server_address[:2]
+    print(f"serving on http://{host}:{port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
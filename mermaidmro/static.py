@@ -0,0 +1,655 @@
+# coding: utf-8
+
+"""
+Static extraction of class hierarchies by parsing source files with :py:mod:`ast`, without
+importing any code, e.g. on documentation build nodes where imports are slow, have side effects or
+require unavailable dependencies.
+"""
+
+from __future__ import annotations
+
+__all__ = ["StaticExtractor", "StaticClass", "ModuleDefs", "c3_linearize"]
+
+import os
+import sys
+import ast
+import json
+import fnmatch
+import hashlib
+import builtins
+import collections
+from typing import Any, Callable, Iterable
+
+import mermaidmro as mm
+
+
+#: Definitions found in the source file of a module, with the module *name*, the *path* of the
+#: file, a dictionary mapping qualified names of *classes* to lists containing the dotted
+#: expressions of their bases (*None* for expressions that cannot be resolved statically) and line
+#: numbers, dictionaries mapping names bound by *imports* to fully qualified targets and names of
+#: simple *aliases* to dotted expressions, the list of modules imported via *stars*, and an *error*
+#: message in case the file could not be parsed (namedtuple).
+ModuleDefs = collections.namedtuple(
+    "ModuleDefs",
+    ["name", "path", "classes", "imports", "aliases", "stars", "error"],
+)
+
+# version of the cache format, to be increased when the parsing logic changes
+_cache_version = 1
+
+
+def _expr_name(
+    node: ast.expr,
+) -> str | None:
+    # dotted name of a base class expression, ignoring subscripts such as Generic[T]
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        value = _expr_name(node.value)
+        return value and f"{value}.{node.attr}"
+    if isinstance(node, ast.Subscript):
+        return _expr_name(node.value)
+    return None
+
+
+def _parse_source(
+    source: str | bytes,
+    name: str,
+    path: str | None = None,
+    is_package: bool = False,
+) -> ModuleDefs:
+    # extract class definitions, imports and aliases of a module, with the first binding of each
+    # name taking precedence, e.g. in conditional definitions or try-except imports
+    try:
+        tree = ast.parse(source, filename=path or "<unknown>")
+    except (SyntaxError, ValueError) as e:
+        return ModuleDefs(name, path, {}, {}, {}, [], f"{e.__class__.__name__}: {e}")
+
+    package = name if is_package else name.rpartition(".")[0]
+    classes: dict[str, list] = {}
+    imports: dict[str, str] = {}
+    aliases: dict[str, str] = {}
+    stars: list[str] = []
+
+    def bound(attr: str) -> bool:
+        return attr in classes or attr in imports or attr in aliases
+
+    def visit(body: list[ast.stmt], prefix: str) -> None:
+        for node in body:
+            if isinstance(node, ast.ClassDef):
+                qualname = prefix + node.name
+                if not bound(qualname):
+                    classes[qualname] = [[_expr_name(base) for base in node.bases], node.lineno]
+                    visit(node.body, f"{qualname}.")
+                continue
+
+            # names in class bodies are not visible to base class expressions on module level
+            if prefix:
+                continue
+
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    if alias.asname:
+                        if not bound(alias.asname):
+                            imports[alias.asname] = alias.name
+                    else:
+                        head = alias.name.split(".", 1)[0]
+                        if not bound(head):
+                            imports[head] = head
+            elif isinstance(node, ast.ImportFrom):
+                module = node.module or ""
+                if node.level:
+                    parts = package.split(".") if package else []
+                    parts = parts[:len(parts) - (node.level - 1)]
+                    module = ".".join(parts + ([module] if module else []))
+                for alias in node.names:
+                    if alias.name == "*":
+                        stars.append(module)
+                    elif not bound(alias.asname or alias.name):
+                        imports[alias.asname or alias.name] = f"{module}.{alias.name}"
+            elif isinstance(node, ast.Assign):
+                value = _expr_name(node.value)
+                if value and not isinstance(node.value, ast.Subscript):
+                    for target in node.targets:
+                        if isinstance(target, ast.Name) and not bound(target.id):
+                            aliases[target.id] = value
+            elif isinstance(node, (ast.If, ast.Try, ast.With)):
+                for attr in ("body", "orelse", "finalbody"):
+                    visit(getattr(node, attr, []), prefix)
+                for handler in getattr(node, "handlers", []):
+                    visit(handler.body, prefix)
+
+    visit(tree.body, "")
+
+    return ModuleDefs(name, path, classes, imports, aliases, stars, None)
+
+
+def _parse_file(
+    args: tuple[str, str, bool],
+) -> ModuleDefs:
+    # parse a source file given its path, module name and whether it is a package
+    path, name, is_package = args
+    with open(path, "rb") as f:
+        return _parse_source(f.read(), name, path=path, is_package=is_package)
+
+
+def c3_linearize(
+    cls: Any,
+) -> list[Any]:
+    """
+    Computes the method resolution order of a class *cls* with the C3 linearization, given the
+    ``__bases__`` of the class and the ``__mro__`` of each base, which works for both
+    :py:class:`StaticClass` objects and actual classes.
+
+    :param cls: The class.
+    :raises TypeError: If no consistent order exists.
+    :return: The list of classes in resolution order, starting with *cls*.
+    """
+    bases = list(cls.__bases__)
+
+    # fast path for single inheritance
+    if len(bases) == 1:
+        return [cls] + list(bases[0].__mro__)
+
+    seqs = [list(base.__mro__) for base in bases] + [bases]
+    mro = [cls]
+    while True:
+        seqs = [seq for seq in seqs if seq]
+        if not seqs:
+            return mro
+
+        # find the first head that is not in the tail of any other sequence
+        for seq in seqs:
+            head = seq[0]
+            if not any(head in other[1:] for other in seqs):
+                break
+        else:
+            names = ", ".join(getattr(base, "__qualname__", repr(base)) for base in bases)
+            raise TypeError(
+                f"cannot create a consistent method resolution order (MRO) for bases {names}",
+            )
+
+        mro.append(head)
+        for seq in seqs:
+            if seq[0] is head:
+                del seq[0]
+
+
+class StaticClass(object):
+    """
+    Representation of a class that was extracted statically by a :py:class:`StaticExtractor`, or
+    imported in a worker process by :py:func:`mermaidmro.extract_classes`. It provides the
+    attributes ``__module__``, ``__qualname__``, ``__name__``, ``__bases__`` and ``__mro__`` in the
+    same way as actual classes, so that it can be passed to functions such as
+    :py:func:`mermaidmro.get_relations` or :py:func:`mermaidmro.get_mermaid_text` in place of a
+    class for looking up base classes. Base classes are resolved lazily, and the mro is computed
+    via :py:func:`c3_linearize`.
+
+    Bases that cannot be found in any source file are represented by objects with *resolved* set
+    to *False*, whose names are derived from the import statements that refer to them and
+    therefore might differ from the names of the actual classes.
+
+    :param module: The name of the module.
+    :param qualname: The qualified name of the class.
+    :param bases: The base classes, or a function returning them when needed.
+    :param path: The path of the source file.
+    :param lineno: The line number of the definition.
+    :param resolved: Whether the definition of the class was found.
+    """
+
+    def __init__(
+        self,
+        module: str,
+        qualname: str,
+        bases: tuple[Any, ...] | Callable[[], tuple[Any, ...]] = (object,),
+        path: str | None = None,
+        lineno: int | None = None,
+        resolved: bool = True,
+    ) -> None:
+        super().__init__()
+
+        self.__module__ = module
+        self.__qualname__ = qualname
+        self.__name__ = qualname.rsplit(".", 1)[-1]
+        self.path = path
+        self.lineno = lineno
+        self.resolved = resolved
+        self._bases = bases
+        self._mro: tuple[Any, ...] | None = None
+
+    def __repr__(self) -> str:
+        return f"<static class '{self.__module__}.{self.__qualname__}'>"
+
+    @property
+    def __bases__(self) -> tuple[Any, ...]:
+        if callable(self._bases):
+            self._bases = tuple(self._bases())
+        return self._bases
+
+    @property
+    def __mro__(self) -> tuple[Any, ...]:
+        if self._mro is None:
+            self._compute_mros()
+        return self._mro
+
+    def _compute_mros(self) -> None:
+        # compute the mro of this class and all its bases iteratively in post-order, so that deep
+        # hierarchies do not exceed the recursion limit
+        stack = [(self, False)]
+        visiting = set()
+        while stack:
+            cls, expanded = stack.pop()
+            if expanded:
+                cls._mro = tuple(c3_linearize(cls))
+                visiting.discard(cls)
+                continue
+            if cls._mro is not None:
+                continue
+            if cls in visiting:
+                raise TypeError(f"circular inheritance involving {cls!r}")
+            visiting.add(cls)
+            stack.append((cls, True))
+            for base in cls.__bases__:
+                if isinstance(base, StaticClass) and base._mro is None:
+                    stack.append((base, False))
+
+
+class StaticExtractor(object):
+    """
+    Extractor of class hierarchies from source files, which are located on the search *paths*,
+    defaulting to ``sys.path``, and parsed with :py:mod:`ast` instead of being imported. Base class
+    names are resolved across modules by following import statements, including relative and star
+    imports, re-exports and simple aliases, and method resolution orders are computed with the C3
+    linearization. Example:
+
+    .. code-block:: python
+
+        extractor = StaticExtractor(cache_dir="~/.cache/mermaidmro/static")
+        get_mermaid_text(extractor.get_class("mypackage.models:Model"))
+
+        # parse all modules of a package in parallel upfront
+        extractor.parse_package("mypackage")
+
+    Parsed definitions are stored per module in memory and, when *cache_dir* is set, also on disk
+    per file, where they are reused as long as the modification time and size of the file, or
+    otherwise the hash of its content, did not change. Cache hits and misses are counted in
+    :py:attr:`hits` and :py:attr:`misses`. When *processes* is positive, multiple files are parsed
+    in that many worker processes.
+
+    Since nothing is executed, dynamically created classes and bases defined by expressions other
+    than (dotted) names are not supported, and only base classes, not subclasses, can be looked up.
+
+    :param paths: Directories to search for modules.
+    :param cache_dir: Optional directory for caching parsed definitions.
+    :param processes: Number of worker processes for parsing multiple files.
+    """
+
+    def __init__(
+        self,
+        paths: Iterable[str] | None = None,
+        cache_dir: str | None = None,
+        processes: int = 0,
+    ) -> None:
+        super().__init__()
+
+        self.paths = [os.path.abspath(path or os.curdir) for path in (paths or sys.path)]
+        self.cache_dir = cache_dir and os.path.normpath(os.path.expandvars(
+            os.path.expanduser(cache_dir),
+        ))
+        self.processes = processes
+        self.hits = 0
+        self.misses = 0
+
+        # parsed definitions per module name, None for modules without source files
+        self._modules: dict[str, ModuleDefs | None] = {}
+
+        # classes per module and qualified name, and placeholders of unresolved classes
+        self._classes: dict[tuple[str, str], StaticClass] = {}
+
+    def find_module(
+        self,
+        name: str,
+    ) -> tuple[str, bool] | None:
+        """
+        Returns the path of the source file of a module *name* and whether it is a package, or
+        *None* if no source file is found on the search paths.
+
+        :param name: The name of the module.
+        :return: Tuple of path and package flag, or *None*.
+        """
+        rel_path = os.path.join(*name.split("."))
+        for path in self.paths:
+            for candidate, is_package in [
+                (os.path.join(path, rel_path, "__init__.py"), True),
+                (os.path.join(path, f"{rel_path}.py"), False),
+            ]:
+                if os.path.isfile(candidate):
+                    return candidate, is_package
+
+        return None
+
+    def _cache_path(
+        self,
+        path: str,
+        name: str,
+    ) -> str:
+        key = hashlib.sha256(f"{name}:{path}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_cache(
+        self,
+        path: str,
+        name: str,
+    ) -> ModuleDefs | None:
+        # cached definitions of a file if it did not change, compared by modification time and
+        # size first, and by the hash of its content otherwise
+        cache_path = self._cache_path(path, name)
+        try:
+            with open(cache_path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("version") != _cache_version:
+            return None
+
+        stat = os.stat(path)
+        if [entry["mtime_ns"], entry["size"]] != [stat.st_mtime_ns, stat.st_size]:
+            with open(path, "rb") as f:
+                if hashlib.sha256(f.read()).hexdigest() != entry["hash"]:
+                    return None
+            self._write_cache(path, name, entry["defs"])
+
+        return ModuleDefs(*entry["defs"])
+
+    def _write_cache(
+        self,
+        path: str,
+        name: str,
+        defs: ModuleDefs | list,
+    ) -> None:
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+        stat = os.stat(path)
+        with open(path, "rb") as f:
+            content_hash = hashlib.sha256(f.read()).hexdigest()
+        entry = {
+            "version": _cache_version,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "hash": content_hash,
+            "defs": list(defs),
+        }
+        with mm._atomic_write(self._cache_path(path, name)) as f:
+            f.write(json.dumps(entry).encode("utf-8"))
+
+    def parse_modules(
+        self,
+        names: Iterable[str],
+    ) -> list[ModuleDefs | None]:
+        """
+        Parses the source files of all modules in *names* that were not parsed before, using the
+        cache and worker processes if configured, and returns their :py:class:`ModuleDefs` in the
+        same order, with *None* for modules without source files.
+
+        :param names: Names of modules.
+        :return: List of :py:class:`ModuleDefs` objects.
+        """
+        names = list(names)
+
+        # locate files and look up cached definitions
+        todo = []
+        for name in names:
+            if name in self._modules:
+                continue
+            spec = self.find_module(name)
+            if spec is None:
+                self._modules[name] = None
+                continue
+            defs = self._read_cache(spec[0], name) if self.cache_dir else None
+            if defs is not None:
+                self.hits += 1
+                self._modules[name] = defs
+            else:
+                self.misses += 1
+                todo.append((spec[0], name, spec[1]))
+
+        # parse remaining files
+        if self.processes > 0 and len(todo) > 1:
+            import concurrent.futures
+
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.processes) as pool:
+                chunksize = max(1, len(todo) // (4 * self.processes))
+                parsed = list(pool.map(_parse_file, todo, chunksize=chunksize))
+        else:
+            parsed = [_parse_file(args) for args in todo]
+
+        for (path, name, _), defs in zip(todo, parsed):
+            self._modules[name] = defs
+            if self.cache_dir:
+                self._write_cache(path, name, defs)
+
+        return [self._modules[name] for name in names]
+
+    def parse_package(
+        self,
+        package: str,
+        exclude: Iterable[str] | None = None,
+    ) -> list[str]:
+        """
+        Parses all modules of a *package*, including modules in subpackages, and returns their
+        names. Modules whose names match any of the patterns in *exclude* are skipped, together
+        with all their submodules.
+
+        :param package: The name of the package.
+        :param exclude: Patterns of module names to skip.
+        :return: List of module names.
+        """
+        exclude = list(exclude or [])
+
+        def skip(name: str) -> bool:
+            return any(fnmatch.fnmatchcase(name, pattern) for pattern in exclude)
+
+        spec = self.find_module(package)
+        if spec is None:
+            raise ModuleNotFoundError(f"no source file of module '{package}' found")
+        if skip(package):
+            return []
+
+        # walk the package directory depth-first
+        names = [package]
+
+        def walk(directory: str, prefix: str) -> None:
+            for entry in sorted(os.scandir(directory), key=lambda entry: entry.name):
+                if entry.is_dir() and os.path.isfile(os.path.join(entry.path, "__init__.py")):
+                    name = prefix + entry.name
+                    if not skip(name):
+                        names.append(name)
+                        walk(entry.path, f"{name}.")
+                elif entry.name.endswith(".py") and entry.name != "__init__.py":
+                    name = prefix + entry.name[:-3]
+                    if not skip(name):
+                        names.append(name)
+
+        if spec[1]:
+            walk(os.path.dirname(spec[0]), f"{package}.")
+
+        self.parse_modules(names)
+
+        return names
+
+    def module(
+        self,
+        name: str,
+    ) -> ModuleDefs | None:
+        """
+        Returns the :py:class:`ModuleDefs` of a module *name*, parsing it if needed, or *None* if
+        no source file exists.
+
+        :param name: The name of the module.
+        :return: The definitions or *None*.
+        """
+        if name not in self._modules:
+            self.parse_modules([name])
+        return self._modules[name]
+
+    def classes(
+        self,
+        module: str,
+    ) -> list[StaticClass]:
+        """
+        Returns all classes defined on the top level of a *module* in the order of their
+        definition.
+
+        :param module: The name of the module.
+        :raises ModuleNotFoundError: If the module has no source file.
+        :return: List of :py:class:`StaticClass` objects.
+        """
+        defs = self._get_module(module)
+        return [
+            self._get_class(defs, qualname)
+            for qualname in defs.classes
+            if "." not in qualname
+        ]
+
+    def get_class(
+        self,
+        cid: str,
+    ) -> StaticClass:
+        """
+        Returns the class identified by *cid* in the format ``"module.to.import:class"``, where the
+        class can also be an imported name or a nested class.
+
+        :param cid: The class identifier.
+        :raises ModuleNotFoundError: If the module has no source file.
+        :raises AttributeError: If no such class exists in the module.
+        :return: The :py:class:`StaticClass` object.
+        """
+        if ":" not in cid:
+            raise ValueError(f"invalid format, cannot resolve '{cid}'")
+        module, qualname = cid.split(":", 1)
+
+        cls = self._lookup_in(self._get_module(module), qualname.split("."), set())
+        if not isinstance(cls, StaticClass) or not cls.resolved:
+            raise AttributeError(f"no class named '{qualname}' in module {module}")
+
+        return cls
+
+    def _get_module(
+        self,
+        name: str,
+    ) -> ModuleDefs:
+        defs = self.module(name)
+        if defs is None:
+            raise ModuleNotFoundError(f"no source file of module '{name}' found")
+        if defs.error:
+            raise SyntaxError(f"cannot parse module '{name}': {defs.error}")
+        return defs
+
+    def _get_class(
+        self,
+        defs: ModuleDefs,
+        qualname: str,
+    ) -> StaticClass:
+        # class defined in a module, created once with lazily resolved bases
+        key = (defs.name, qualname)
+        if key not in self._classes:
+            base_exprs, lineno = defs.classes[qualname]
+
+            def bases() -> list[Any]:
+                # expressions that cannot be resolved statically are skipped
+                resolved = [self._resolve(defs, expr) for expr in base_exprs if expr]
+                return resolved or [object]
+
+            self._classes[key] = StaticClass(
+                defs.name,
+                qualname,
+                bases=bases,
+                path=defs.path,
+                lineno=lineno,
+            )
+
+        return self._classes[key]
+
+    def _resolve(
+        self,
+        defs: ModuleDefs,
+        expr: str,
+    ) -> Any:
+        # resolve a dotted expression in the namespace of a module, falling back to builtins and
+        # to a placeholder for classes whose definition cannot be found
+        parts = expr.split(".")
+        cls = self._lookup_in(defs, parts, set())
+        if cls is not None:
+            return cls
+
+        if len(parts) == 1 and isinstance(getattr(builtins, expr, None), type):
+            return getattr(builtins, expr)
+
+        # derive the fully qualified name from imports
+        head = parts[0]
+        if head in defs.imports:
+            full_name = ".".join([defs.imports[head]] + parts[1:])
+        elif head in defs.aliases:
+            full_name = ".".join([defs.aliases[head]] + parts[1:])
+        else:
+            full_name = f"{defs.name}.{expr}"
+        module, _, qualname = full_name.rpartition(".")
+
+        # ubiquitous bases are represented by the actual classes, so that they can be hidden by
+        # identity
+        for base_cls in mm.UBIQUITOUS_BASES:
+            if (base_cls.__module__, base_cls.__qualname__) == (module, qualname):
+                return base_cls
+
+        key = (module, qualname)
+        if key not in self._classes:
+            self._classes[key] = StaticClass(module, qualname, resolved=False)
+
+        return self._classes[key]
+
+    def _lookup(
+        self,
+        full_name: str,
+        seen: set[tuple[str, str]],
+    ) -> StaticClass | None:
+        # resolve a fully qualified name by finding the longest prefix that is a module
+        parts = full_name.split(".")
+        for i in range(len(parts) - 1, 0, -1):
+            defs = self.module(".".join(parts[:i]))
+            if defs is not None:
+                return self._lookup_in(defs, parts[i:], seen)
+
+        return None
+
+    def _lookup_in(
+        self,
+        defs: ModuleDefs,
+        parts: list[str],
+        seen: set[tuple[str, str]],
+    ) -> StaticClass | None:
+        # resolve a dotted name in the namespace of a module, following imports, aliases and star
+        # imports, and guarding against cycles
+        qualname = ".".join(parts)
+        if (defs.name, qualname) in seen:
+            return None
+        seen.add((defs.name, qualname))
+
+        if qualname in defs.classes:
+            return self._get_class(defs, qualname)
+
+        head, rest = parts[0], parts[1:]
+        if head in defs.classes:
+            return None
+        if head in defs.imports:
+            return self._lookup(".".join([defs.imports[head]] + rest), seen)
+        if head in defs.aliases:
+            return self._lookup_in(defs, defs.aliases[head].split(".") + rest, seen)
+        for module in defs.stars:
+            star_defs = self.module(module)
+            if star_defs is not None:
+                cls = self._lookup_in(star_defs, parts, seen)
+                if cls is not None:
+                    return cls
+
+        return None
@@ -0,0 +1,275 @@
+# coding: utf-8
+
+"""
+Isolated imports of classes in worker processes with per-job timeouts and memory limits, returning
+compact representations of their hierarchies to the calling process.
+"""
+
+from __future__ import annotations
+
+__all__ = ["extract_classes", "WorkerResult"]
+
+import os
+import sys
+import time
+import builtins
+import functools
+import collections
+from typing import Any, Iterable
+
+import mermaidmro as mm
+from mermaidmro.static import StaticClass
+
+
+#: Result of a single job in :py:func:`extract_classes`, with the requested class identifier
+#: *cid*, a list of ``(cid, cls)`` pairs of matching classes, an error message in case the import
+#: failed, timed out or the worker crashed, and the duration in seconds (namedtuple).
+WorkerResult = collections.namedtuple("WorkerResult", ["cid", "classes", "error", "duration"])
+
+
+def _dump_mro(
+    cls: type,
+) -> tuple[list[str], list[list[int]]]:
+    # compact representation of the hierarchy of a class, containing identifiers of all classes
+    # in its mro and the indices of their bases within the mro
+    mro = cls.__mro__
+    ids = {c: i for i, c in enumerate(mro)}
+    return (
+        [f"{c.__module__}:{c.__qualname__}" for c in mro],
+        [[ids[base] for base in c.__bases__] for c in mro],
+    )
+
+
+def _load_mro(
+    data: tuple[list[str], list[list[int]]],
+    registry: dict[str, Any],
+) -> Any:
+    # create a class from its compact representation, with builtin classes and ubiquitous bases
+    # mapped to the actual ones, so that they can be hidden by identity, and all other classes
+    # shared via the registry
+    names, bases = data
+    classes: list[Any] = []
+    ubiquitous = {f"{c.__module__}:{c.__qualname__}": c for c in mm.UBIQUITOUS_BASES}
+
+    def get_bases(indices: list[int]) -> list[Any]:
+        return [classes[i] for i in indices]
+
+    for name, indices in zip(names, bases):
+        cls = registry.get(name)
+        if cls is None:
+            module, qualname = name.split(":", 1)
+            cls = getattr(builtins, qualname, None) if module == "builtins" else ubiquitous.get(name)
+            if not isinstance(cls, type):
+                cls = StaticClass(module, qualname, bases=functools.partial(get_bases, indices))
+            registry[name] = cls
+        classes.append(cls)
+
+    return classes[0]
+
+
+def _extract(
+    cid: str,
+) -> list[tuple[str, tuple[list[str], list[list[int]]]]]:
+    # import classes matching a class identifier and dump their hierarchies
+    return [(cls_cid, _dump_mro(cls)) for cls_cid, cls in mm._resolve_classes([cid])]
+
+
+def _worker_main(
+    conn: Any,
+    sys_path: list[str],
+    memory_limit: int | None,
+) -> None:
+    # process jobs received through a connection until it is closed
+    sys.path[:] = sys_path
+
+    # limit the address space
+    if memory_limit:
+        import resource
+
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+    # silence output of imported modules
+    sys.stdout = open(os.devnull, "w")
+
+    while True:
+        try:
+            cid = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if cid is None:
+            return
+
+        try:
+            result = (_extract(cid), None)
+        except BaseException as e:
+            # also catch system exits of modules that are not meant to be imported
+            if isinstance(e, KeyboardInterrupt):
+                return
+            result = (None, f"{e.__class__.__name__}: {e}")
+        conn.send(result)
+
+
+class _Worker(object):
+    """
+    Worker process connected through a pipe, processing one job at a time.
+    """
+
+    def __init__(
+        self,
+        context: Any,
+        memory_limit: int | None = None,
+    ) -> None:
+        super().__init__()
+
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, list(sys.path), memory_limit),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+        # index, class identifier and start time of the current job, and number of jobs
+        self.job: tuple[int, str, float] | None = None
+        self.n_jobs = 0
+
+    def submit(
+        self,
+        index: int,
+        cid: str,
+    ) -> None:
+        self.conn.send(cid)
+        self.job = (index, cid, time.perf_counter())
+        self.n_jobs += 1
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def close(self) -> None:
+        # ask the worker to stop and kill it if it does not
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=1.0)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+def extract_classes(
+    cids: Iterable[str],
+    processes: int | None = None,
+    timeout: float | None = None,
+    memory_limit: int | None = None,
+    max_jobs: int | None = None,
+    start_method: str | None = None,
+) -> list[WorkerResult]:
+    """
+    Imports classes given by identifiers *cids* in the format ``"module.to.import:class"``, with
+    glob patterns over class names being supported as in the cli, in a pool of at most *processes*
+    worker processes, defaulting to the number of cores. Example:
+
+    .. code-block:: python
+
+        results = extract_classes(["pkg.models:*", "other.module:Task"], timeout=30)
+        for res in results:
+            if res.error:
+                print(f"{res.cid} failed: {res.error}")
+            for cid, cls in res.classes:
+                print(get_mermaid_text(cls))
+
+    Each worker sends back the hierarchies of imported classes as compact lists of class
+    identifiers and base indices, which are converted into :py:class:`mermaidmro.static.StaticClass`
+    objects that can be passed to :py:func:`mermaidmro.get_mermaid_text` and similar functions in
+    place of the actual classes for looking up base classes. Builtin classes are mapped to the
+    actual ones, and classes are shared across all results.
+
+    Jobs exceeding a *timeout* in seconds are aborted by killing their worker, and the address
+    space of workers can be limited to *memory_limit* bytes (on platforms providing
+    :py:mod:`resource`). Workers that crash or are killed are replaced. To keep workers from
+    accumulating imported modules, they can be replaced after *max_jobs* jobs. Errors are not
+    raised but reported in the returned :py:class:`WorkerResult` objects, which are in the same
+    order as *cids*.
+
+    :param cids: Identifiers or patterns of classes to import.
+    :param processes: Maximum number of worker processes.
+    :param timeout: Timeout in seconds per job.
+    :param memory_limit: Maximum address space per worker in bytes.
+    :param max_jobs: Maximum number of jobs per worker before it is replaced.
+    :param start_method: The :py:mod:`multiprocessing` start method, e.g. ``"spawn"``.
+    :return: List of :py:class:`WorkerResult` objects.
+    """
+    import multiprocessing
+    import multiprocessing.connection
+
+    cids = list(cids)
+    if not cids:
+        return []
+
+    context = multiprocessing.get_context(start_method)
+    processes = min(processes or os.cpu_count() or 1, len(cids))
+    pending = collections.deque(enumerate(cids))
+    results: list[WorkerResult | None] = [None] * len(cids)
+    registry: dict[str, Any] = {}
+    workers: list[_Worker] = []
+
+    def finish(worker: _Worker, classes: list | None, error: str | None) -> None:
+        index, cid, t0 = worker.job
+        if classes is not None:
+            classes = [(cls_cid, _load_mro(data, registry)) for cls_cid, data in classes]
+        results[index] = WorkerResult(cid, classes or [], error, time.perf_counter() - t0)
+        worker.job = None
+
+    try:
+        while True:
+            # assign pending jobs to idle workers, starting and replacing workers as needed
+            while pending and len(workers) < processes:
+                workers.append(_Worker(context, memory_limit=memory_limit))
+            for i, worker in enumerate(workers):
+                if worker.job is not None or not pending:
+                    continue
+                if max_jobs and worker.n_jobs >= max_jobs:
+                    worker.close()
+                    worker = workers[i] = _Worker(context, memory_limit=memory_limit)
+                worker.submit(*pending.popleft())
+
+            busy = [worker for worker in workers if worker.job is not None]
+            if not busy:
+                break
+
+            # wait for results until the next deadline
+            wait_timeout = None
+            if timeout is not None:
+                deadline = min(worker.job[2] for worker in busy) + timeout
+                wait_timeout = max(0.0, deadline - time.perf_counter())
+            ready = multiprocessing.connection.wait([worker.conn for worker in busy], wait_timeout)
+
+            now = time.perf_counter()
+            for worker in busy:
+                if worker.conn in ready:
+                    try:
+                        finish(worker, *worker.conn.recv())
+                        continue
+                    except EOFError:
+                        # the worker crashed
+                        worker.process.join()
+                        error = f"worker exited with code {worker.process.exitcode}"
+                elif timeout is not None and now - worker.job[2] >= timeout:
+                    error = f"TimeoutError: import of '{worker.job[1]}' exceeded {timeout}s"
+                else:
+                    continue
+
+                # replace the worker
+                finish(worker, None, error)
+                worker.kill()
+                workers.remove(worker)
+    finally:
+        for worker in workers:
+            worker.close()
+
+    return results
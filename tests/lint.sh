@@ -2,7 +2,7 @@
 
 # Script to run linting checks.
 # Arguments:
-#   1. The linting command. Defaults to "flake8 mermaidmro tests".
+#   1. The linting command. Defaults to "flake8 mermaidmro tests benchmarks".
 
 action() {
     local shell_is_zsh="$( [ -z "${ZSH_VERSION}" ] && echo "false" || echo "true" )"
@@ -11,7 +11,7 @@ action() {
     local repo_dir="$( dirname "${this_dir}" )"
 
     # default test command
-    local cmd="${1:-flake8 mermaidmro tests}"
+    local cmd="${1:-flake8 mermaidmro tests benchmarks}"
 
     # execute it
     echo "command: ${cmd}"
@@ -1,16 +1,27 @@
 # coding: utf-8
 
 
-__all__ = ["TestCore", "TestCLI"]
+__all__ = ["TestCore", "TestDownload", "TestRender", "TestDiscover", "TestCLI"]
 
 
+import io
 import os
 import sys
+import time
+import socket
+import typing
+import asyncio
 import tempfile
 import contextlib
 import functools
 import fnmatch
+import itertools
+import threading
 import unittest
+import importlib
+import subprocess
+import urllib.error
+import http.server
 
 import mermaidmro as mm
 
@@ -64,6 +75,106 @@ class TestCore(unittest.TestCase):
             all_relations[:2],
         )
 
+    def test_get_relations_diamonds(self):
+        # diamond-heavy hierarchy with mixins reachable via many paths
+        class M(object): pass  # noqa
+        class X(M): pass  # noqa
+        class Y(M): pass  # noqa
+        class Z(M): pass  # noqa
+        class XY(X, Y): pass  # noqa
+        class YZ(Y, Z): pass  # noqa
+        class R(XY, YZ, Z): pass  # noqa
+
+        relations = mm.get_relations(R)
+
+        # each class is expanded exactly once
+        expanded = [rel.cls for rel in relations]
+        self.assertEqual(len(relations), 11)
+        self.assertEqual(len({(rel.cls, rel.base_cls) for rel in relations}), 11)
+        self.assertEqual(
+            [cls for i, cls in enumerate(expanded) if cls not in expanded[:i]],
+            [R, XY, YZ, Z, X, Y, M],
+        )
+
+        # depth and mro values of the first relation to each base
+        first = {}
+        for rel in relations:
+            first.setdefault(rel.base_cls, rel)
+        self.assertEqual(
+            [(rel.base_cls, rel.depth, rel.mro) for rel in first.values()],
+            [(XY, 1, 1), (YZ, 1, 3), (Z, 1, 5), (X, 2, 2), (Y, 2, 4), (M, 2, 6), (object, 3, 7)],
+        )
+
+    def test_get_relations_compact(self):
+        for root_cls, kwargs in [(D, {}), (D, {"max_depth": 1}), (A, {"direction": "down"})]:
+            relations = mm.get_relations(root_cls, **kwargs)
+            compact = mm.get_relations(root_cls, compact=True, **kwargs)
+            self.assertIsInstance(compact, mm.CompactRelations)
+            self.assertEqual(len(compact), len(relations))
+            self.assertEqual(list(compact), relations)
+            self.assertEqual(compact, relations)
+            self.assertEqual(compact[-1], relations[-1])
+            self.assertEqual(compact[1:], relations[1:])
+            self.assertEqual(compact[::-2], relations[::-2])
+
+        # shared class table
+        compact = mm.get_relations(D, compact=True)
+        self.assertEqual(compact.classes, [D, C, B, A, object])
+        self.assertEqual(list(compact.base_ids), [1, 2, 3, 4, 4])
+
+    def test_get_relations_directions(self):
+        class P(object): pass  # noqa
+        class Q(P): pass  # noqa
+        class R(P): pass  # noqa
+        class S(Q, R): pass  # noqa
+        class T(S): pass  # noqa
+        class U(Q): pass  # noqa
+
+        def get_relations(*args, **kwargs):
+            return [
+                (rel.cls, rel.base_cls, rel.depth, rel.mro)
+                for rel in mm.get_relations(*args, **kwargs)
+            ]
+
+        # subclasses
+        all_relations = [
+            (Q, P, -1, 0), (R, P, -1, 0), (S, Q, -2, -1), (U, Q, -2, -1), (S, R, -2, -1),
+            (T, S, -3, -1),
+        ]
+        self.assertEqual(get_relations(P, direction="down"), all_relations)
+        self.assertEqual(get_relations(P, direction="down", max_depth=1), all_relations[:2])
+        self.assertEqual(get_relations(P, direction="down", max_nodes=3), all_relations[:2])
+        self.assertEqual(get_relations(P, direction="down", max_nodes=1), [])
+
+        # both directions
+        self.assertEqual(
+            get_relations(Q, direction="both"),
+            [(Q, P, 1, 1), (P, object, 2, 2), (S, Q, -1, 0), (U, Q, -1, 0), (T, S, -2, -1)],
+        )
+        self.assertEqual(
+            get_relations(Q, direction="both", max_nodes=3),
+            [(Q, P, 1, 1), (P, object, 2, 2)],
+        )
+
+        # graph text
+        self.assertEqual(
+            mm.get_mermaid_text(P, direction="both", name_func=lambda cls: cls.__name__),
+            """graph TD
+    P("P (0)")
+    object("object (1)")
+
+    object --> P
+    P --> Q
+    P --> R
+    Q --> S
+    Q --> U
+    R --> S
+    S --> T""",
+        )
+
+        with self.assertRaises(ValueError):
+            get_relations(P, direction="sideways")
+
     def test_get_default_name_func(self):
         # default skip modules
         name_func = mm.get_default_name_func()
@@ -75,6 +186,21 @@ class TestCore(unittest.TestCase):
         self.assertEqual(name_func(object), "object")
         self.assertEqual(name_func(D), "D")
 
+        # patterns
+        name_func = mm.get_default_name_func(["tests.*", "foo"])
+        self.assertEqual(name_func(D), "D")
+        self.assertEqual(name_func(unittest.TestCase), "unittest.case.TestCase")
+
+        # cached names
+        name_func = mm.get_default_name_func(cache_size=2)
+        for cls in [A, B, A, C, A]:
+            name_func(cls)
+        info = name_func.cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize, info.maxsize), (2, 3, 2, 2))
+        name_func.cache_clear()
+        self.assertEqual(name_func.cache_info().currsize, 0)
+        self.assertEqual(name_func("X"), "X")
+
     def test_get_style_text(self):
         # default case
         self.assertEqual(
@@ -118,6 +244,40 @@ class TestCore(unittest.TestCase):
             "    classDef Foo stroke: #83b, stroke-width: 3px\n\n    class X Foo\n    class Y Foo",
         )
 
+        # grouped assignments with merged definitions
+        styles = [
+            ("Foo", ["X", "Y", "X"], "stroke: #83b"),
+            ("Bar", "Z", "fill: #f00"),
+            ("Baz", ["Y", "W"], "stroke: #83b"),
+        ]
+        self.assertEqual(
+            mm.get_style_text(styles, group=True, join_lines=False),
+            [
+                "    classDef Foo stroke: #83b",
+                "    classDef Bar fill: #f00",
+                "",
+                "    class X,Y,W Foo",
+                "    class Z Bar",
+            ],
+        )
+
+        # selectors evaluated over the classes of the graph
+        styles = [
+            ("Foo", mm.Selector(name="[AB]"), "stroke: #83b"),
+            ("Bar", [mm.Selector(module="builtins"), "X"], "fill: #f00"),
+            ("Baz", lambda cls: issubclass(cls, A), "color: red"),
+        ]
+        self.assertEqual(
+            mm.get_style_text(styles, classes=D.__mro__, group=True, join_lines=False)[4:],
+            [
+                "    class tests.test_all.A,tests.test_all.B Foo",
+                "    class object,X Bar",
+                "    class tests.test_all.D,tests.test_all.C,tests.test_all.A Baz",
+            ],
+        )
+        with self.assertRaises(ValueError):
+            mm.get_style_text(styles)
+
     def test_get_mermaid_text(self):
         # default case
         self.assertEqual(
@@ -242,6 +402,377 @@ class TestCore(unittest.TestCase):
     class tests.test_all.D Foo""",
         )
 
+    def test_get_mermaid_text_selectors(self):
+        styles = [
+            ("Foo", mm.Selector(module="tests.*", func=lambda cls: cls is not D), "stroke: #83b"),
+            ("Bar", mm.Selector(module="builtins"), "stroke: #83b"),
+        ]
+        self.assertEqual(
+            mm.get_mermaid_text(D, max_depth=1, styles=styles, group_styles=True).split("\n")[-3:],
+            [
+                "    classDef Foo stroke: #83b",
+                "",
+                "    class tests.test_all.C,tests.test_all.B Foo",
+            ],
+        )
+        self.assertEqual(
+            mm.get_mermaid_text(D, styles=styles, show_mro=False, join_lines=False)[-5:],
+            [
+                "",
+                "    class tests.test_all.C Foo",
+                "    class tests.test_all.B Foo",
+                "    class tests.test_all.A Foo",
+                "    class object Bar",
+            ],
+        )
+
+    def test_reduce_relations(self):
+        class E(C, A): pass  # noqa
+        class F(E): pass  # noqa
+
+        # transitive reduction
+        relations, chains = mm.reduce_relations(mm.get_relations(E))
+        self.assertEqual(
+            [(rel.cls, rel.base_cls) for rel in relations],
+            [(E, C), (C, A), (A, object)],
+        )
+        self.assertEqual(chains, {})
+
+        # hidden bases and collapsed chains, keeping the root class
+        relations, chains = mm.reduce_relations(
+            mm.get_relations(F),
+            collapse_chains=True,
+            hide=mm.UBIQUITOUS_BASES,
+        )
+        self.assertEqual([(rel.cls, rel.base_cls) for rel in relations], [(F, E)])
+        self.assertEqual(chains, {E: [E, C, A]})
+        relations, chains = mm.reduce_relations(
+            mm.get_relations(F),
+            collapse_chains=True,
+            hide=[object],
+            min_chain=4,
+        )
+        self.assertEqual(len(relations), 3)
+        self.assertEqual(chains, {})
+        relations, _ = mm.reduce_relations(mm.get_relations(D), transitive=False, hide=[D, object])
+        self.assertEqual(len(relations), 3)
+
+        # graphs
+        name_func = lambda cls: cls.__name__  # noqa
+        self.assertEqual(
+            mm.get_mermaid_text(
+                E,
+                name_func=name_func,
+                show_mro=False,
+                reduce_edges=True,
+                hide_bases=True,
+            ),
+            "graph TD\n    C --> E\n    A --> C",
+        )
+        self.assertEqual(
+            mm.get_mermaid_text(
+                F,
+                name_func=name_func,
+                reduce_edges=True,
+                collapse_chains=True,
+                hide_bases=True,
+                join_lines=False,
+            ),
+            [
+                "graph TD",
+                "    F(\"F (0)\")",
+                "    E(\"E (1) ... A (3) [3 classes]\")",
+                "",
+                "    E --> F",
+            ],
+        )
+        self.assertEqual(
+            mm.get_mermaid_text(D, name_func=name_func, show_mro=False, hide_bases=[A]),
+            "graph TD\n    C --> D\n    B --> D\n    object --> B",
+        )
+
+        # no labels and style assignments of removed classes
+        self.assertEqual(
+            mm.get_mermaid_text(
+                E,
+                name_func=name_func,
+                hide_bases=[A],
+                styles=[("S", [A, C, object], "fill: #83b")],
+                join_lines=False,
+            ),
+            [
+                "graph TD",
+                "    E(\"E (0)\")",
+                "    C(\"C (1)\")",
+                "",
+                "    C --> E",
+                "",
+                "    classDef S fill: #83b",
+                "",
+                "    class C S",
+            ],
+        )
+
+        # chains of subclasses without mro indices
+        class K(object): pass  # noqa
+        class L(K): pass  # noqa
+        class M(L): pass  # noqa
+        class N(M): pass  # noqa
+        self.assertEqual(
+            mm.get_mermaid_text(K, name_func=name_func, direction="down", collapse_chains=True),
+            "graph TD\n"
+            "    K(\"K (0)\")\n"
+            "    M(\"M ... L [2 classes]\")\n"
+            "\n"
+            "    K --> M\n"
+            "    M --> N",
+        )
+        self.assertEqual(
+            mm.get_mermaid_text(
+                M,
+                name_func=name_func,
+                direction="both",
+                collapse_chains=True,
+                hide_bases=True,
+            ),
+            "graph TD\n"
+            "    M(\"M (0)\")\n"
+            "    L(\"L (1) ... K (2) [2 classes]\")\n"
+            "\n"
+            "    L --> M\n"
+            "    M --> N",
+        )
+
+    def test_iter_lines(self):
+        import io
+
+        # relations
+        self.assertEqual(list(mm.iter_relations(D)), mm.get_relations(D))
+        self.assertEqual(list(mm.iter_relations(D, max_depth=0)), [])
+
+        # style lines
+        styles = [("Foo", ["X", "Y"], "stroke: #83b")]
+        self.assertEqual(
+            list(mm.iter_style_lines(styles)),
+            mm.get_style_text(styles, join_lines=False),
+        )
+
+        # mermaid lines
+        for kwargs in [{}, {"max_depth": 2}, {"show_mro": False}, {"styles": styles}]:
+            self.assertEqual(
+                list(mm.iter_mermaid_lines(D, **kwargs)),
+                mm.get_mermaid_text(D, join_lines=False, **kwargs),
+            )
+
+        # limited depth with mro indices
+        self.assertEqual(
+            list(mm.iter_mermaid_lines(D, max_depth=1))[:5],
+            [
+                "graph TD",
+                "    tests.test_all.D(\"tests.test_all.D (0)\")",
+                "    tests.test_all.C(\"tests.test_all.C (1)\")",
+                "    tests.test_all.B(\"tests.test_all.B (3)\")",
+                "",
+            ],
+        )
+
+        # relations are traversed once even when they determine the mro indices
+        from unittest import mock
+
+        with mock.patch("mermaidmro.iter_relations", wraps=mm.iter_relations) as iter_relations:
+            list(mm.iter_mermaid_lines(D, max_depth=1, reduce_edges=True))
+        self.assertEqual(iter_relations.call_count, 1)
+
+        # lazy evaluation
+        lines = mm.iter_mermaid_lines(D, show_mro=False)
+        self.assertEqual(next(lines), "graph TD")
+        self.assertEqual(next(lines), "    tests.test_all.C --> tests.test_all.D")
+
+        # writing to a file object
+        f = io.StringIO()
+        n = mm.write_mermaid_text(D, f, styles=styles)
+        self.assertEqual(f.getvalue(), mm.get_mermaid_text(D, styles=styles))
+        self.assertEqual(n, len(mm.get_mermaid_text(D, styles=styles, join_lines=False)))
+
+    def test_multi(self):
+        class E(A): pass  # noqa
+        class F(E, B): pass  # noqa
+
+        # unmerged relations are identical to single root ones
+        for max_depth in [-1, 1, 2]:
+            relations = mm.get_relations_multi([D, F], max_depth=max_depth)
+            self.assertEqual(list(relations), [D, F])
+            self.assertEqual(relations[D], mm.get_relations(D, max_depth=max_depth))
+            self.assertEqual(relations[F], mm.get_relations(F, max_depth=max_depth))
+
+        # merged relations without duplicate edges
+        relations = mm.get_relations_multi([D, F, C], merge=True)
+        self.assertEqual(
+            [(rel.cls, rel.base_cls, rel.root_cls, rel.depth, rel.mro) for rel in relations[F]],
+            [(F, E, F, 1, 1), (F, B, F, 1, 3), (E, A, F, 2, 2)],
+        )
+        self.assertEqual(relations[C], [])
+        edges = [(rel.cls, rel.base_cls) for rels in relations.values() for rel in rels]
+        self.assertEqual(len(edges), 8)
+        self.assertEqual(len(set(edges)), 8)
+
+        # merged relations with limited depth, where A is reached again on a shorter path
+        class G(C): pass  # noqa
+        class H(A): pass  # noqa
+        relations = mm.get_relations_multi([D, G, H], max_depth=2, merge=True)
+        self.assertEqual(
+            [(rel.cls, rel.base_cls, rel.depth) for rel in relations[G]],
+            [(G, C, 1)],
+        )
+        self.assertEqual(
+            [(rel.cls, rel.base_cls, rel.depth) for rel in relations[H]],
+            [(H, A, 1), (A, object, 2)],
+        )
+
+        # merged graph
+        self.assertEqual(
+            mm.get_mermaid_text_multi([D, F], name_func=lambda cls: cls.__name__),
+            """graph TD
+    D("D (0)")
+    C("C (1)")
+    A("A (2)")
+    B("B (3)")
+    object("object (4)")
+    F("F (0)")
+    E("E (1)")
+
+    C --> D
+    B --> D
+    A --> C
+    object --> B
+    object --> A
+    E --> F
+    B --> F
+    A --> E""",
+        )
+
+        # unmerged graphs
+        texts = mm.get_mermaid_text_multi([D, F], merge=False, show_mro=False)
+        self.assertEqual(texts[D], mm.get_mermaid_text(D, show_mro=False))
+        self.assertEqual(texts[F], mm.get_mermaid_text(F, show_mro=False))
+
+    def test_inheritance_index(self):
+        class E(D): pass  # noqa
+        class F(E, A): pass  # noqa
+        class G(C): pass  # noqa
+
+        index = mm.InheritanceIndex([F, G])
+        self.assertEqual(len(index), 8)
+        self.assertIn(B, index)
+        self.assertNotIn(int, index)
+        self.assertEqual(index.id(object), 0)
+        self.assertEqual(index.name(D), "tests.test_all.D")
+
+        # same results as the uncached functions
+        styles = [("Foo", [E, "X"], "stroke: #83b"), ("Bar", mm.Selector(name="[A-E]"), "fill: red")]
+        for root_cls in [D, F, G, object]:
+            for max_depth in [-1, 0, 1, 2]:
+                self.assertEqual(
+                    index.relations(root_cls, max_depth=max_depth),
+                    mm.get_relations(root_cls, max_depth=max_depth),
+                )
+                for show_mro, group_styles in itertools.product([True, False], repeat=2):
+                    self.assertEqual(
+                        index.mermaid_text(
+                            root_cls,
+                            max_depth=max_depth,
+                            show_mro=show_mro,
+                            styles=styles,
+                            group_styles=group_styles,
+                        ),
+                        mm.get_mermaid_text(
+                            root_cls,
+                            max_depth=max_depth,
+                            show_mro=show_mro,
+                            styles=styles,
+                            group_styles=group_styles,
+                        ),
+                    )
+
+        skip_func = lambda cls, name_func: name_func(cls) == "object"  # noqa: E731
+        self.assertEqual(
+            index.mermaid_text(F, skip_func=skip_func, graph_type="LR", indentation="  "),
+            mm.get_mermaid_text(F, skip_func=skip_func, graph_type="LR", indentation="  "),
+        )
+
+        # ancestors and descendants
+        self.assertEqual(index.ancestors(F), list(F.__mro__[1:]))
+        self.assertEqual(index.ancestors(F, max_depth=1), [E, A])
+        self.assertEqual(index.descendants(A), [C, F, D, G, E])
+        self.assertEqual(index.descendants(A, max_depth=1), [C, F])
+        self.assertEqual(index.descendants(F), [])
+
+        # unknown classes
+        with self.assertRaises(KeyError):
+            index.relations(int)
+
+    def test_incremental_graphs(self):
+        # minimal line differences
+        self.assertEqual(mm.diff_lines(["a", "b", "a"], ["a", "c"]), (["b", "a"], ["c"]))
+        self.assertEqual(mm.diff_lines(["a", "b"], ["b", "a"]), ([], []))
+
+        code_v1 = "class A(object): pass\nclass B(A): pass\nclass C(object): pass\n"
+        code_v2 = "class A(object): pass\nclass X(object): pass\nclass B(A, X): pass\n"
+        with tempfile.TemporaryDirectory() as d:
+            with open(os.path.join(d, "mm_inc_module.py"), "w") as f:
+                f.write(code_v1)
+            sys.path.insert(0, d)
+            try:
+                import mm_inc_module
+
+                graphs = mm.IncrementalGraphs(show_mro=False, name_func=lambda cls: cls.__name__)
+                graphs.add("B", mm_inc_module.B)
+                graphs.add("C", mm_inc_module.C)
+                graphs.add("D", D)
+                self.assertEqual(len(graphs), 3)
+                self.assertEqual(graphs.text("B"), "graph TD\n    A --> B\n    object --> A")
+                self.assertEqual(graphs.affected(modules=["mm_inc_module"]), {"B", "C"})
+                self.assertEqual(graphs.affected(classes=[A]), {"D"})
+
+                # change and reload the module
+                with open(os.path.join(d, "mm_inc_module.py"), "w") as f:
+                    f.write(code_v2)
+                importlib.invalidate_caches()
+                importlib.reload(mm_inc_module)
+
+                self.assertEqual(graphs.update(modules=["mm_inc_module"]), [
+                    ("B", [], ["    X --> B", "    object --> X"]),
+                ])
+                self.assertIs(graphs.roots["B"], mm_inc_module.B)
+
+                # removed classes
+                del mm_inc_module.C
+                self.assertEqual(graphs.update(modules=["mm_inc_module"]), [
+                    ("C", ["graph TD", "    object --> C"], []),
+                ])
+                self.assertEqual(list(graphs.roots), ["D", "B"])
+                self.assertEqual(graphs.update(classes=[D]), [])
+
+                # subclasses in reloaded dependent modules
+                with open(os.path.join(d, "mm_inc_module_dep.py"), "w") as f:
+                    f.write("from mm_inc_module import B\nclass Y(B): pass\n")
+                import mm_inc_module_dep
+                graphs.add("Y", mm_inc_module_dep.Y)
+                with open(os.path.join(d, "mm_inc_module.py"), "w") as f:
+                    f.write(code_v1)
+                importlib.invalidate_caches()
+                importlib.reload(mm_inc_module)
+                importlib.reload(mm_inc_module_dep)
+                self.assertEqual(graphs.update(modules=["mm_inc_module"]), [
+                    ("B", ["    X --> B", "    object --> X"], []),
+                    ("Y", ["    X --> B", "    object --> X"], []),
+                ])
+                self.assertIs(graphs.roots["Y"], mm_inc_module_dep.Y)
+            finally:
+                sys.path.remove(d)
+                sys.modules.pop("mm_inc_module", None)
+                sys.modules.pop("mm_inc_module_dep", None)
+
     def test_encode_text(self):
         self.assertEqual(
             mm.encode_text(mm.get_mermaid_text(D)),
@@ -262,6 +793,64 @@ class TestCore(unittest.TestCase):
             "eNqrVkrOT0lVslJQSi9KLMhQCHGJyVMAgpLU4pJiPRAZn5iTo-eiEaOELqSgYaAZo6SJVb0zpnpnBQ1DnOodMdU7KmgY4VTvhKneSUHDGKE-PykrNbkEqArCUNAwgchhd62Crq4dhpexW0y8UkdsSp2RnYdNgRMhBY5KOgpKualFuYmZKaB4qwaGREZqbmoMkBOjlJJYlB2jVKtUCwDP95lW",  # noqa
         )
 
+    def test_stats(self):
+        events = []
+        stats = mm.Stats(callback=lambda stage, duration: events.append(stage))
+        styles = [mm.Style("Style1", [A, B], "fill: #f00")]
+
+        # graph texts are unchanged
+        text = mm.get_mermaid_text(D, styles=styles, stats=stats)
+        self.assertEqual(text, mm.get_mermaid_text(D, styles=styles))
+        self.assertEqual(
+            mm.get_mermaid_text(D, max_depth=1, stats=stats),
+            mm.get_mermaid_text(D, max_depth=1),
+        )
+        self.assertEqual(stats.calls["mermaid_text"], 2)
+        self.assertEqual(set(stats.durations), {"relations", "names", "styles", "mermaid_text"})
+        n_lines = (
+            len(mm.get_mermaid_text(D, styles=styles, join_lines=False)) +
+            len(mm.get_mermaid_text(D, max_depth=1, join_lines=False))
+        )
+        self.assertEqual(stats.counts, {"graphs": 2, "nodes": 8, "edges": 7, "lines": n_lines})
+
+        # encoding
+        mermaid_json = mm.encode_json(text, stats=stats)
+        self.assertEqual(stats.counts["payload_bytes"], len(mermaid_json))
+        self.assertGreater(stats.counts["json_bytes"], len(text))
+
+        # callback and formatting
+        self.assertEqual(events.count("mermaid_text"), 2)
+        self.assertEqual(events[-1], "encode_json")
+        self.assertIn("encode_json", stats.format())
+        self.assertEqual(stats.to_dict()["counts"]["graphs"], 2)
+
+    def test_lazy_imports(self):
+        # modules that would noticeably slow down the import and must only be loaded on demand,
+        # compared against a bare interpreter as some of them might be loaded at startup already
+        heavy = [
+            "requests", "urllib.request", "http.client", "ssl", "email", "json", "zlib",
+            "hashlib", "base64", "asyncio", "concurrent.futures", "tempfile", "shutil",
+            "mermaidmro.aio", "mermaidmro.render", "mermaidmro.discover",
+            "mermaidmro.index", "mermaidmro.incremental", "mermaidmro.static",
+            "mermaidmro.workers", "mermaidmro.daemon", "mermaidmro.server", "http.server",
+        ]
+        cmd = "import sys{}; print(' '.join(m for m in {!r} if m in sys.modules))"
+
+        def loaded(stmt):
+            p = subprocess.run(
+                [sys.executable, "-c", cmd.format(stmt, heavy)],
+                stdout=subprocess.PIPE,
+                universal_newlines=True,
+                check=True,
+            )
+            return set(p.stdout.split())
+
+        self.assertEqual(loaded("; import mermaidmro") - loaded(""), set())
+
+        # lazily loaded members are public and resolvable
+        self.assertLessEqual(set(mm._lazy_attrs), set(mm.__all__))
+        self.assertTrue(all(getattr(mm, attr, None) is not None for attr in mm.__all__))
+
     def test_download_graph(self):
         if not HAS_REQUESTS:
             return
@@ -292,6 +881,817 @@ class TestCore(unittest.TestCase):
             self.assertEqual(str(cls), "<class 'mm_test_module.D'>")
 
 
+@contextlib.contextmanager
+def serve_locally(content=b"GRAPH", status_codes=None, delay=0.0, chunked=False):
+    """
+    Starts a local http server with keep-alive support as a stand-in for the mermaid.ink service
+    that responds to all get requests with *content* and yields a list of tuples containing the
+    requested path and client port. When given, responses use status codes taken from
+    *status_codes* in order, and 200 when exhausted, with redirects pointing to the requested path
+    prefixed with ``/moved``. Responses are sent after *delay* seconds and with chunked transfer
+    encoding when *chunked* is *True*.
+    """
+    requested = []
+    status_codes = list(status_codes or [])
+    lock = threading.Lock()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            with lock:
+                requested.append((self.path, self.client_address[1]))
+                status = status_codes.pop(0) if status_codes else 200
+            body = content if status == 200 else b"ERROR"
+            time.sleep(delay)
+            self.send_response(status)
+            if status in (301, 302, 303, 307, 308):
+                self.send_header("Location", f"/moved{self.path}")
+            if chunked:
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i in range(0, len(body), 3):
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(body[i:i + 3]), body[i:i + 3]))
+                self.wfile.write(b"0\r\n\r\n")
+            else:
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        def log_message(self, *args, **kwargs):
+            pass
+
+    class Server(http.server.ThreadingHTTPServer):
+
+        request_queue_size = 64
+
+        def handle_error(self, *args, **kwargs):
+            # clients might disconnect early on purpose
+            pass
+
+    server = Server(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+
+    url_static_json = mm.URL_STATIC_JSON
+    mm.URL_STATIC_JSON = f"http://127.0.0.1:{server.server_address[1]}/img/pako:{{}}?type={{}}"
+    try:
+        yield requested
+    finally:
+        mm.URL_STATIC_JSON = url_static_json
+        server.shutdown()
+        server.server_close()
+
+
+class TestDownload(unittest.TestCase):
+
+    def test_render_cache(self):
+        with serve_locally() as requested, tempfile.TemporaryDirectory() as d:
+            cache = mm.RenderCache(os.path.join(d, "cache"))
+            path = os.path.join(d, "out", "graph.png")
+
+            # miss
+            mm.download_graph(mm.get_mermaid_text(D), path, file_type="png", cache=cache)
+            self.assertEqual(len(requested), 1)
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), b"GRAPH")
+            self.assertEqual(cache.stats(), {"hits": 0, "misses": 1, "entries": 1, "size": 5})
+
+            # hit
+            os.remove(path)
+            mm.download_graph(mm.get_mermaid_text(D), path, file_type="png", cache=cache)
+            self.assertEqual(len(requested), 1)
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), b"GRAPH")
+            self.assertEqual(cache.stats()["hits"], 1)
+
+            # different file type, theme and text
+            mm.download_graph(mm.get_mermaid_text(D), path, file_type="jpg", cache=cache)
+            mm.download_graph(mm.get_mermaid_text(D), path, theme="dark", cache=cache.directory)
+            mm.download_graph(mm.get_mermaid_text(C), path, file_type="png", cache=cache)
+            self.assertEqual(len(requested), 4)
+            self.assertEqual(cache.stats()["entries"], 4)
+
+            # no leftover temporary files
+            self.assertFalse([p for p in os.listdir(cache.directory) if p.endswith(".tmp")])
+
+            # lru eviction
+            cache.max_size = 10
+            mm.download_graph(mm.get_mermaid_text(D), path, file_type="png", cache=cache)
+            self.assertEqual(len(requested), 4)
+            self.assertEqual(cache.evict(), 2)
+            self.assertEqual(cache.stats()["entries"], 2)
+            mermaid_json = mm.encode_json(mm.get_mermaid_text(D))
+            self.assertTrue(os.path.exists(cache.path(mermaid_json, "png")))
+
+            # clearing
+            cache.clear()
+            self.assertEqual(cache.stats(), {"hits": 0, "misses": 0, "entries": 0, "size": 0})
+
+            # files evicted between lookup and copy are downloaded again
+            class EvictingCache(mm.RenderCache):
+                def get(self, *args, **kwargs):
+                    cached_path = super().get(*args, **kwargs)
+                    if cached_path:
+                        os.remove(cached_path)
+                    return cached_path
+
+            cache = EvictingCache(os.path.join(d, "cache"))
+            for _ in range(2):
+                mm.download_graph(mm.get_mermaid_text(D), path, file_type="png", cache=cache)
+            self.assertEqual(len(requested), 6)
+            self.assertEqual(cache.stats()["misses"], 2)
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), b"GRAPH")
+            self.assertEqual(os.listdir(os.path.dirname(path)), ["graph.png"])
+
+            # counters are consistent across threads
+            import concurrent.futures
+
+            cache = mm.RenderCache(os.path.join(d, "cache"))
+            mermaid_json = mm.encode_json(mm.get_mermaid_text(D))
+            with concurrent.futures.ThreadPoolExecutor(max_workers=8) as pool:
+                list(pool.map(lambda _: cache.get(mermaid_json, "png"), range(400)))
+                list(pool.map(lambda _: cache.get(mermaid_json, "svg"), range(400)))
+            self.assertEqual((cache.hits, cache.misses), (400, 400))
+
+    def test_download_graph_stats(self):
+        with serve_locally() as requested, tempfile.TemporaryDirectory() as d:
+            stats = mm.Stats()
+            path = os.path.join(d, "graph.png")
+            for _ in range(2):
+                mm.download_graph(mm.get_mermaid_text(D), path, cache=d, stats=stats)
+            self.assertEqual(len(requested), 1)
+            self.assertEqual(stats.calls, {"encode_json": 2, "cache": 3, "http": 1})
+            self.assertEqual(
+                {key: stats.counts[key] for key in ["cache_hits", "cache_misses", "downloads"]},
+                {"cache_hits": 1, "cache_misses": 1, "downloads": 1},
+            )
+            self.assertEqual(stats.counts["download_bytes"], 5)
+
+    def test_download_graph_streamed(self):
+        text = mm.get_mermaid_text(D)
+        content = bytes(range(256)) * 64
+
+        with serve_locally(content=content, status_codes=[500]), tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "graph.png")
+
+            # failed download leaves no files
+            with self.assertRaises(Exception):
+                mm.download_graph(text, path, file_type="png", timeout=5)
+            self.assertEqual(os.listdir(d), [])
+
+            # streamed download in small chunks
+            mm.download_graph(text, path, file_type="png", chunk_size=100)
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), content)
+            self.assertEqual(os.listdir(d), ["graph.png"])
+
+            # new files respect the umask, and existing files keep their mode
+            umask = os.umask(0o022)
+            os.umask(umask)
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o666 & ~umask)
+            os.chmod(path, 0o640)
+            mm.download_graph(text, path, file_type="png")
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o640)
+
+        # failed download with a session does not overwrite an existing file
+        with serve_locally(status_codes=[404]), tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "graph.png")
+            with open(path, "wb") as f:
+                f.write(b"OLD")
+            session = mm.create_session()
+            try:
+                with self.assertRaises(Exception):
+                    mm.download_graph(text, path, session=session)
+            finally:
+                session.close()
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), b"OLD")
+            self.assertEqual(os.listdir(d), ["graph.png"])
+
+        # redirects are followed by sessions, and connections beyond the pool size are closed
+        import concurrent.futures
+
+        with serve_locally(status_codes=[302, 307]) as requested, tempfile.TemporaryDirectory() as d:
+            session = mm.create_session(pool_size=1)
+            try:
+                with concurrent.futures.ThreadPoolExecutor(2) as pool:
+                    paths = list(pool.map(
+                        lambda i: mm.download_graph(
+                            text,
+                            os.path.join(d, f"{i}.png"),
+                            file_type="png",
+                            session=session,
+                        ),
+                        range(4),
+                    ))
+            finally:
+                session.close()
+            for path in paths:
+                with open(path, "rb") as f:
+                    self.assertEqual(f.read(), b"GRAPH")
+            self.assertEqual(len(requested), 6)
+            self.assertEqual(sum(path.startswith("/moved/") for path, _ in requested), 2)
+
+        # other statuses are not treated as success
+        with serve_locally(status_codes=[300]), tempfile.TemporaryDirectory() as d:
+            session = mm.create_session()
+            try:
+                with self.assertRaises(Exception):
+                    mm.download_graph(text, os.path.join(d, "graph.png"), session=session)
+            finally:
+                session.close()
+            self.assertEqual(os.listdir(d), [])
+
+    def test_download_graphs(self):
+        texts = [mm.get_mermaid_text(cls) for cls in [A, B, C, D]]
+
+        # pooled connection with a single worker
+        with serve_locally() as requested, tempfile.TemporaryDirectory() as d:
+            results = mm.download_graphs(
+                [(text, os.path.join(d, f"{i}.png")) for i, text in enumerate(texts)],
+                max_workers=1,
+                file_type="png",
+            )
+            self.assertEqual([res.index for res in results], [0, 1, 2, 3])
+            self.assertEqual([res.error for res in results], [None] * 4)
+            self.assertEqual([res.attempts for res in results], [1] * 4)
+            self.assertEqual(len(requested), 4)
+            self.assertEqual(len({port for _, port in requested}), 1)
+            for res in results:
+                with open(res.path, "rb") as f:
+                    self.assertEqual(f.read(), b"GRAPH")
+
+        # concurrent downloads with items as dictionaries
+        with serve_locally() as requested, tempfile.TemporaryDirectory() as d:
+            results = mm.download_graphs(
+                [
+                    {"mermaid_text": text, "path": os.path.join(d, f"{i}.jpg"), "theme": "dark"}
+                    for i, text in enumerate(texts * 4)
+                ],
+                max_workers=4,
+            )
+            self.assertEqual(len(results), 16)
+            self.assertTrue(all(res.error is None for res in results))
+            self.assertLessEqual(len({port for _, port in requested}), 4)
+            self.assertTrue(all(p.endswith("?type=jpg") for p, _ in requested))
+
+        # retries on server errors
+        with serve_locally(status_codes=[503, 503]) as requested, tempfile.TemporaryDirectory() as d:
+            results = mm.download_graphs([(texts[0], os.path.join(d, "a.png"))], backoff=0)
+            self.assertIsNone(results[0].error)
+            self.assertEqual(results[0].attempts, 3)
+
+        # exceeded retries
+        with serve_locally(status_codes=[503] * 3) as requested, tempfile.TemporaryDirectory() as d:
+            results = mm.download_graphs(
+                [(texts[0], os.path.join(d, "a.png"))],
+                retries=1,
+                backoff=0,
+            )
+            self.assertIsNotNone(results[0].error)
+            self.assertIsNone(results[0].path)
+            self.assertEqual(results[0].attempts, 2)
+
+        # no retries on client errors
+        with serve_locally(status_codes=[404]) as requested, tempfile.TemporaryDirectory() as d:
+            results = mm.download_graphs([(texts[0], os.path.join(d, "a.png"))], backoff=0)
+            self.assertIsNotNone(results[0].error)
+            self.assertEqual(results[0].attempts, 1)
+
+        # no retries on other errors
+        results = mm.download_graphs([{"mermaid_text": texts[0], "path": "a.png", "foo": 1}])
+        self.assertIsInstance(results[0].error, TypeError)
+        self.assertEqual(results[0].attempts, 1)
+
+        # a single cache for all items
+        from unittest import mock
+
+        with serve_locally() as requested, tempfile.TemporaryDirectory() as d:
+            with mock.patch("mermaidmro.RenderCache", wraps=mm.RenderCache) as render_cache:
+                results = mm.download_graphs(
+                    [(texts[0], os.path.join(d, f"{i}.png")) for i in range(4)],
+                    max_workers=1,
+                    cache=os.path.join(d, "cache"),
+                )
+            self.assertEqual(render_cache.call_count, 1)
+            self.assertTrue(all(res.error is None for res in results))
+            self.assertEqual(len(requested), 1)
+
+        # no items
+        self.assertEqual(mm.download_graphs([]), [])
+
+    def test_adownload_graph(self):
+        text = mm.get_mermaid_text(D)
+
+        # simple and chunked responses
+        for chunked in [False, True]:
+            with serve_locally(chunked=chunked) as requested, tempfile.TemporaryDirectory() as d:
+                path = os.path.join(d, "sub", "graph.png")
+                ret = asyncio.run(mm.adownload_graph(text, path, file_type="png", chunk_size=2))
+                self.assertEqual(ret, path)
+                with open(path, "rb") as f:
+                    self.assertEqual(f.read(), b"GRAPH")
+                self.assertEqual(requested[0][0], f"/img/pako:{mm.encode_json(text)}?type=png")
+
+        # caching
+        with serve_locally() as requested, tempfile.TemporaryDirectory() as d:
+            cache = mm.RenderCache(os.path.join(d, "cache"))
+            for _ in range(2):
+                asyncio.run(mm.adownload_graph(text, os.path.join(d, "a.jpg"), cache=cache))
+            self.assertEqual(len(requested), 1)
+            self.assertEqual(cache.hits, 1)
+
+        # errors leave no files
+        with serve_locally(status_codes=[500]), tempfile.TemporaryDirectory() as d:
+            with self.assertRaises(urllib.error.HTTPError):
+                asyncio.run(mm.adownload_graph(text, os.path.join(d, "a.jpg")))
+            self.assertEqual(os.listdir(d), [])
+
+        # timeouts and cancellation leave no files
+        async def cancel(coro):
+            task = asyncio.ensure_future(coro)
+            await asyncio.sleep(0.05)
+            task.cancel()
+            await task
+
+        with serve_locally(delay=0.3), tempfile.TemporaryDirectory() as d:
+            with self.assertRaises(asyncio.TimeoutError):
+                asyncio.run(mm.adownload_graph(text, os.path.join(d, "a.jpg"), timeout=0.05))
+            with self.assertRaises(asyncio.CancelledError):
+                asyncio.run(cancel(mm.adownload_graphs([(text, os.path.join(d, "a.jpg"))] * 3)))
+            self.assertEqual(os.listdir(d), [])
+
+    def test_adownload_graphs(self):
+        texts = [mm.get_mermaid_text(cls) for cls in [A, B, C, D]]
+
+        with serve_locally(delay=0.05), tempfile.TemporaryDirectory() as d:
+            t0 = time.perf_counter()
+            results = asyncio.run(mm.adownload_graphs(
+                [(text, os.path.join(d, f"{i}.png")) for i, text in enumerate(texts * 2)],
+                max_concurrency=8,
+                file_type="png",
+            ))
+            self.assertLess(time.perf_counter() - t0, 0.3)
+            self.assertEqual([res.index for res in results], list(range(8)))
+            self.assertTrue(all(res.error is None and res.attempts == 1 for res in results))
+
+        # retries and client errors
+        with serve_locally(status_codes=[503, 200, 404]), tempfile.TemporaryDirectory() as d:
+            results = asyncio.run(mm.adownload_graphs(
+                [(texts[0], os.path.join(d, "a.png")), (texts[1], os.path.join(d, "b.png"))],
+                max_concurrency=1,
+                backoff=0,
+            ))
+            self.assertEqual([res.attempts for res in results], [2, 1])
+            self.assertIsNone(results[0].error)
+            self.assertIsNotNone(results[1].error)
+
+
+class TestRender(unittest.TestCase):
+
+    def test_parse_mermaid_text(self):
+        from mermaidmro.render import parse_mermaid_text
+
+        graph = parse_mermaid_text(mm.get_mermaid_text(
+            D,
+            graph_type="LR",
+            skip_modules=["tests.*"],
+            styles=[("Foo", ["D", "A"], "stroke: #83b")],
+        ))
+        self.assertEqual(graph.graph_type, "LR")
+        self.assertEqual(
+            graph.labels,
+            {"D": "D (0)", "C": "C (1)", "A": "A (2)", "B": "B (3)", "object": "object (4)"},
+        )
+        self.assertEqual(graph.edges[0], ("C", "D", "-->"))
+        self.assertEqual(len(graph.edges), 5)
+        self.assertEqual(graph.class_defs, {"Foo": "stroke: #83b"})
+        self.assertEqual(graph.node_classes, {"D": ["Foo"], "A": ["Foo"]})
+
+        # labels without mro
+        graph = parse_mermaid_text(mm.get_mermaid_text(D, show_mro=False, arrow_type="-.->"))
+        self.assertEqual(graph.labels["tests.test_all.D"], "tests.test_all.D")
+        self.assertEqual(graph.edges[0][2], "-.->")
+
+    def test_svg_renderer(self):
+        import xml.etree.ElementTree as ET
+
+        renderer = mm.SVGRenderer()
+        text = mm.get_mermaid_text(
+            D,
+            skip_modules=["tests.*"],
+            styles=[("Foo", "D", ["stroke: #83b", "color: rgb(1, 2, 3)"])],
+        )
+
+        # layers by longest path from object
+        from mermaidmro.render import parse_mermaid_text
+        graph = parse_mermaid_text(text)
+        self.assertEqual(
+            renderer.layers(list(graph.labels), graph.edges),
+            {"D": 3, "C": 2, "A": 1, "B": 1, "object": 0},
+        )
+
+        # well-formed svg with one group per node, one line per edge and styles
+        svg = ET.fromstring(renderer.to_svg(text))
+        ns = {"svg": "http://www.w3.org/2000/svg"}
+        nodes = svg.findall("svg:g", ns)
+        self.assertEqual([g.get("id") for g in nodes], ["D", "C", "A", "B", "object"])
+        self.assertEqual(len(svg.findall("svg:polyline", ns)), 5)
+        self.assertEqual(nodes[0].find("svg:rect", ns).get("style"), "stroke:#83b")
+        self.assertEqual(nodes[0].find("svg:text", ns).get("style"), "fill:rgb(1, 2, 3)")
+        self.assertEqual(nodes[0].find("svg:text", ns).text, "D (0)")
+
+        # root below object in top-down graphs, and right of it in left-right graphs
+        y = lambda g: float(g.find("svg:rect", ns).get("y"))
+        x = lambda g: float(g.find("svg:rect", ns).get("x"))
+        self.assertGreater(y(nodes[0]), y(nodes[-1]))
+        svg = ET.fromstring(renderer.to_svg(text.replace("graph TD", "graph LR")))
+        nodes = svg.findall("svg:g", ns)
+        self.assertGreater(x(nodes[0]), x(nodes[-1]))
+        self.assertGreater(float(svg.get("width")), float(svg.get("height")))
+
+        # rendering to files
+        with tempfile.TemporaryDirectory() as d:
+            path = mm.render_graph(text, os.path.join(d, "sub", "graph.svg"), theme="dark")
+            with open(path, "r") as f:
+                self.assertTrue(f.read().startswith("<svg"))
+            with self.assertRaises(ValueError):
+                mm.render_graph(text, os.path.join(d, "graph.png"), file_type="png")
+
+    def test_renderers(self):
+        self.assertIsInstance(mm.get_renderer("local"), mm.SVGRenderer)
+        self.assertIsInstance(mm.get_renderer("ink", timeout=5), mm.InkRenderer)
+        renderer = mm.SVGRenderer(font_size=10)
+        self.assertIs(mm.get_renderer(renderer), renderer)
+        with self.assertRaises(ValueError):
+            mm.get_renderer("unknown")
+        with self.assertRaises(TypeError):
+            mm.Renderer()
+        self.assertEqual(mm.InkRenderer().check_file_type("jpeg"), "jpg")
+
+        # mermaid.ink renderer
+        with serve_locally() as requested, tempfile.TemporaryDirectory() as d:
+            path = mm.render_graph(mm.get_mermaid_text(D), os.path.join(d, "a.jpg"), renderer="ink")
+            self.assertTrue(requested[0][0].endswith("?type=png"))
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), b"GRAPH")
+
+    def test_graph_server(self):
+        import json
+        import http.client
+        import concurrent.futures
+        from mermaidmro.server import GraphServer, LRUCache
+
+        # size limited lru cache
+        cache = LRUCache(10)
+        cache.put("a", b"1234")
+        cache.put("b", "5678")
+        self.assertEqual(cache.get("a"), b"1234")
+        cache.put("c", b"901")
+        cache.put("d", b"x" * 11)
+        self.assertEqual((cache.get("b"), cache.get("d")), (None, None))
+        self.assertEqual(cache.stats(), {
+            "hits": 1, "misses": 2, "hit_rate": 1 / 3, "entries": 2, "size": 7,
+        })
+
+        @contextlib.contextmanager
+        def serve(**kwargs):
+            server = GraphServer(("127.0.0.1", 0), **{"threads": 4, **kwargs})
+            thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+            thread.start()
+            try:
+                yield server
+            finally:
+                server.shutdown()
+                server.server_close()
+
+        def get(server, path):
+            conn = http.client.HTTPConnection(*server.server_address[:2], timeout=10)
+            try:
+                conn.request("GET", path)
+                res = conn.getresponse()
+                return res.status, res.getheader("Content-Type"), res.read()
+            finally:
+                conn.close()
+
+        cid = f"{D.__module__}:D"
+        with serve(renderer="local", allow=["tests.*"]) as server:
+            # texts with options, served concurrently and cached
+            path = f"/text?cls={cid}&show_mro=false&max_depth=1"
+            expected = mm.get_mermaid_text(D, show_mro=False, max_depth=1).encode("utf-8")
+            with concurrent.futures.ThreadPoolExecutor(8) as pool:
+                responses = list(pool.map(lambda _: get(server, path), range(16)))
+            self.assertEqual(set(responses), {(200, "text/plain; charset=utf-8", expected)})
+
+            # edit urls and images
+            status, _, body = get(server, f"/edit?cls={cid}")
+            self.assertEqual(status, 302)
+            self.assertTrue(body.startswith(b"https://mermaid.live/edit#pako:"))
+            for _ in range(2):
+                status, content_type, body = get(server, f"/image?cls={cid}&theme=dark")
+                self.assertEqual((status, content_type), (200, "image/svg+xml"))
+                self.assertTrue(body.startswith(b"<svg"))
+
+            # errors
+            self.assertEqual(get(server, f"/image?cls={cid}&file_type=png")[0], 400)
+            self.assertEqual(get(server, f"/text?cls={cid}&max_depth=x")[0], 400)
+            self.assertEqual(get(server, f"/text?cls={cid}&foo=1")[0], 400)
+            self.assertEqual(get(server, f"/text?cls={cid}&direction=left")[0], 400)
+            self.assertEqual(get(server, "/text")[0], 400)
+            self.assertEqual(get(server, f"/text?cls={D.__module__}:Missing")[0], 404)
+            self.assertEqual(get(server, "/text?cls=os:PathLike")[0], 403)
+            self.assertEqual(get(server, "/unknown")[0], 404)
+
+            # metrics
+            status, content_type, body = get(server, "/metrics")
+            self.assertEqual((status, content_type), (200, "application/json"))
+            metrics = json.loads(body)
+            self.assertEqual(metrics["requests"]["total"], 27)
+            self.assertEqual(metrics["requests"]["endpoints"]["/text"], 22)
+            self.assertEqual(metrics["requests"]["statuses"]["400"], 5)
+            self.assertEqual(set(metrics["latency"]["/text"]), {"p50", "p90", "p99", "max"})
+            self.assertEqual(metrics["caches"]["image"]["hits"], 1)
+            self.assertGreaterEqual(metrics["caches"]["text"]["hits"], 15)
+            self.assertEqual(metrics["stages"]["calls"]["render"], 1)
+
+        # no classes allowed by default
+        with serve(renderer="local") as server:
+            self.assertEqual(get(server, f"/text?cls={cid}")[0], 403)
+
+        # idle keep-alive connections do not block the pool
+        with serve(renderer="local", allow=["tests.*"], threads=2, idle_timeout=0.2) as server:
+            idle = [
+                http.client.HTTPConnection(*server.server_address[:2], timeout=10)
+                for _ in range(4)
+            ]
+            try:
+                for conn in idle:
+                    conn.request("GET", "/metrics")
+                    conn.getresponse().read()
+                t0 = time.perf_counter()
+                self.assertEqual(get(server, f"/text?cls={cid}")[0], 200)
+                self.assertLess(time.perf_counter() - t0, 5.0)
+            finally:
+                for conn in idle:
+                    conn.close()
+
+        # images proxied from mermaid.ink
+        with serve_locally() as requested, serve(allow=["tests.*"]) as server:
+            for _ in range(2):
+                self.assertEqual(
+                    get(server, f"/image?cls={cid}&file_type=jpg"),
+                    (200, "image/jpeg", b"GRAPH"),
+                )
+            self.assertEqual(len(requested), 1)
+            self.assertTrue(requested[0][0].endswith("?type=jpg"))
+
+
+class TestDiscover(unittest.TestCase):
+
+    @classmethod
+    @contextlib.contextmanager
+    def build_package(cls, files=None):
+        if files is None:
+            files = {
+                "__init__.py": "class Base(object): pass\n",
+                "models.py": (
+                    "from mm_test_pkg import Base\nclass A(Base): pass\nclass B(A): pass\n"
+                ),
+                "broken.py": "raise ImportError('broken')\n",
+                "sub/__init__.py": "",
+                "sub/tasks.py": (
+                    "from mm_test_pkg.models import B\nclass T(B): pass\nclass U: pass\n"
+                ),
+            }
+        with tempfile.TemporaryDirectory() as d:
+            for path, content in files.items():
+                path = os.path.join(d, "mm_test_pkg", path)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w") as f:
+                    f.write(content)
+
+            sys.path.insert(0, d)
+            try:
+                yield d
+            finally:
+                sys.path.remove(d)
+                for name in list(sys.modules):
+                    if name.split(".", 1)[0] == "mm_test_pkg":
+                        del sys.modules[name]
+
+    def test_discover_modules(self):
+        with self.build_package():
+            self.assertEqual(
+                mm.discover_modules("mm_test_pkg"),
+                ["mm_test_pkg", "mm_test_pkg.broken", "mm_test_pkg.models", "mm_test_pkg.sub",
+                 "mm_test_pkg.sub.tasks"],
+            )
+            self.assertEqual(
+                mm.discover_modules("mm_test_pkg", exclude=["*.sub", "*.broken"]),
+                ["mm_test_pkg", "mm_test_pkg.models"],
+            )
+
+    def test_discover_classes(self):
+        with self.build_package():
+            for processes in [0, 2]:
+                result = mm.discover_classes("mm_test_pkg", processes=processes)
+                self.assertEqual(
+                    [cls.__name__ for cls in result.classes],
+                    ["Base", "A", "B", "T", "U"],
+                )
+
+                # module infos
+                infos = {info.name: info for info in result.modules}
+                self.assertEqual(len(infos), 5)
+                self.assertEqual(infos["mm_test_pkg.broken"].error, "ImportError: broken")
+                self.assertEqual(
+                    infos["mm_test_pkg.models"].classes,
+                    ("mm_test_pkg.models:A", "mm_test_pkg.models:B"),
+                )
+                self.assertTrue(all(info.duration >= 0 for info in result.modules))
+
+            # filters
+            base = sys.modules["mm_test_pkg"].Base
+            result = mm.discover_classes("mm_test_pkg", base=base, pattern="*.sub.*")
+            self.assertEqual([cls.__name__ for cls in result.classes], ["T"])
+
+            # forest
+            result = mm.discover_classes("mm_test_pkg", base=base)
+            text = mm.get_mermaid_text_multi(result.classes, show_mro=False)
+            self.assertEqual(text.count("-->"), 4)
+
+    def test_static_extractor(self):
+        from mermaidmro.static import StaticExtractor
+
+        files = {
+            "__init__.py": "from .base import Base\nfrom .base import *\n",
+            "base.py": (
+                "import typing\n"
+                "T = typing.TypeVar('T')\n"
+                "class Base(object): pass\n"
+                "class Mixin(typing.Generic[T]): pass\n"
+                "class Error(ValueError): pass\n"
+                "__all__ = ['Mixin']\n"
+            ),
+            "sub/__init__.py": "",
+            "sub/models.py": (
+                "from mm_test_pkg import Base, Mixin\n"
+                "from .. import base as b\n"
+                "import mm_test_pkg.base\n"
+                "Alias = b.Error\n"
+                "class A(Base): pass\n"
+                "class B(Base, Mixin[int]): pass\n"
+                "class C(A, B): pass\n"
+                "class D(C, Alias, mm_test_pkg.base.Mixin):\n"
+                "    class Inner(A): pass\n"
+                "class E(D.Inner, Exception): pass\n"
+            ),
+            "ext.py": "from mm_missing_pkg import External\nclass F(External): pass\n",
+            "bad.py": "class X(object): pass\nclass Y(X): pass\nclass Z(X, Y): pass\n",
+        }
+        with self.build_package(files) as d:
+            cache_dir = os.path.join(d, "cache")
+            extractor = StaticExtractor(paths=[d], cache_dir=cache_dir)
+
+            # same graphs as for imported classes
+            name_func = mm.get_default_name_func()
+            models = importlib.import_module("mm_test_pkg.sub.models")
+            for name in ["A", "B", "C", "D", "D.Inner", "E"]:
+                cls = models
+                for attr in name.split("."):
+                    cls = getattr(cls, attr)
+                static_cls = extractor.get_class(f"mm_test_pkg.sub.models:{name}")
+                self.assertEqual(
+                    list(map(name_func, static_cls.__mro__)),
+                    list(map(name_func, cls.__mro__)),
+                )
+                self.assertEqual(mm.get_mermaid_text(static_cls), mm.get_mermaid_text(cls))
+                self.assertEqual(mm.get_relations(static_cls, max_depth=1)[0].cls, static_cls)
+                self.assertEqual(
+                    mm.get_mermaid_text(static_cls, hide_bases=True),
+                    mm.get_mermaid_text(cls, hide_bases=True),
+                )
+
+            # ubiquitous bases are the actual classes
+            self.assertIn(typing.Generic, extractor.get_class("mm_test_pkg.base:Mixin").__bases__)
+
+            # unresolved bases
+            F = extractor.get_class("mm_test_pkg.ext:F")
+            self.assertFalse(F.__bases__[0].resolved)
+            self.assertEqual(name_func(F.__bases__[0]), "mm_missing_pkg.External")
+
+            # errors
+            with self.assertRaises(TypeError):
+                extractor.get_class("mm_test_pkg.bad:Z").__mro__
+            with self.assertRaises(AttributeError):
+                extractor.get_class("mm_test_pkg.sub.models:Missing")
+            with self.assertRaises(ModuleNotFoundError):
+                extractor.get_class("mm_test_pkg.missing:A")
+
+            # whole packages, parsed in worker processes and cached per file
+            extractor = StaticExtractor(paths=[d], cache_dir=cache_dir, processes=2)
+            self.assertEqual(
+                extractor.parse_package("mm_test_pkg"),
+                mm.discover_modules("mm_test_pkg"),
+            )
+            self.assertEqual((extractor.hits, extractor.misses), (5, 1))
+            self.assertEqual(
+                [cls.__name__ for cls in extractor.classes("mm_test_pkg.base")],
+                ["Base", "Mixin", "Error"],
+            )
+
+            # changed modification time with the same content, and changed content
+            path = os.path.join(d, "mm_test_pkg", "base.py")
+            os.utime(path, ns=(0, 0))
+            extractor = StaticExtractor(paths=[d], cache_dir=cache_dir)
+            extractor.parse_package("mm_test_pkg")
+            self.assertEqual((extractor.hits, extractor.misses), (6, 0))
+            with open(path, "a") as f:
+                f.write("class Extra(Base): pass\n")
+            extractor = StaticExtractor(paths=[d], cache_dir=cache_dir)
+            extractor.parse_package("mm_test_pkg")
+            self.assertEqual((extractor.hits, extractor.misses), (5, 1))
+            self.assertEqual(extractor.classes("mm_test_pkg.base")[-1].__name__, "Extra")
+
+            # cli
+            for cid in ["mm_test_pkg.sub.models:E", "mm_test_pkg.sub.models:[AB]"]:
+                self.assertEqual(
+                    mm.main([cid, "--static"], test=True),
+                    mm.main([cid], test=True),
+                )
+
+    def test_extract_classes(self):
+        from mermaidmro.static import StaticClass
+
+        files = {
+            "__init__.py": "",
+            "models.py": "class A(object): pass\nclass B(A, Exception): pass\n",
+            "tasks.py": "from mm_test_pkg.models import B\nclass T(B): pass\nclass U(T): pass\n",
+            "slow.py": "import time\ntime.sleep(30)\n",
+            "crash.py": "import os\nos._exit(3)\n",
+            "big.py": "data = bytearray(2 * 1024**3)\n",
+            "noisy.py": "print('noise')\nclass N(object): pass\n",
+            "generic.py": (
+                "import typing\n"
+                "T = typing.TypeVar('T')\n"
+                "class G(typing.Generic[T]): pass\n"
+                "class H(G[int]): pass\n"
+            ),
+        }
+        with self.build_package(files):
+            results = mm.extract_classes(
+                [
+                    "mm_test_pkg.tasks:*", "mm_test_pkg.models:B", "mm_test_pkg.slow:S",
+                    "mm_test_pkg.crash:C", "mm_test_pkg.big:X", "mm_test_pkg.missing:M",
+                ],
+                processes=3,
+                timeout=5,
+                memory_limit=1024**3,
+                max_jobs=1,
+            )
+            self.assertEqual(
+                [res.cid for res in results],
+                ["mm_test_pkg.tasks:*", "mm_test_pkg.models:B", "mm_test_pkg.slow:S",
+                 "mm_test_pkg.crash:C", "mm_test_pkg.big:X", "mm_test_pkg.missing:M"],
+            )
+            self.assertIsNone(results[0].error)
+            self.assertEqual(
+                [cid for cid, _ in results[0].classes],
+                ["mm_test_pkg.tasks:T", "mm_test_pkg.tasks:U"],
+            )
+
+            # classes are shared across results and builtins are mapped to actual classes
+            T = results[0].classes[0][1]
+            self.assertIsInstance(T, StaticClass)
+            self.assertIs(T.__bases__[0], results[1].classes[0][1])
+            self.assertIs(T.__mro__[-1], object)
+            self.assertIn(Exception, T.__mro__)
+
+            # errors
+            self.assertTrue(results[2].error.startswith("TimeoutError"))
+            self.assertEqual(results[3].error, "worker exited with code 3")
+            self.assertTrue(results[4].error.startswith("MemoryError"))
+            self.assertTrue(results[5].error.startswith("ModuleNotFoundError"))
+            self.assertEqual([res.classes for res in results[2:]], [[], [], [], []])
+
+            # cli, identical to imports in the current process
+            for cid in ["mm_test_pkg.tasks:U", "mm_test_pkg.tasks:*", "mm_test_pkg.noisy:N"]:
+                self.assertEqual(
+                    mm.main([cid, "--workers", "2"], test=True),
+                    mm.main([cid], test=True),
+                )
+            # ubiquitous bases are mapped to actual classes and can be hidden
+            self.assertEqual(
+                mm.main(["mm_test_pkg.generic:H", "--workers", "1", "--hide-bases"], test=True),
+                mm.main(["mm_test_pkg.generic:H", "--hide-bases"], test=True),
+            )
+            with self.assertRaises(ImportError):
+                mm.main(["mm_test_pkg.crash:C", "--workers", "1"], test=True)
+
+
 class TestCLI(unittest.TestCase):
 
     @classmethod
@@ -342,6 +1742,36 @@ class TestCLI(unittest.TestCase):
     object --> mm_test_module.A""",
             )
 
+            # subclasses
+            self.assertEqual(
+                self.main(["mm_test_module:A", "-D", "down"]),
+                """graph TD
+    mm_test_module.A("mm_test_module.A (0)")
+
+    mm_test_module.A --> mm_test_module.C
+    mm_test_module.C --> mm_test_module.D""",
+            )
+
+            # reduced graph
+            self.assertEqual(
+                self.main(["mm_test_module:D", "--reduce", "--collapse-chains", "--hide-bases"]),
+                """graph TD
+    mm_test_module.D("mm_test_module.D (0)")
+    mm_test_module.C("mm_test_module.C (1) ... mm_test_module.A (2) [2 classes]")
+    mm_test_module.B("mm_test_module.B (3)")
+
+    mm_test_module.C --> mm_test_module.D
+    mm_test_module.B --> mm_test_module.D""",
+            )
+
+            # timings
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr):
+                text = self.main(["mm_test_module:D", "-t"])
+            self.assertEqual(text, self.main(["mm_test_module:D"]))
+            self.assertIn("import", stderr.getvalue())
+            self.assertIn("mermaid_text", stderr.getvalue())
+
             # changed graph and arrow type
             self.assertEqual(
                 self.main(["mm_test_module:D", "-n", "-g", "LR", "-a", " --->"]),
@@ -368,6 +1798,267 @@ class TestCLI(unittest.TestCase):
                     f"imgcat {f.name}",
                 )
 
+            # local renderer
+            with tempfile.TemporaryDirectory() as d:
+                path = os.path.join(d, "graph.svg")
+                self.assertEqual(
+                    self.main(["mm_test_module:D", "-r", "local", "-v", "cat", "-d", path]),
+                    ["cat", path],
+                )
+                with open(path, "r") as f:
+                    self.assertIn("mm_test_module.D (0)", f.read())
+
+    def test_renderer_file_types(self):
+        with self.build_module(), tempfile.TemporaryDirectory() as d:
+            # svg files are rendered locally by default
+            path = os.path.join(d, "graph.svg")
+            self.assertEqual(self.main(["mm_test_module:D", "-v", "cat", "-d", path]), ["cat", path])
+            with open(path, "r") as f:
+                self.assertTrue(f.read().startswith("<svg"))
+
+            # unsupported combinations
+            stderr = io.StringIO()
+            for args in [["-r", "ink", "-d", path], ["-r", "local", "-d", "graph.png"]]:
+                with self.assertRaises(SystemExit), contextlib.redirect_stderr(stderr):
+                    self.main(["mm_test_module:D", *args])
+            self.assertIn("file type 'svg' not supported by renderer 'ink'", stderr.getvalue())
+            self.assertIn("file type 'png' not supported by renderer 'local'", stderr.getvalue())
+
+            # jpeg extensions are downloaded as jpg files
+            with serve_locally() as requested:
+                self.main(["mm_test_module:D", "-d", os.path.join(d, "graph.JPEG")])
+            self.assertTrue(requested[0][0].endswith("?type=jpg"))
+
+    def test_watch(self):
+        code_v1 = "class A(object): pass\nclass C(A): pass\n"
+        code_v2 = "class B(object): pass\nclass C(B): pass\n"
+
+        def write(path, code, mtime):
+            with open(path, "w") as f:
+                f.write(code)
+            os.utime(path, (mtime, mtime))
+
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "mm_watch_module.py")
+            write(path, code_v1, time.time() - 10)
+
+            # start the cli in a subprocess and collect its output in a thread
+            repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(mm.__file__)))
+            env = dict(os.environ, PYTHONPATH=os.pathsep.join([d, repo_dir]))
+            p = subprocess.Popen(
+                [
+                    sys.executable, "-c", "import mermaidmro; mermaidmro.main()",
+                    "mm_watch_module:C", "-n", "-w", "--interval", "0.05",
+                ],
+                stdout=subprocess.PIPE,
+                universal_newlines=True,
+                env=env,
+            )
+            lines = []
+            thread = threading.Thread(target=lambda: lines.extend(p.stdout))
+            thread.start()
+
+            def wait_for_lines(n, timeout=10.0):
+                t0 = time.perf_counter()
+                while len(lines) < n and time.perf_counter() - t0 < timeout:
+                    time.sleep(0.02)
+                return [line.rstrip("\n") for line in lines]
+
+            try:
+                self.assertEqual(wait_for_lines(3), [
+                    "graph TD",
+                    "    mm_watch_module.A --> mm_watch_module.C",
+                    "    object --> mm_watch_module.A",
+                ])
+
+                # touching the file without changing the graph does not repeat the output
+                write(path, code_v1, time.time() - 5)
+                time.sleep(0.3)
+                self.assertEqual(len(lines), 3)
+
+                # changed graph
+                write(path, code_v2, time.time())
+                self.assertEqual(wait_for_lines(6)[3:], [
+                    "graph TD",
+                    "    mm_watch_module.B --> mm_watch_module.C",
+                    "    object --> mm_watch_module.B",
+                ])
+            finally:
+                p.terminate()
+                p.wait()
+                thread.join()
+
+    def test_daemon(self):
+        code_v1 = "open('imports.log', 'a').write('x')\nclass A(object): pass\nclass C(A): pass\n"
+        code_v2 = "class B(object): pass\nclass C(B): pass\n"
+
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "mm_daemon_module.py")
+            with open(path, "w") as f:
+                f.write(code_v1)
+            os.utime(path, (time.time() - 10,) * 2)
+
+            # run the daemon and the cli in subprocesses with the same environment
+            repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(mm.__file__)))
+            env = dict(
+                os.environ,
+                PYTHONPATH=os.pathsep.join([d, repo_dir]),
+                MERMAIDMRO_SOCKET=os.path.join(d, "daemon.sock"),
+            )
+
+            def run(*args):
+                return subprocess.run(
+                    [sys.executable, "-c", "import mermaidmro; mermaidmro.main()", *args],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    universal_newlines=True,
+                    env=env,
+                    cwd=d,
+                )
+
+            expected = run("mm_daemon_module:C", "-n", "--no-daemon")
+            p = subprocess.Popen(
+                [sys.executable, "-c", "import mermaidmro; mermaidmro.main()", "daemon"],
+                env=env,
+                cwd=d,
+            )
+            try:
+                t0 = time.perf_counter()
+                while run("daemon", "--status").returncode and time.perf_counter() - t0 < 10:
+                    time.sleep(0.05)
+
+                # the module is imported only once by the daemon
+                for _ in range(2):
+                    res = run("mm_daemon_module:C", "-n")
+                    self.assertEqual((res.returncode, res.stdout), (0, expected.stdout))
+                with open(os.path.join(d, "imports.log"), "r") as f:
+                    self.assertEqual(f.read(), "xx")
+
+                # errors and exit codes are forwarded
+                res = run("mm_daemon_module:X")
+                self.assertEqual(res.returncode, 1)
+                self.assertIn("AttributeError: not class named 'X'", res.stderr)
+
+                # changed modules are imported again
+                with open(path, "w") as f:
+                    f.write(code_v2)
+                self.assertEqual(run("mm_daemon_module:C", "-n").stdout.splitlines(), [
+                    "graph TD",
+                    "    mm_daemon_module.B --> mm_daemon_module.C",
+                    "    object --> mm_daemon_module.B",
+                ])
+                self.assertEqual(
+                    run("daemon", "--status").stdout.strip(),
+                    "daemon running, 4 invocations, 1 evictions",
+                )
+            finally:
+                run("daemon", "--stop")
+                p.wait(timeout=10)
+            self.assertFalse(os.path.exists(env["MERMAIDMRO_SOCKET"]))
+
+        from unittest import mock
+        from mermaidmro.daemon import Daemon, forward, get_socket_path
+
+        # names and relations are cached across invocations
+        daemon = Daemon(socket_path="unused.sock")
+        for _ in range(2):
+            res = daemon.run([f"{D.__module__}:D", "-n"])
+            self.assertEqual(res["stdout"].strip(), mm.get_mermaid_text(D, show_mro=False))
+        self.assertEqual([key[0] for key in daemon.relations_cache], [D])
+
+        # the environment of the client is applied for the invocation
+        with tempfile.TemporaryDirectory() as d:
+            with open(os.path.join(d, "classes.txt"), "w") as f:
+                f.write(f"{D.__module__}:D\n")
+            env = {**os.environ, "MM_MANIFEST_DIR": d}
+            res = daemon.run(["--manifest", "$MM_MANIFEST_DIR/classes.txt", "-n"], env=env)
+            self.assertEqual(res["status"], 0)
+            self.assertEqual(res["stdout"].strip(), mm.get_mermaid_text(D, show_mro=False))
+            self.assertNotIn("MM_MANIFEST_DIR", os.environ)
+
+        # unresponsive daemons are not waited for
+        if hasattr(socket, "AF_UNIX"):
+            with tempfile.TemporaryDirectory() as d:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                    sock.bind(os.path.join(d, "daemon.sock"))
+                    sock.listen(1)
+                    with contextlib.redirect_stderr(io.StringIO()):
+                        status = forward(["-h"], socket_path=sock.getsockname(), timeout=0.1)
+                    self.assertIsNone(status)
+
+        # sockets in private directories, refusing sockets of other users
+        with tempfile.TemporaryDirectory() as d:
+            with mock.patch.dict(os.environ, {"TMPDIR": d}), mock.patch("tempfile.tempdir", None):
+                os.environ.pop("MERMAIDMRO_SOCKET", None)
+                os.environ.pop("XDG_RUNTIME_DIR", None)
+                socket_path = get_socket_path()
+                self.assertEqual(os.path.dirname(os.path.dirname(socket_path)), d)
+            if hasattr(os, "getuid") and os.getuid() == 0:
+                os.makedirs(os.path.dirname(socket_path), mode=0o700)
+                with open(socket_path, "w"):
+                    pass
+                os.chown(socket_path, 12345, -1)
+                self.assertIsNone(forward(["-h"], socket_path=socket_path))
+                with self.assertRaises(RuntimeError):
+                    Daemon(socket_path=socket_path).serve()
+
+    def test_batch(self):
+        with self.build_module():
+            # multiple classes
+            texts = self.main(["mm_test_module:D", "mm_test_module:C", "-n"])
+            self.assertEqual(list(texts), ["mm_test_module:D", "mm_test_module:C"])
+            self.assertEqual(texts["mm_test_module:D"], self.main(["mm_test_module:D", "-n"]))
+
+            # patterns
+            self.assertEqual(
+                list(self.main(["mm_test_module:*"])),
+                ["mm_test_module:A", "mm_test_module:B", "mm_test_module:C", "mm_test_module:D"],
+            )
+            self.assertEqual(
+                list(self.main(["mm_test_module:[CD]", "mm_test_module:D"])),
+                ["mm_test_module:C", "mm_test_module:D"],
+            )
+
+            with tempfile.TemporaryDirectory() as d:
+                # manifest
+                manifest = os.path.join(d, "manifest.txt")
+                with open(manifest, "w") as f:
+                    f.write("# classes\nmm_test_module:A\n\nmm_test_module:B  # comment\n")
+                self.assertEqual(
+                    list(self.main(["mm_test_module:D", "-M", manifest])),
+                    ["mm_test_module:D", "mm_test_module:A", "mm_test_module:B"],
+                )
+
+                # templated downloads with the local renderer
+                template = os.path.join(d, "{module}.{name}.svg")
+                paths = self.main(["mm_test_module:*", "-r", "local", "-d", template])
+                self.assertEqual(
+                    paths["mm_test_module:C"],
+                    os.path.join(d, "mm_test_module.C.svg"),
+                )
+                self.assertTrue(all(os.path.exists(path) for path in paths.values()))
+
+                # parallel downloads
+                with serve_locally(b"PNG") as requested:
+                    template = os.path.join(d, "{name}.png")
+                    paths = self.main(["mm_test_module:*", "-j", "2", "-d", template])
+                    self.assertEqual(len(requested), 4)
+                for path in paths.values():
+                    with open(path, "rb") as f:
+                        self.assertEqual(f.read(), b"PNG")
+
+            # invalid arguments
+            with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                self.main([])
+            with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                self.main(["mm_test_module:*", "-d", "graph.png"])
+            stderr = io.StringIO()
+            for template in ["out/{x}.svg", "out/{name.svg"]:
+                with contextlib.redirect_stderr(stderr), self.assertRaises(SystemExit):
+                    self.main(["mm_test_module:*", "-d", template])
+            self.assertIn("unknown placeholders in --download template: {x}", stderr.getvalue())
+            self.assertIn("invalid --download template 'out/{name.svg'", stderr.getvalue())
+
     def test_open_url(self):
         with self.build_module():
             # default case